@@ -1,4 +1,5 @@
 import os
+from typing import Any, Optional
 from dotenv import load_dotenv
 from reporter.errors import MissingEnvironmentVariableException
 
@@ -16,22 +17,71 @@ def env_var(accessor: str) -> str:
     return var
 
 
+class EnvVar:
+    """
+    Setting read from the environment the first time it is accessed, rather than at import,
+    so modules that never use it can be imported without a full `.env`
+    :param `default`: value of an optional setting when it is not set, a required one raises
+    """
+
+    def __init__(self, accessor: str, default: Optional[str] = None):
+        self.accessor = accessor
+        self.default = default
+        self.value: Optional[str] = None
+
+    def __get__(self, obj: Any, owner: Any = None) -> str:
+        if self.value is None:
+            if self.default is None:
+                self.value = env_var(self.accessor)
+            else:
+                self.value = os.environ.get(self.accessor) or self.default
+        return self.value
+
+
+class EnvFlag(EnvVar):
+    """Optional `EnvVar` that is on only when set to TRUE"""
+
+    def __init__(self, accessor: str):
+        super().__init__(accessor, default="FALSE")
+
+    def __get__(self, obj: Any, owner: Any = None) -> bool:  # type: ignore[override]
+        return super().__get__(obj, owner) == "TRUE"
+
+
 class ADDRESSES:
-    GOVERNOR = env_var("GOVERNOR_ADDRESS")
-    PRV = env_var("PRV_ADDRESS")
-    ARV = env_var("ARV_ADDRESS")
-    PRV_ROLLSTAKER = env_var("PRV_ROLLSTAKER")
-    DECAY_ORACLE = env_var("DECAY_ORACLE")
-    TOKEN_LOCKER = env_var("TOKEN_LOCKER")
+    GOVERNOR = EnvVar("GOVERNOR_ADDRESS")
+    PRV = EnvVar("PRV_ADDRESS")
+    ARV = EnvVar("ARV_ADDRESS")
+    PRV_ROLLSTAKER = EnvVar("PRV_ROLLSTAKER")
+    DECAY_ORACLE = EnvVar("DECAY_ORACLE")
+    TOKEN_LOCKER = EnvVar("TOKEN_LOCKER")
 
 
 class SUBGRAPHS:
     SNAPSHOT = "https://hub.snapshot.org/graphql"
     VEDOUGH = "https://api.thegraph.com/subgraphs/name/pie-dao/vedough"
 
-    AUXO_STAKING = env_var("SUBGRAPH_AUXO_STAKING")
-    AUXO_GOV = env_var("SUBGRAPH_AUXO_GOV")
+    AUXO_STAKING = EnvVar("SUBGRAPH_AUXO_STAKING")
+    AUXO_GOV = EnvVar("SUBGRAPH_AUXO_GOV")
+
+
+# module level settings, read on first access through `__getattr__`
+_LAZY_SETTINGS: dict[str, EnvVar] = {
+    "SNAPSHOT_SPACE_ID": EnvVar("SNAPSHOT_SPACE_ID"),
+    "RPC_URL": EnvVar("RPC_URL"),
+    # compute ARV boosted balances from the locks instead of calling the DecayOracle for each staker
+    "ARV_LOCAL_DECAY": EnvFlag("ARV_LOCAL_DECAY"),
+    # run the full pydantic validation on models built from already validated data, for debugging
+    "VALIDATE_MODELS": EnvFlag("VALIDATE_MODELS"),
+    # how to read contract state: "multicall", "batch" for JSON-RPC batches, or "auto" to measure both
+    "CHAIN_READ_STRATEGY": EnvVar("CHAIN_READ_STRATEGY", default="auto"),
+}
 
 
-SNAPSHOT_SPACE_ID = env_var("SNAPSHOT_SPACE_ID")
-RPC_URL = env_var("RPC_URL")
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_SETTINGS:
+        value = _LAZY_SETTINGS[name].__get__(None)
+        # kept as a module attribute, so later reads on hot paths skip `__getattr__`
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -42,3 +42,17 @@ class MissingDBException(Exception):
 
 class MissingSummaryError(Exception):
     pass
+
+
+class DecayMismatchException(Exception):
+    """Raise if locally computed boosted balances disagree with the DecayOracle"""
+
+    pass
+
+
+class FailedCallsException(Exception):
+    """Raise if on-chain calls revert, or return data that cannot be decoded"""
+
+    def __init__(self, keys: list):
+        self.keys = keys
+        super().__init__(f"{len(keys)} on-chain calls failed: {keys[:10]}")
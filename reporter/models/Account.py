@@ -1,11 +1,12 @@
 from __future__ import annotations
 from enum import Enum
-from typing import Union
+from typing import Optional, Union
 from pydantic import BaseModel, validator
-import eth_utils as eth
 
+from reporter.models.AddressRegistry import address_id, to_checksum_address
 from reporter.models.types import EthereumAddress
 from reporter.models.ERC20 import PRV, ARV, ERC20Amount
+from reporter.models.trusted import trusted
 
 
 class AccountState(str, Enum):
@@ -26,7 +27,12 @@ class User(BaseModel):
     @validator("address")
     @classmethod
     def checksum_address(cls, input: str):
-        return eth.to_checksum_address(input)
+        return to_checksum_address(input)
+
+    @property
+    def address_id(self) -> int:
+        """Id of the address in the `address_registry`"""
+        return address_id(self.address)
 
 
 class Staker(User):
@@ -42,9 +48,14 @@ class ARVStaker(Staker):
 
     token: ARV
 
-    def __init__(self, arv_holding: str, **kwargs):
+    def __init__(self, arv_holding: Union[int, str], **kwargs):
         super().__init__(token=ARV(amount=arv_holding), **kwargs)
 
+    @staticmethod
+    def trusted(address: EthereumAddress, token: ARV) -> ARVStaker:
+        """Build from an already validated address and token, see `reporter.models.trusted`"""
+        return trusted(ARVStaker, address=address, token=token)
+
 
 class PRVStaker(Staker):
     """
@@ -53,9 +64,14 @@ class PRVStaker(Staker):
 
     token: PRV
 
-    def __init__(self, prv_holding: str, **kwargs):
+    def __init__(self, prv_holding: Union[int, str], **kwargs):
         super().__init__(token=PRV(amount=prv_holding), **kwargs)
 
+    @staticmethod
+    def trusted(address: EthereumAddress, token: PRV) -> PRVStaker:
+        """Build from an already validated address and token, see `reporter.models.trusted`"""
+        return trusted(PRVStaker, address=address, token=token)
+
 
 class Account(Staker):
     """
@@ -69,14 +85,53 @@ class Account(Staker):
     state: AccountState
     notes: list[str] = []
 
+    class Config:
+        # accounts are changed by building a new one with `trusted_copy`, so unchanged accounts can be shared
+        allow_mutation = False
+
+    @staticmethod
+    def trusted(
+        address: EthereumAddress,
+        token: ERC20Amount,
+        rewards: ERC20Amount,
+        state: AccountState,
+        notes: Optional[list[str]] = None,
+    ) -> Account:
+        """Build from already validated fields, see `reporter.models.trusted`"""
+        return trusted(
+            Account,
+            address=address,
+            token=token,
+            rewards=rewards,
+            state=state,
+            notes=list(notes or []),
+        )
+
+    @staticmethod
+    def from_staker(
+        staker: Staker, rewards: ERC20Amount, state: AccountState
+    ) -> Account:
+        """
+        The staker was validated when it was created, so only its token is copied down to an `ERC20Amount`.
+        Each account gets its own copy of `rewards`.
+        """
+        t = staker.token
+        r = rewards
+        return Account.trusted(
+            address=staker.address,
+            token=ERC20Amount.trusted(t.address, t.symbol, t.decimals, t.amount),
+            rewards=ERC20Amount.trusted(r.address, r.symbol, r.decimals, r.amount),
+            state=state,
+        )
+
     @staticmethod
     def from_prv_staker(
         staker: PRVStaker, rewards: ERC20Amount, state: AccountState
     ) -> Account:
-        return Account(**staker.dict(), rewards=rewards, state=state)
+        return Account.from_staker(staker, rewards, state)
 
     @staticmethod
     def from_arv_staker(
         staker: ARVStaker, rewards: ERC20Amount, state: AccountState
     ) -> Account:
-        return Account(**staker.dict(), rewards=rewards, state=state)
+        return Account.from_staker(staker, rewards, state)
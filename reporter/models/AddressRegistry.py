@@ -0,0 +1,71 @@
+import threading
+from typing import Iterable, Union
+
+from reporter.models.types import EthereumAddress
+
+"""
+An address is checksummed with a keccak hash, and the same few addresses (the token contracts,
+every staker) pass through several models during a run. The registry checksums each address once
+and gives it a small integer id, which is also cheaper than the string to hash and compare.
+"""
+
+
+class AddressRegistry:
+    """
+    Every address seen by the process, checksummed once and numbered in the order first seen.
+    Any spelling of an address, lowercase or checksummed, maps to the same id.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._addresses: list[EthereumAddress] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def id_of(self, address: str) -> int:
+        """Id of `address`, raises ValueError if it is not a valid address"""
+        known = self._ids.get(address)
+        if known is not None:
+            return known
+
+        # eth_utils is slow to import, and only needed for addresses not seen before
+        import eth_utils
+
+        checksummed = eth_utils.to_checksum_address(address)
+        with self._lock:
+            i = self._ids.get(checksummed)
+            if i is None:
+                i = len(self._addresses)
+                self._addresses.append(checksummed)
+                self._ids[checksummed] = i
+            self._ids[address] = i
+        return i
+
+    def address(self, i: int) -> EthereumAddress:
+        """Checksummed address of id `i`"""
+        return self._addresses[i]
+
+    def checksum(self, address: str) -> EthereumAddress:
+        return self._addresses[self.id_of(address)]
+
+
+# one registry per process, so ids can be compared across models and tables
+address_registry = AddressRegistry()
+
+
+def address_id(address: str) -> int:
+    return address_registry.id_of(address)
+
+
+def address_ids(addresses: Union[str, Iterable[str]]) -> set[int]:
+    """Ids of `addresses`, a single address is treated as a list of one"""
+    if isinstance(addresses, str):
+        addresses = [addresses]
+    return {address_registry.id_of(a) for a in addresses}
+
+
+def to_checksum_address(address: str) -> EthereumAddress:
+    """`eth_utils.to_checksum_address`, computed once per address"""
+    return address_registry.checksum(address)
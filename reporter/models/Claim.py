@@ -3,10 +3,10 @@ from typing import Union
 from pydantic import BaseModel
 
 from reporter.models.Reward import ARVRewardSummary, PRVRewardSummary
-from reporter.models.types import BigNumber, EthereumAddress
+from reporter.models.types import AmountModel, BigNumber, EthereumAddress
 
 
-class ClaimsRecipient(BaseModel):
+class ClaimsRecipient(AmountModel):
     """
     Minimal claim data for each recipient that will be used to generate the merkle tree
     :param `windowIndex`: distribution index, should be unique
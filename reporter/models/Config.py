@@ -1,8 +1,9 @@
-from typing import Any
+from typing import Any, Union
 from decimal import Decimal
 from pydantic import BaseModel, parse_obj_as, validator
 from reporter.errors import BadConfigException
 from reporter.models.ERC20 import ERC20Amount
+from reporter.models.types import BigNumber
 from reporter.models.Redistribution import (
     ERROR_MESSAGES,
     RedistributionOption,
@@ -30,13 +31,11 @@ class InputConfig(BaseModel):
     redistributions: list[RedistributionWeight] = []
     arv_percentage: int = 70
 
-    def reward_token(self, amount: str = "0") -> ERC20Amount:
+    def reward_token(self, amount: Union[int, str] = 0) -> ERC20Amount:
         """
         Creates a reward token with the passed amount - will default to zero
         """
-        config_token = ERC20Amount(**self.rewards.dict())
-        config_token.amount = amount
-        return config_token
+        return self.rewards.copy(update={"amount": BigNumber.validate(amount)})
 
     @validator("arv_percentage")
     @classmethod
@@ -110,17 +109,17 @@ class Config(InputConfig):
 
     @property
     def arv_rewards(self) -> int:
-        return int((int(self.rewards.amount) * self.arv_percentage) / 100)
+        return int((self.rewards.amount * self.arv_percentage) / 100)
 
     @property
     def prv_rewards(self) -> int:
         prv_percentage = 100 - self.arv_percentage
-        return int((int(self.rewards.amount) * prv_percentage) / 100)
+        return int((self.rewards.amount * prv_percentage) / 100)
 
     @property
     def arv_erc20(self) -> ERC20Amount:
-        return self.reward_token(str(self.arv_rewards))
+        return self.reward_token(self.arv_rewards)
 
     @property
     def prv_erc20(self) -> ERC20Amount:
-        return self.reward_token(str(self.prv_rewards))
+        return self.reward_token(self.prv_rewards)
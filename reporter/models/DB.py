@@ -1,6 +1,5 @@
 import os
-from typing import Optional
-from decimal import Decimal
+from typing import Iterator, Optional, Union, cast
 from tinydb import TinyDB, where
 from utils import write_json
 from reporter.models import (
@@ -15,6 +14,9 @@ from reporter.models import (
     RewardSummary,
     Proposal,
     Config,
+    ERC20Metadata,
+    EthereumAddress,
+    StakerTable,
 )
 from reporter.errors import MissingSummaryError
 
@@ -48,16 +50,19 @@ class DB(TinyDB):
 
     def write_distribution(
         self,
-        distribution: list[Account],
+        distribution: Union[list[Account], StakerTable],
         token_name: AUXO_TOKEN_NAMES,
     ):
-        self.table(f"{token_name}_distribution").insert_multiple(
-            [d.dict() for d in distribution]
+        rows = (
+            distribution.dicts()
+            if isinstance(distribution, StakerTable)
+            else (d.dict() for d in distribution)
         )
+        self.table(f"{token_name}_distribution").insert_multiple(rows)
 
     def write_arv_stats(
         self,
-        stakers: list[ARVStaker],
+        stakers: Union[list[ARVStaker], StakerTable],
         votes: list[Vote],
         proposals: list[Proposal],
         voters: list[str],
@@ -67,9 +72,9 @@ class DB(TinyDB):
     ):
         self.table("ARV_stats").insert(
             {
-                "stakers": len([s.dict() for s in stakers]),
-                "votes": len([v.dict() for v in votes]),
-                "proposals": len([p.dict() for p in proposals]),
+                "stakers": len(stakers),
+                "votes": len(votes),
+                "proposals": len(proposals),
                 "voters": len(voters),
                 "non_voters": len(non_voters),
                 "rewards": rewards.dict(),
@@ -104,21 +109,51 @@ class DB(TinyDB):
                 raise MissingSummaryError("PRV Summary not found")
             return self.prv_summary
 
-    def build_claims(self, token_name: AUXO_TOKEN_NAMES):
-        distribution = self.table(f"{token_name}_distribution")
-
-        rewards_accounts = distribution.search(
-            where("rewards")["amount"].map(Decimal) > Decimal(0)
+    def rewarded_accounts(
+        self,
+        token_name: AUXO_TOKEN_NAMES,
+        distribution: Optional[Union[list[Account], StakerTable]] = None,
+    ) -> Iterator[tuple[EthereumAddress, int, EthereumAddress]]:
+        """
+        (address, rewards, reward token) of every account with rewards
+        :param `distribution`: the distribution just written, read back from the DB if not passed
+        """
+        if distribution is None:
+            rows = self.table(f"{token_name}_distribution").search(
+                where("rewards")["amount"].map(int) > 0
+            )
+            return (
+                (r["address"], int(r["rewards"]["amount"]), r["rewards"]["address"])
+                for r in rows
+            )
+        if isinstance(distribution, StakerTable):
+            token = cast(ERC20Metadata, distribution.reward_token).address
+            return (
+                (distribution.address(i), amount, token)
+                for i, amount in enumerate(distribution.rewards)
+                if amount > 0
+            )
+        return (
+            (a.address, a.rewards.amount, a.rewards.address)
+            for a in distribution
+            if a.rewards.amount > 0
         )
 
+    def build_claims(
+        self,
+        token_name: AUXO_TOKEN_NAMES,
+        distribution: Optional[Union[list[Account], StakerTable]] = None,
+    ):
         recipients = {
-            ra["address"]: ClaimsRecipient(
+            address: ClaimsRecipient(
                 windowIndex=self.config.distribution_window,
                 accountIndex=idx,
-                rewards=ra["rewards"]["amount"],
-                token=ra["rewards"]["address"],
+                rewards=amount,
+                token=token,
             ).dict()
-            for idx, ra in enumerate(rewards_accounts)
+            for idx, (address, amount, token) in enumerate(
+                self.rewarded_accounts(token_name, distribution)
+            )
         }
         claims = {
             "windowIndex": self.config.distribution_window,
@@ -132,7 +167,9 @@ class DB(TinyDB):
         )
 
     def write_claims_and_distribution(
-        self, distribution: list[Account], token_name: AUXO_TOKEN_NAMES
+        self,
+        distribution: Union[list[Account], StakerTable],
+        token_name: AUXO_TOKEN_NAMES,
     ):
         self.write_distribution(distribution, token_name)
-        self.build_claims(token_name)
+        self.build_claims(token_name, distribution)
@@ -2,16 +2,17 @@ from __future__ import annotations
 
 from typing import Literal, Optional, Union
 
-import eth_utils as eth
-from pydantic import BaseModel, validator
+from pydantic import validator
 
 from reporter.env import ADDRESSES
-from reporter.models.types import BigNumber, EthereumAddress
+from reporter.models.AddressRegistry import to_checksum_address
+from reporter.models.trusted import trusted
+from reporter.models.types import AmountModel, BigNumber, EthereumAddress
 
 AUXO_TOKEN_NAMES = Union[Literal["ARV"], Literal["PRV"]]
 
 
-class BaseERC20(BaseModel):
+class BaseERC20(AmountModel):
     """Simply holds the token address alongside an identifier"""
 
     address: EthereumAddress
@@ -20,7 +21,7 @@ class BaseERC20(BaseModel):
     @validator("address")
     @classmethod
     def checksum_token(cls, addr: EthereumAddress):
-        return eth.to_checksum_address(addr)
+        return to_checksum_address(addr)
 
 
 class ERC20Metadata(BaseERC20):
@@ -29,13 +30,33 @@ class ERC20Metadata(BaseERC20):
     decimals: int
 
 
+class ERC20Snapshot(ERC20Metadata):
+    """Token metadata along with the total supply at a given block"""
+
+    name: str
+    total_supply: BigNumber
+
+
 class ERC20Amount(ERC20Metadata):
     """Adds the amount of tokens held by the user"""
 
     amount: BigNumber
 
-
-class Lock(BaseModel):
+    @staticmethod
+    def trusted(
+        address: EthereumAddress, symbol: str, decimals: int, amount: int
+    ) -> ERC20Amount:
+        """Build from already validated fields, see `reporter.models.trusted`"""
+        return trusted(
+            ERC20Amount,
+            address=address,
+            symbol=symbol,
+            decimals=decimals,
+            amount=amount,
+        )
+
+
+class Lock(AmountModel):
     amount: BigNumber
     lockDuration: int
     lockedAt: int
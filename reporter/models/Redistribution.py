@@ -3,7 +3,7 @@ from enum import Enum
 from pydantic import validator, root_validator, BaseModel
 from decimal import Decimal
 
-from reporter.models.types import EthereumAddress, BigNumber
+from reporter.models.types import AmountModel, EthereumAddress, BigNumber
 from reporter.errors import BadConfigException
 
 
@@ -25,7 +25,7 @@ class RedistributionOption(str, Enum):
 
 
 # params
-class RedistributionWeight(BaseModel):
+class RedistributionWeight(AmountModel):
     """
     PRV gets a fixed allocation but some stakers will be inactive,
     this class determines how to redistribute rewards accrued by inactive stakers.
@@ -45,7 +45,7 @@ class RedistributionWeight(BaseModel):
     option: RedistributionOption
 
     distributed: bool = False
-    rewards: BigNumber = "0"
+    rewards: BigNumber = 0
 
     @validator("option")
     @classmethod
@@ -69,7 +69,7 @@ class RedistributionWeight(BaseModel):
         """
         normalized_weight = self.weight / total_weights
         decimal_reward = reward * Decimal(normalized_weight)
-        self.rewards = str(int(decimal_reward))
+        self.rewards = int(decimal_reward)
         self.distributed = True
 
 
@@ -97,29 +97,29 @@ class RedistributionContainer(BaseModel):
         self.distributed = True
 
     @property
-    def transferred(self) -> Decimal:
+    def transferred(self) -> int:
         """
         Fetches quantity of rewards transferred to a specific addresses
         """
         if not self.distributed:
-            return Decimal(0)
+            return 0
 
-        transferred = Decimal(0)
-        for r in self.redistributions:
-            if r.option == RedistributionOption.TRANSFER:
-                transferred += Decimal(r.rewards)
-        return transferred
+        return sum(
+            r.rewards
+            for r in self.redistributions
+            if r.option == RedistributionOption.TRANSFER
+        )
 
     @property
-    def to_stakers(self) -> Decimal:
+    def to_stakers(self) -> int:
         """
         Fetches quantity of rewards transferred evenly amongst active stakers
         """
         if not self.distributed:
-            return Decimal(0)
+            return 0
 
-        to_stakers = Decimal(0)
-        for r in self.redistributions:
-            if r.option == RedistributionOption.REDISTRIBUTE_PRV:
-                to_stakers += Decimal(r.rewards)
-        return to_stakers
+        return sum(
+            r.rewards
+            for r in self.redistributions
+            if r.option == RedistributionOption.REDISTRIBUTE_PRV
+        )
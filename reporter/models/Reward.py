@@ -1,13 +1,12 @@
 from __future__ import annotations
 from typing import Optional
-from decimal import Decimal
-from pydantic import validator, BaseModel
+from pydantic import validator
 
-from reporter.models.types import BigNumber
+from reporter.models.types import AmountModel, BigNumber
 from reporter.models.ERC20 import ERC20Amount
 
 
-class TokenSummaryStats(BaseModel):
+class TokenSummaryStats(AmountModel):
     """
     Summarizes Token positions for active and inactive statuses
     :param `total`: total Tokens in circulation at block number
@@ -29,7 +28,8 @@ class RewardSummary(ERC20Amount):
     For fractional reward tokens, we preserve the fraction up to 18 decimal points.
     """
 
-    pro_rata: BigNumber
+    # a fraction of the reward token per staked token, rather than an amount
+    pro_rata: str
 
     @validator("pro_rata")
     @classmethod
@@ -43,22 +43,22 @@ class RewardSummary(ERC20Amount):
 class ARVRewardSummary(RewardSummary):
     @staticmethod
     def from_existing(summary: RewardSummary) -> ARVRewardSummary:
-        return ARVRewardSummary(**summary.dict())
+        return ARVRewardSummary(**dict(summary))
 
 
 class PRVRewardSummary(RewardSummary):
-    redistributed_total: BigNumber = "0"
-    redistributed_to_stakers: BigNumber = "0"
-    redistributed_transferred: BigNumber = "0"
+    redistributed_total: BigNumber = 0
+    redistributed_to_stakers: BigNumber = 0
+    redistributed_transferred: BigNumber = 0
 
     @staticmethod
     def from_existing(summary: RewardSummary) -> PRVRewardSummary:
-        return PRVRewardSummary(**summary.dict())
+        return PRVRewardSummary(**dict(summary))
 
-    def add_redistribution_data(self, to_stakers: Decimal, to_transfer: Decimal):
-        self.redistributed_to_stakers = str(int(to_stakers))
-        self.redistributed_transferred = str(int(to_transfer))
-        self.redistributed_total = str(int(to_stakers + to_transfer))
+    def add_redistribution_data(self, to_stakers: int, to_transfer: int):
+        self.redistributed_to_stakers = to_stakers
+        self.redistributed_transferred = to_transfer
+        self.redistributed_total = to_stakers + to_transfer
         # redistributions to stakers already included as part of the distribution rewards
         # so we don't want to double count them here.
-        self.amount = str(int(Decimal(self.amount)) + to_transfer)
+        self.amount = self.amount + to_transfer
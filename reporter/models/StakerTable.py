@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from array import array
+import dataclasses
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
+
+from reporter.models.Account import (
+    Account,
+    AccountState,
+    ARVStaker,
+    PRVStaker,
+    Staker,
+)
+from reporter.models.AddressRegistry import address_registry
+from reporter.models.ERC20 import ARV, PRV, ERC20Amount, ERC20Metadata, Lock
+from reporter.models.trusted import trusted
+from reporter.models.types import EthereumAddress
+from reporter.models.VoterIndex import VoterIndex, voter_ids
+
+"""
+Every staker as a nested model costs a few kilobytes: the token repeats its address, symbol and decimals,
+and each model is validated on creation and on every copy.
+`StakerTable` keeps the same data as one column per field, with the token metadata held once,
+and only builds the models, or the dicts they would serialize to, when asked.
+"""
+
+# codes of the `states` column
+STATE_CODES = {AccountState.INACTIVE: 0, AccountState.ACTIVE: 1}
+STATES = {code: state for state, code in STATE_CODES.items()}
+
+
+def _lock_fields(lock: Any) -> tuple[int, int, int]:
+    """(amount, lockedAt, lockDuration) of a `Lock`, or of a raw `lockOf` result"""
+    if isinstance(lock, Lock):
+        return lock.amount, lock.lockedAt, lock.lockDuration
+    return int(lock[0]), int(lock[1]), int(lock[2])
+
+
+@dataclass
+class StakerTable:
+    """
+    Columnar store of stakers, or of accounts once rewards have been added.
+    Row `i` of every column belongs to the same staker.
+
+    :param `token`: metadata of the staked token, shared by every row
+    :param `address_ids`: id of each address in the `address_registry`
+    :param `amounts`: balance used for rewards, the boosted balance for ARV
+    :param `non_decayed_amounts`: ARV balance before the boost, None if not known
+    :param `lock_amounts`: amount of the ARV lock, None for stakers without a lock
+    :param `states`: one `STATE_CODES` entry per row
+    :param `reward_token`: set once the table holds accounts, metadata of the reward token
+    :param `notes`: notes of the rows that have any, by row
+    """
+
+    token: ERC20Metadata
+    address_ids: array = field(default_factory=lambda: array("L"))
+    amounts: list[int] = field(default_factory=list)
+    non_decayed_amounts: list[Optional[int]] = field(default_factory=list)
+    lock_amounts: list[Optional[int]] = field(default_factory=list)
+    locked_at: array = field(default_factory=lambda: array("q"))
+    lock_durations: array = field(default_factory=lambda: array("q"))
+    states: bytearray = field(default_factory=bytearray)
+    reward_token: Optional[ERC20Metadata] = None
+    rewards: list[int] = field(default_factory=list)
+    notes: dict[int, list[str]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def is_arv(self) -> bool:
+        return self.token.symbol == "ARV"
+
+    @property
+    def has_rewards(self) -> bool:
+        return self.reward_token is not None
+
+    @staticmethod
+    def from_stakers(
+        stakers: Sequence[Staker], token: Optional[ERC20Metadata] = None
+    ) -> StakerTable:
+        """
+        Build a table from `ARVStaker`s, `PRVStaker`s or `Account`s, which must all hold the same token.
+        Accounts keep their state, rewards and notes.
+
+        :param `token`: staked token, only needed if `stakers` may be empty
+        """
+        if token is None:
+            if not stakers:
+                raise ValueError("Pass the token to build an empty StakerTable")
+            token = stakers[0].token
+        # only the metadata, not the amount of whichever token was passed
+        token = ERC20Metadata(**token.dict())
+
+        table = StakerTable(token=token)
+        for s in stakers:
+            if s.token.symbol != token.symbol:
+                raise ValueError(
+                    f"Staker {s.address} holds {s.token.symbol}, expected {token.symbol}"
+                )
+            lock = getattr(s.token, "lock", None)
+            non_decayed = getattr(s.token, "non_decayed_amount", None)
+            lock_amount, locked_at, duration = (
+                (None, 0, 0) if lock is None else _lock_fields(lock)
+            )
+
+            table.address_ids.append(s.address_id)
+            table.amounts.append(s.token.amount)
+            table.non_decayed_amounts.append(non_decayed)
+            table.lock_amounts.append(lock_amount)
+            table.locked_at.append(locked_at)
+            table.lock_durations.append(duration)
+
+            if isinstance(s, Account):
+                table.reward_token = table.reward_token or ERC20Metadata(
+                    **s.rewards.dict()
+                )
+                table.rewards.append(s.rewards.amount)
+                table.states.append(STATE_CODES[s.state])
+                if s.notes:
+                    table.notes[len(table) - 1] = list(s.notes)
+            else:
+                table.states.append(STATE_CODES[AccountState.INACTIVE])
+        return table
+
+    def copy(self) -> StakerTable:
+        """Copy of every column, so the copy can be changed without touching this table"""
+        return StakerTable(
+            token=self.token,
+            address_ids=array("L", self.address_ids),
+            amounts=list(self.amounts),
+            non_decayed_amounts=list(self.non_decayed_amounts),
+            lock_amounts=list(self.lock_amounts),
+            locked_at=array("q", self.locked_at),
+            lock_durations=array("q", self.lock_durations),
+            states=bytearray(self.states),
+            reward_token=self.reward_token,
+            rewards=list(self.rewards),
+            notes={i: list(n) for i, n in self.notes.items()},
+        )
+
+    def replace(self, **columns: Any) -> StakerTable:
+        """
+        Table sharing every column with this one apart from `columns`.
+        Shared columns must be replaced rather than changed in place, as `set_states` and `init_rewards` do.
+        """
+        return dataclasses.replace(self, **columns)
+
+    def address(self, i: int) -> EthereumAddress:
+        return address_registry.address(self.address_ids[i])
+
+    @property
+    def addresses(self) -> list[EthereumAddress]:
+        return [self.address(i) for i in range(len(self))]
+
+    def state(self, i: int) -> AccountState:
+        return STATES[self.states[i]]
+
+    def set_states(
+        self, active: Union[VoterIndex, str, Iterable[EthereumAddress]]
+    ) -> None:
+        """Mark the rows in `active` as active and every other row as inactive"""
+        active_ids = voter_ids(active)
+        active_code = STATE_CODES[AccountState.ACTIVE]
+        inactive_code = STATE_CODES[AccountState.INACTIVE]
+        self.states = bytearray(
+            active_code if a in active_ids else inactive_code for a in self.address_ids
+        )
+
+    def init_rewards(self, reward_token: ERC20Metadata) -> None:
+        """Turn the stakers into accounts, with no rewards yet"""
+        self.reward_token = ERC20Metadata(**reward_token.dict())
+        self.rewards = [0] * len(self)
+        self.notes = {}
+
+    def total(self, state: Optional[AccountState] = None) -> int:
+        """Sum of `amounts`, over the rows in `state` if passed"""
+        if state is None:
+            return sum(self.amounts)
+        code = STATE_CODES[state]
+        return sum(a for a, s in zip(self.amounts, self.states) if s == code)
+
+    def add_note(self, i: int, note: str) -> None:
+        self.notes.setdefault(i, []).append(note)
+
+    def _token_dict(
+        self,
+        i: int,
+        full: bool,
+        meta: Optional[dict[str, Any]] = None,
+        as_str: bool = True,
+    ) -> dict[str, Any]:
+        """
+        :param `as_str`: amounts as decimal strings, as written to the reports, ints otherwise
+        """
+        amount: Callable[[int], Any] = str if as_str else int
+        token: dict[str, Any] = {
+            **(meta or self.token.dict()),
+            "amount": amount(self.amounts[i]),
+        }
+        if full and self.is_arv:
+            non_decayed = self.non_decayed_amounts[i]
+            lock_amount = self.lock_amounts[i]
+            token["non_decayed_amount"] = (
+                None if non_decayed is None else amount(non_decayed)
+            )
+            token["lock"] = (
+                None
+                if lock_amount is None
+                else {
+                    "amount": amount(lock_amount),
+                    "lockDuration": self.lock_durations[i],
+                    "lockedAt": self.locked_at[i],
+                }
+            )
+        return token
+
+    def staker_dict(
+        self, i: int, meta: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        """
+        Row `i` as `ARVStaker.dict()` or `PRVStaker.dict()` would return it
+        :param `meta`: `token.dict()`, when building many rows
+        """
+        return {
+            "address": self.address(i),
+            "token": self._token_dict(i, full=True, meta=meta),
+        }
+
+    def account_dict(
+        self,
+        i: int,
+        meta: Optional[dict[str, Any]] = None,
+        reward_meta: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """
+        Row `i` as `Account.dict()` would return it
+        :param `reward_meta`: `reward_token.dict()`, when building many rows
+        """
+        reward_token = cast(ERC20Metadata, self.reward_token)
+        return {
+            "address": self.address(i),
+            "token": self._token_dict(i, full=False, meta=meta),
+            "rewards": {
+                **(reward_meta or reward_token.dict()),
+                "amount": str(self.rewards[i]),
+            },
+            "state": self.state(i),
+            "notes": list(self.notes.get(i, [])),
+        }
+
+    def dicts(self) -> Iterator[dict[str, Any]]:
+        """Rows as accounts if rewards were added, as stakers otherwise, for the writers"""
+        meta = self.token.dict()
+        if self.reward_token is None:
+            return (self.staker_dict(i, meta) for i in range(len(self)))
+        reward_meta = self.reward_token.dict()
+        return (self.account_dict(i, meta, reward_meta) for i in range(len(self)))
+
+    def to_stakers(self) -> list[Union[ARVStaker, PRVStaker]]:
+        """Rows as models, without validation as the table is built from validated models"""
+        meta = self.token.dict()
+        stakers: list[Union[ARVStaker, PRVStaker]] = []
+        for i in range(len(self)):
+            token = self._token_dict(i, full=True, meta=meta, as_str=False)
+            if self.is_arv:
+                lock = token["lock"]
+                token["lock"] = None if lock is None else trusted(Lock, **lock)
+                stakers.append(
+                    ARVStaker.trusted(self.address(i), trusted(ARV, **token))
+                )
+            else:
+                stakers.append(
+                    PRVStaker.trusted(self.address(i), trusted(PRV, **token))
+                )
+        return stakers
+
+    def to_accounts(self) -> list[Account]:
+        if self.reward_token is None:
+            raise ValueError("No rewards were added to the table, use to_stakers")
+        meta = self.token.dict()
+        reward_meta = self.reward_token.dict()
+        return [
+            Account.trusted(
+                address=self.address(i),
+                token=ERC20Amount.trusted(**meta, amount=self.amounts[i]),
+                rewards=ERC20Amount.trusted(**reward_meta, amount=self.rewards[i]),
+                state=self.state(i),
+                notes=self.notes.get(i),
+            )
+            for i in range(len(self))
+        ]
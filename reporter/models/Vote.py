@@ -1,8 +1,9 @@
-from typing import Optional
+from typing import Optional, cast
 
-import eth_utils as eth
 from pydantic import BaseModel, validator
 
+from reporter.models.AddressRegistry import to_checksum_address
+from reporter.models.trusted import trusted
 from reporter.models.types import EthereumAddress, IDAddressDict
 
 
@@ -22,10 +23,36 @@ class Proposal(BaseModel):
     end: int
     choices: Optional[list[str]]
 
+    class Config:
+        # votes on the same proposal share one instance, see `reporter.queries.voters.ProposalTable`
+        copy_on_model_validation = "none"
+
     @validator("author")
     @classmethod
     def checksum_id(cls, _author: str) -> str:
-        return eth.to_checksum_address(_author)
+        return to_checksum_address(_author)
+
+    @staticmethod
+    def trusted(
+        id: str,
+        title: str,
+        author: EthereumAddress,
+        created: int,
+        start: int,
+        end: int,
+        choices: Optional[list[str]] = None,
+    ) -> "Proposal":
+        """Build from already validated fields, see `reporter.models.trusted`"""
+        return trusted(
+            Proposal,
+            id=id,
+            title=title,
+            author=author,
+            created=created,
+            start=start,
+            end=end,
+            choices=choices,
+        )
 
 
 class Vote(BaseModel):
@@ -47,7 +74,16 @@ class Vote(BaseModel):
     @validator("voter")
     @classmethod
     def checksum_id(cls, _voter: str) -> str:
-        return eth.to_checksum_address(_voter)
+        return to_checksum_address(_voter)
+
+    @staticmethod
+    def trusted(
+        voter: EthereumAddress, choice: int, created: int, proposal: Proposal
+    ) -> "Vote":
+        """Build from already validated fields, see `reporter.models.trusted`"""
+        return trusted(
+            Vote, voter=voter, choice=choice, created=created, proposal=proposal
+        )
 
 
 class OnChainProposal(BaseModel):
@@ -64,24 +100,29 @@ class OnChainProposal(BaseModel):
     proposer: IDAddressDict
     proposalCreated: list
 
+    class Config:
+        copy_on_model_validation = "none"
+
     @validator("proposer")
     @classmethod
     def checksum_id(cls, _proposerDict: IDAddressDict) -> str:
-        return eth.to_checksum_address(_proposerDict["id"])
+        return to_checksum_address(_proposerDict["id"])
 
     @validator("proposalCreated")
     @classmethod
     def flatten_proposal(cls, created: list) -> int:
-        return created[0]["timestamp"]
+        # the subgraph returns the timestamp as a string
+        return int(created[0]["timestamp"])
 
     def coerce_to_proposal(self) -> Proposal:
-        return Proposal(
+        # the validators have already flattened the proposer and creation time
+        return Proposal.trusted(
             id=self.id,
             title=self.description,
-            author=self.proposer,
+            author=cast(str, self.proposer),
             start=self.startBlock,
             end=self.endBlock,
-            created=self.proposalCreated,
+            created=cast(int, self.proposalCreated),
             choices=None,
         )
 
@@ -112,19 +153,22 @@ class OnChainVote(BaseModel):
     @validator("governor")
     @classmethod
     def flatten_governor(cls, governor: IDAddressDict) -> EthereumAddress:
-        return eth.to_checksum_address(governor["id"])
+        return to_checksum_address(governor["id"])
 
     @validator("voter")
     @classmethod
     def flatten_voter(cls, voter: IDAddressDict) -> EthereumAddress:
-        return eth.to_checksum_address(voter["id"])
-
-    def coerce_to_vote(self) -> Vote:
-        return Vote(
-            voter=self.voter,
-            choice=self.support,
+        return to_checksum_address(voter["id"])
+
+    def coerce_to_vote(self, proposal: Optional[Proposal] = None) -> Vote:
+        """
+        :param `proposal`: the coerced `self.proposal`, if it has already been built for another vote
+        """
+        return Vote.trusted(
+            voter=cast(str, self.voter),
+            choice=cast(int, self.support),
             created=self.timestamp,
-            proposal=self.proposal.coerce_to_proposal(),
+            proposal=proposal or self.proposal.coerce_to_proposal(),
         )
 
 
@@ -140,9 +184,9 @@ class Delegate(BaseModel):
     @validator("delegator")
     @classmethod
     def checksum_delegator(cls, d: str) -> str:
-        return eth.to_checksum_address(d)
+        return to_checksum_address(d)
 
     @validator("delegate")
     @classmethod
     def checksum_delegate(cls, d: str) -> str:
-        return eth.to_checksum_address(d)
+        return to_checksum_address(d)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Union
+
+from reporter.models.AddressRegistry import address_ids, address_registry
+from reporter.models.types import EthereumAddress
+
+
+@dataclass
+class VoterIndex:
+    """
+    Stakers split into those that voted this month and those that did not,
+    built in one pass by `reporter.queries.voters.classify_voters`.
+    Both lists keep the order the stakers were classified in, without duplicates.
+
+    :param `voted`: addresses that voted, or whose delegate voted
+    :param `not_voted`: every other address
+    :param `voted_ids`: `address_registry` ids of `voted`, to test membership
+    """
+
+    voted: list[EthereumAddress] = field(default_factory=list)
+    not_voted: list[EthereumAddress] = field(default_factory=list)
+    voted_ids: set[int] = field(default_factory=set)
+    _seen: set[int] = field(default_factory=set, repr=False, compare=False)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, address: object) -> bool:
+        return (
+            isinstance(address, str)
+            and address_registry.id_of(address) in self.voted_ids
+        )
+
+    def add(self, i: int, voted: bool) -> None:
+        """Classify the address with registry id `i`, if it has not been already"""
+        if i in self._seen:
+            return
+        self._seen.add(i)
+        if voted:
+            self.voted_ids.add(i)
+            self.voted.append(address_registry.address(i))
+        else:
+            self.not_voted.append(address_registry.address(i))
+
+
+def voter_ids(voters: Union[VoterIndex, str, Iterable[EthereumAddress]]) -> set[int]:
+    """Registry ids of `voters`, taken from the index rather than looked up again if there is one"""
+    if isinstance(voters, VoterIndex):
+        return voters.voted_ids
+    return address_ids(voters)
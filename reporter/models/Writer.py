@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import Any
 
 from reporter.models.Config import Config
+from reporter.models.StakerTable import StakerTable
 
 
 @dataclass
@@ -89,6 +90,8 @@ class Writer:
             json.dump(data, f, indent=4)
 
     def to_csv_and_json(self, data, name: str) -> None:
+        if isinstance(data, StakerTable):
+            data = list(data.dicts())
         if isinstance(data, list):
             csv_data = self.flatten_json_array(data)
             if len(csv_data) > 0:
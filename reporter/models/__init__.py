@@ -6,13 +6,27 @@ and a couple of pydantic helpers.
 Use these in your code as python objects, then serialize to json by converting to a dict with `.dict()`
 """
 
+from reporter.models.AddressRegistry import *
 from reporter.models.Account import *
 from reporter.models.Claim import *
 from reporter.models.Config import *
 from reporter.models.ERC20 import *
 from reporter.models.Redistribution import *
 from reporter.models.Reward import *
+from reporter.models.StakerTable import *
+from reporter.models.trusted import *
 from reporter.models.types import *
 from reporter.models.Vote import *
+from reporter.models.VoterIndex import *
 from reporter.models.Writer import *
-from reporter.models.DB import DB
+
+
+def __getattr__(name: str):
+    # `DB` pulls in tinydb, which only the report writers need
+    if name == "DB":
+        from reporter.models.DB import DB
+
+        # importing the submodule set `DB` to the module itself, point it at the class
+        globals()["DB"] = DB
+        return DB
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,46 @@
+from typing import Any, Type, TypeVar
+
+from pydantic import BaseModel, validate_model
+
+from reporter import env
+
+"""
+Models built from data that has already been validated, such as an `Account` built from an `ARVStaker`,
+do not need their validators to run again. `trusted` builds them with `construct`,
+and the typed `trusted` constructors on each model keep the fields checked by mypy.
+
+Set `VALIDATE_MODELS=TRUE` to run the full validation on every trusted construction,
+to find a fast path that is passed bad data.
+"""
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def trusted(cls: Type[M], **values: Any) -> M:
+    """
+    Build `cls` from already validated `values`, without running its validators
+    or its `__init__`, unless `VALIDATE_MODELS` is set
+    """
+    if env.VALIDATE_MODELS:
+        validated, fields_set, error = validate_model(cls, values)
+        if error:
+            raise error
+        return cls.construct(_fields_set=fields_set, **validated)
+    return cls.construct(**values)
+
+
+def trusted_copy(model: M, **update: Any) -> M:
+    """
+    Shallow copy of `model` with the fields in `update` replaced.
+    Nested models are shared with the original, so replace them rather than changing them in place.
+    """
+    if env.VALIDATE_MODELS:
+        return trusted(type(model), **{**dict(model), **update})
+    if model.__private_attributes__:
+        return model.copy(update=update)
+
+    # what `copy` does, without walking the fields to build the values first
+    copy = type(model).__new__(type(model))
+    object.__setattr__(copy, "__dict__", {**model.__dict__, **update})
+    object.__setattr__(copy, "__fields_set__", model.__fields_set__ | update.keys())
+    return copy
@@ -1,7 +1,57 @@
-from typing import Literal, Any
+import functools
+from decimal import Decimal
+from typing import Literal, Any, Type
+
+from pydantic import BaseModel
 
 # type aliases for clarity
 EthereumAddress = str
-BigNumber = str
 IDAddressDict = dict[Literal["id"], EthereumAddress]
 GraphQL_Response = dict[Literal["data"], Any]
+
+
+class BigNumber(int):
+    """
+    Token quantity in the smallest unit of the token.
+    Held as an `int` so rewards can be computed without parsing strings back,
+    and written out as a decimal string by `AmountModel.dict`.
+    Reads ints, whole `Decimal`s and decimal strings.
+    """
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v: Any) -> int:
+        if isinstance(v, bool):
+            raise TypeError("expected an amount, not a bool")
+        if isinstance(v, int):
+            return int(v)
+        if isinstance(v, str):
+            return int(v)
+        if isinstance(v, Decimal):
+            if v != v.to_integral_value():
+                raise ValueError(f"{v} is not a whole number of token units")
+            return int(v)
+        raise TypeError(f"expected an amount, got {type(v).__name__}")
+
+
+@functools.lru_cache(maxsize=None)
+def amount_fields(cls: Type[BaseModel]) -> tuple[str, ...]:
+    """Names of the `BigNumber` fields of `cls`"""
+    return tuple(n for n, f in cls.__fields__.items() if f.type_ is BigNumber)
+
+
+class AmountModel(BaseModel):
+    """
+    Base for models with `BigNumber` fields.
+    `.dict()` gives the amounts as decimal strings, the way they are written to the reports.
+    """
+
+    def dict(self, **kwargs) -> dict[str, Any]:  # type: ignore[override]
+        d = super().dict(**kwargs)
+        for name in amount_fields(type(self)):
+            if d.get(name) is not None:
+                d[name] = str(d[name])
+        return d
@@ -1,5 +1,10 @@
+from reporter.queries.cache import *
+from reporter.queries.rpc_cache import *
 from reporter.queries.common import *
+from reporter.queries.chunked_multicall import *
+from reporter.queries.chain_reader import *
 from reporter.queries.total_supply import *
 from reporter.queries.voters import *
 from reporter.queries.prv_stakers import *
 from reporter.queries.arv_stakers import *
+from reporter.queries.sources import *
@@ -1,10 +1,32 @@
-from typing import Any, Union, cast
-from multicall import Call, Multicall  # type: ignore
+from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Optional, Union, cast
+
+from reporter import env
 from reporter.env import ADDRESSES
 from reporter.errors import MissingBoostBalanceException
-from reporter.models import Config, EthereumAddress, ARVStaker, ARV, Lock
-from reporter.queries import get_token_hodlers, w3
+from reporter.models import (
+    ARV,
+    ARVStaker,
+    Config,
+    EthereumAddress,
+    Lock,
+    to_checksum_address,
+)
+from reporter.queries import (
+    chain_reader,
+    get_block_timestamp,
+    get_token_hodlers,
+    stream_token_hodlers,
+)
+from reporter.queries.decay import (
+    DECAY_VERIFY_FRACTION,
+    compute_boosted_balances,
+    verify_boosted_balances,
+)
+
+if TYPE_CHECKING:
+    from multicall import Call  # type: ignore
 
 """
 ARV Stakers get their total balance from the DecayOracle. 
@@ -14,26 +36,38 @@ as well as their decayed/boosted balance, which is what we use to calculate rewa
 """
 
 
-def get_arv_stakers(conf: Config) -> list[ARVStaker]:
+def get_arv_stakers(
+    conf: Config, holders: Optional[list[Any]] = None
+) -> list[ARVStaker]:
     """
     Fetch the list of ARV token holders at the given block number
+    :param `holders`: already fetched results of `get_token_hodlers`, if available
+    """
+    arv: list[Any] = (
+        get_token_hodlers(conf, ADDRESSES.ARV) if holders is None else holders
+    )
+    return [to_arv_staker(v) for v in arv]
+
+
+def stream_arv_stakers(conf: Config) -> Iterator[ARVStaker]:
+    """
+    Streaming version of `get_arv_stakers`, yields each staker as its page arrives
     """
-    arv: list[Any] = get_token_hodlers(conf, ADDRESSES.ARV)
-    return [ARVStaker(v["valueExact"], address=v["account"]["id"]) for v in arv]
+    for v in stream_token_hodlers(conf, ADDRESSES.ARV):
+        yield to_arv_staker(v)
+
+
+def to_arv_staker(holder: Any) -> ARVStaker:
+    return ARVStaker(holder["valueExact"], address=holder["account"]["id"])
 
 
 MulticallReturnBoost = dict[EthereumAddress, Union[int, str]]
 
 
-def get_boosted_lock(
-    stakers: list[ARVStaker],
-    block_number: int,
-) -> MulticallReturnBoost:
-    """
-    Multicall out to the DecayOracle to fetch the boosted/decayed balance of ARV for each address
-    """
+def boosted_lock_calls(stakers: list[ARVStaker]) -> list[Call]:
+    from multicall import Call
 
-    calls = [
+    return [
         Call(
             # address to call:
             ADDRESSES.DECAY_ORACLE,  # this needs to be the oracle address
@@ -45,8 +79,17 @@ def get_boosted_lock(
         for s in stakers
     ]
 
-    # Immediately execute the multicall
-    return Multicall(calls, _w3=w3, block_id=block_number)()
+
+def get_boosted_lock(
+    stakers: list[ARVStaker],
+    block_number: int,
+) -> MulticallReturnBoost:
+    """
+    Multicall out to the DecayOracle to fetch the boosted/decayed balance of ARV for each address
+    """
+
+    # Immediately execute the multicall, in chunks
+    return chain_reader(boosted_lock_calls(stakers), block_number)
 
 
 def apply_boost(
@@ -71,7 +114,7 @@ def apply_boost(
 
         # store original amount for reference
         cast(ARV, s.token).non_decayed_amount = s.token.amount
-        s.token.amount = str(boosted_balance)
+        s.token.amount = int(boosted_balance)
         new_stakers.append(s)
 
     return new_stakers
@@ -85,53 +128,193 @@ def to_lock(lock) -> Lock:
     )
 
 
-def get_locks(
-    addresses: list[EthereumAddress], conf: Config
-) -> dict[EthereumAddress, Lock]:
+class ARVStakerReads(NamedTuple):
     """
-    return array of locks for a given list of stakers
+    Everything read on chain for a single ARV staker
+    :param `lock`: the staker's lock in the TokenLocker
+    :param `boosted_balance`: decayed balance from the DecayOracle, if requested
+    :param `prv_active_balance`: active balance in the RollStaker, if requested
     """
 
-    calls = [
-        Call(
-            # address to call:
-            ADDRESSES.TOKEN_LOCKER,
-            # signature + return value, with argument:
-            ["lockOf(address)((uint192,uint32,uint32))", s],
-            # return in a format of {[address]: (amount, lockedAt, lockDuration))}:
-            [[s, to_lock]],
+    lock: Lock
+    boosted_balance: Optional[Union[int, str]] = None
+    prv_active_balance: Optional[int] = None
+
+
+class ARVOnchainState(NamedTuple):
+    """
+    Results of `get_arv_onchain_state`
+    :param `stakers`: reads for each address
+    :param `prv_total_supply`: PRV supply at the block, if requested
+    """
+
+    stakers: dict[EthereumAddress, ARVStakerReads]
+    prv_total_supply: Optional[int] = None
+
+
+PRV_TOTAL_SUPPLY_KEY = "prvTotalSupply"
+
+
+def arv_onchain_calls(
+    addresses: list[EthereumAddress],
+    with_prv_balances: bool = False,
+    with_prv_supply: bool = False,
+    with_boost: bool = True,
+) -> list[Call]:
+    """Calls for `get_arv_onchain_state`, which takes the same arguments"""
+    from multicall import Call
+
+    # each result is keyed by (address, field), so all of them fit in a single dict
+    calls: list[Call] = []
+    for a in addresses:
+        calls.append(
+            Call(
+                ADDRESSES.TOKEN_LOCKER,
+                ["lockOf(address)((uint192,uint32,uint32))", a],
+                [[(a, "lock"), to_lock]],
+            )
         )
-        for s in addresses
-    ]
+        if with_boost:
+            calls.append(
+                Call(
+                    ADDRESSES.DECAY_ORACLE,
+                    ["balanceOf(address)(uint256)", a],
+                    [[(a, "boosted_balance"), None]],
+                )
+            )
+        if with_prv_balances:
+            calls.append(
+                Call(
+                    ADDRESSES.PRV_ROLLSTAKER,
+                    ["getActiveBalanceForUser(address)(uint256)", a],
+                    [[(a, "prv_active_balance"), None]],
+                )
+            )
+    if with_prv_supply:
+        calls.append(
+            Call(
+                ADDRESSES.PRV,
+                ["totalSupply()(uint256)"],
+                [[PRV_TOTAL_SUPPLY_KEY, None]],
+            )
+        )
+
+    return calls
 
-    # Immediately execute the multicall
-    return Multicall(calls, _w3=w3, block_id=conf.block_snapshot)()
 
+def to_arv_onchain_state(
+    addresses: list[EthereumAddress], results: dict[Any, Any]
+) -> ARVOnchainState:
+    return ARVOnchainState(
+        stakers={
+            a: ARVStakerReads(
+                lock=results[(a, "lock")],
+                boosted_balance=results.get((a, "boosted_balance")),
+                prv_active_balance=results.get((a, "prv_active_balance")),
+            )
+            for a in addresses
+        },
+        prv_total_supply=results.get(PRV_TOTAL_SUPPLY_KEY),
+    )
 
-def add_locks_to_stakers(stakers: list[ARVStaker], conf: Config) -> list[ARVStaker]:
+
+def get_arv_onchain_state(
+    addresses: list[EthereumAddress],
+    block_number: int,
+    with_prv_balances: bool = False,
+    with_prv_supply: bool = False,
+    with_boost: bool = True,
+) -> ARVOnchainState:
     """
-    For a given list of accounts, fetch the lock information from the TokenLocker contract
+    Read the lock and the boosted balance of every address in the same multicall,
+    rather than one full sweep for the locks and another for the balances.
+    The RollStaker balance of each address and the PRV supply can be added to the same calls.
+
+    :param `with_prv_balances`: also read `RollStaker.getActiveBalanceForUser`
+    :param `with_prv_supply`: also read PRV `totalSupply`
+    :param `with_boost`: read `DecayOracle.balanceOf`, skip it if the boost is computed locally
     """
+    calls = arv_onchain_calls(addresses, with_prv_balances, with_prv_supply, with_boost)
+    return to_arv_onchain_state(addresses, chain_reader(calls, block_number))
 
-    # get all the addresses
-    addresses = [s.address for s in stakers]
 
-    # get all the locks
-    locks = get_locks(addresses, conf)
+async def get_arv_onchain_state_async(
+    addresses: list[EthereumAddress],
+    block_number: int,
+    with_prv_balances: bool = False,
+    with_prv_supply: bool = False,
+    with_boost: bool = True,
+) -> ARVOnchainState:
+    """
+    Awaitable version of `get_arv_onchain_state`
+    """
+    calls = arv_onchain_calls(addresses, with_prv_balances, with_prv_supply, with_boost)
+    return to_arv_onchain_state(
+        addresses, await chain_reader.coroutine(calls, block_number)
+    )
+
 
-    # add the locks to the accounts
+def apply_onchain_state(
+    stakers: list[ARVStaker], reads: dict[EthereumAddress, ARVStakerReads]
+) -> list[ARVStaker]:
+    """
+    Add the lock to each staker, then apply the boost, from a single set of reads
+    """
     for s in stakers:
-        cast(ARV, s.token).lock = locks[s.address]
+        cast(ARV, s.token).lock = reads[s.address].lock
+
+    return apply_boost(stakers, {addr: r.boosted_balance for addr, r in reads.items()})
+
+
+def decay_stakers_locally(
+    stakers: list[ARVStaker],
+    config: Config,
+    verify_fraction: float = DECAY_VERIFY_FRACTION,
+) -> list[ARVStaker]:
+    """
+    Apply the boost from the locks already attached to the stakers,
+    then check a sample of the results against the DecayOracle
+    """
+    block = config.block_snapshot
+    boosted = compute_boosted_balances(stakers, get_block_timestamp(block))
+    verify_boosted_balances(
+        stakers,
+        boosted,
+        lambda sample: get_boosted_lock(sample, block),
+        fraction=verify_fraction,
+    )
+    return apply_boost(stakers, boosted)
 
-    return stakers
 
+def holder_addresses(holders: list[Any]) -> list[EthereumAddress]:
+    """Addresses of `get_token_hodlers` results, spelled as on the `ARVStaker`s built from them"""
+    return [to_checksum_address(h["account"]["id"]) for h in holders]
 
-def boost_stakers(stakers: list[ARVStaker], mock=False) -> list[ARVStaker]:
-    boost_data = get_boosted_lock(stakers, mock)
-    return apply_boost(stakers, boost_data)
 
+def get_arv_stakers_and_boost(
+    config: Config,
+    holders: Optional[list[Any]] = None,
+    local_decay: Optional[bool] = None,
+    onchain: Optional[ARVOnchainState] = None,
+) -> list[ARVStaker]:
+    """
+    :param `local_decay`: compute boosted balances from the locks rather than the DecayOracle,
+    defaults to `ARV_LOCAL_DECAY`
+    :param `onchain`: already read results of `get_arv_onchain_state` for the holders, if available.
+    They must include the boosted balances unless `local_decay` is set.
+    """
+    stakers = get_arv_stakers(config, holders)
+    addresses = [s.address for s in stakers]
+    if local_decay is None:
+        local_decay = env.ARV_LOCAL_DECAY
+
+    if not local_decay:
+        state = onchain or get_arv_onchain_state(addresses, config.block_snapshot)
+        return apply_onchain_state(stakers, state.stakers)
 
-def get_arv_stakers_and_boost(config: Config) -> list[ARVStaker]:
-    stakers = get_arv_stakers(config)
-    stakers_with_locks = add_locks_to_stakers(stakers, config)
-    return boost_stakers(stakers_with_locks, config.block_snapshot)
+    state = onchain or get_arv_onchain_state(
+        addresses, config.block_snapshot, with_boost=False
+    )
+    for s in stakers:
+        cast(ARV, s.token).lock = state.stakers[s.address].lock
+    return decay_stakers_locally(stakers, config)
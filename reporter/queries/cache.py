@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from reporter.models import Config
+
+"""
+Subgraph queries pinned to a block, or to a time window that has already closed,
+always return the same data. We store each page on disk so reruns of an epoch replay
+them instead of fetching everything again. Because every page is keyed by its own variables,
+including the pagination cursor, an interrupted run resumes from the first page it did not store.
+"""
+
+# default size cap for each cache directory
+CACHE_MAX_BYTES = 256 * 1024**2
+
+# time after a window closes before we trust the indexers to have caught up
+FINALITY_SECONDS = 60 * 60
+
+
+class DiskCache:
+    """
+    Content addressed store of JSON values, one file per key.
+    Reads refresh the file's modified time, and once the directory exceeds `max_bytes`
+    the least recently used entries are deleted.
+
+    :param `path`: directory to hold the cache, created on first write
+    :param `max_bytes`: size cap for the directory
+    """
+
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Hash any JSON serializable values into a cache key"""
+        encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        file = self._file(key)
+        try:
+            with open(file) as f:
+                value = json.load(f)
+            os.utime(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self._file(key)
+        encoded = json.dumps(value).encode()
+
+        # write then rename, so a killed run never leaves a partial entry behind
+        tmp = file.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(encoded)
+
+        with self._lock:
+            # an overwritten entry no longer counts towards the size
+            try:
+                replaced = file.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, file)
+
+            if self._size is None:
+                self._size = sum(f.stat().st_size for f in self.path.glob("*.json"))
+            else:
+                self._size += len(encoded) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until we are back under the cap"""
+        entries = sorted(
+            ((f.stat(), f) for f in self.path.glob("*.json")),
+            key=lambda entry: entry[0].st_mtime,
+        )
+        size = sum(stat.st_size for stat, _ in entries)
+        for stat, file in entries:
+            if size <= self.max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            size -= stat.st_size
+        self._size = size
+
+
+_caches: dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+
+
+def page_cache(conf: Config) -> DiskCache:
+    """
+    Shared cache of subgraph pages for the epoch, at `reports/<date>/cache/`
+    """
+    path = f"reports/{conf.date}/cache"
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = DiskCache(path)
+        return _caches[path]
+
+
+def window_cache(conf: Config) -> Optional[DiskCache]:
+    """
+    Page cache for queries over the epoch's time window,
+    only once the window has closed and the data can no longer change
+    """
+    if conf.end_timestamp + FINALITY_SECONDS < time.time():
+        return page_cache(conf)
+    return None
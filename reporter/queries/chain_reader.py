@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Optional, Protocol
+
+from reporter import env
+from reporter.errors import FailedCallsException
+from reporter.queries.cache import DiskCache
+from reporter.queries.chunked_multicall import (
+    ChunkTiming,
+    MulticallStats,
+    chunk_calls,
+    multicall_executor,
+)
+from reporter.queries.common import JSONClient
+from reporter.queries.rpc_cache import eth_call_cache, eth_call_cache_key
+
+if TYPE_CHECKING:
+    from multicall import Call  # type: ignore
+
+"""
+Multicall needs the Multicall3 contract to be deployed and the node to accept large eth_calls,
+which local forks and some archive nodes do not. The same calls can instead be sent one eth_call each,
+packed into JSON-RPC batch requests. `ChainReader` tries each strategy on a small probe
+and sends the rest of the calls with whichever strategy read the most calls per second.
+"""
+
+# eth_calls packed into a single JSON-RPC batch request
+RPC_BATCH_SIZE = 100
+
+# batch requests in flight at the same time
+RPC_BATCH_MAX_WORKERS = 4
+
+# calls used to measure each strategy before picking one
+PROBE_SIZE = 50
+
+# a strategy that raised is probed again after this long, so one transient error does not disable it
+RETRY_DEMOTED_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def failed_keys(calls: list[Call], results: dict[Any, Any]) -> list[Any]:
+    """Names of the calls that reverted, which the readers map to None"""
+    return [name for c in calls for name, _ in c.returns if results.get(name) is None]
+
+
+def raise_for_failures(calls: list[Call], results: dict[Any, Any]) -> dict[Any, Any]:
+    failed = failed_keys(calls, results)
+    if failed:
+        raise FailedCallsException(failed)
+    return results
+
+
+class Reader(Protocol):
+    """
+    Anything that can execute a list of calls at a block, like `MulticallExecutor`.
+    `stats` records each request sent to the node, which is what a probe is timed on.
+    """
+
+    stats: MulticallStats
+
+    def __call__(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        ...
+
+    async def coroutine(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        ...
+
+    def summary(self) -> str:
+        ...
+
+
+# eth_call is a read, so it is as safe to retry as a GraphQL query
+rpc_client = JSONClient()
+
+
+class RPCBatchExecutor:
+    """
+    Send each call as its own eth_call, `batch_size` of them per JSON-RPC batch request,
+    over the pooled connections of `client`. Results already in `cache` are not requested again.
+
+    :param `batch_size`: eth_calls per batch request
+    :param `max_workers`: batch requests sent concurrently
+    :param `endpoint`: JSON-RPC endpoint, defaults to `RPC_URL`
+    :param `cache`: eth_call cache shared with the web3 middleware
+    """
+
+    def __init__(
+        self,
+        batch_size: int = RPC_BATCH_SIZE,
+        max_workers: int = RPC_BATCH_MAX_WORKERS,
+        endpoint: Optional[str] = None,
+        client: JSONClient = rpc_client,
+        cache: Optional[DiskCache] = eth_call_cache,
+    ):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._endpoint = endpoint
+        self.client = client
+        self.cache = cache
+        self.stats = MulticallStats()
+        self._chain_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint or env.RPC_URL
+
+    def chain_id(self) -> str:
+        with self._lock:
+            if self._chain_id is None:
+                response = self.client.post(
+                    self.endpoint,
+                    {"jsonrpc": "2.0", "id": 0, "method": "eth_chainId", "params": []},
+                )
+                self._chain_id = response["result"]
+            return self._chain_id
+
+    def _decode(self, call: Call, response: Optional[dict]) -> dict[Any, Any]:
+        """Decode a single eth_call response, failed calls map their names to None"""
+        from multicall import Call
+
+        result = (response or {}).get("result")
+        if not result or result == "0x" or "error" in (response or {}):
+            with self._lock:
+                self.stats.failed_calls += 1
+            return {name: None for name, _ in call.returns}
+        return Call.decode_output(
+            bytes.fromhex(result[2:]), call.signature, call.returns
+        )
+
+    def _run_batch(self, index: int, calls: list[Call], block_id: int) -> dict:
+        block = hex(block_id)
+        params = [
+            [{"to": c.target, "data": "0x" + bytes(c.data).hex()}, block] for c in calls
+        ]
+        keys = (
+            [None] * len(calls)
+            if self.cache is None
+            else [eth_call_cache_key(self.chain_id(), p) for p in params]
+        )
+
+        responses: list[Optional[dict]] = [
+            self.cache.get(k) if self.cache is not None and k else None for k in keys
+        ]
+        missing = [i for i, r in enumerate(responses) if r is None]
+
+        if missing:
+            start = time.monotonic()
+            batch = [
+                {"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": params[i]}
+                for i in missing
+            ]
+            received = self.client.post(self.endpoint, batch)
+            if not isinstance(received, list):
+                # the node rejected the batch as a whole
+                raise ValueError(f"JSON-RPC batch failed: {received}")
+            with self._lock:
+                self.stats.chunks.append(
+                    ChunkTiming(
+                        index=index,
+                        calls=len(missing),
+                        seconds=time.monotonic() - start,
+                    )
+                )
+
+            # responses in a batch may come back in any order, and an id that was not asked for,
+            # or was already answered, is dropped so its call is decoded as failed
+            pending = set(missing)
+            for r in received:
+                i = r.get("id") if isinstance(r, dict) else None
+                if i not in pending:
+                    continue
+                pending.discard(i)
+                responses[i] = r
+                if self.cache is not None and keys[i] and "error" not in r:
+                    if r.get("result") not in (None, "0x"):
+                        self.cache.set(keys[i], r)
+
+        merged: dict[Any, Any] = {}
+        for call, response in zip(calls, responses):
+            merged.update(self._decode(call, response))
+        return merged
+
+    def __call__(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        batches = chunk_calls(calls, self.batch_size)
+        merged: dict[Any, Any] = {}
+        if not batches:
+            return merged
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(batches))
+        ) as pool:
+            for result in pool.map(
+                lambda args: self._run_batch(*args, block_id), enumerate(batches)
+            ):
+                merged.update(result)
+        return merged
+
+    async def coroutine(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        return await asyncio.to_thread(self, calls, block_id)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"📦 rpc batch: {len(s.chunks)} batches, {s.seconds:.2f}s total, "
+            f"{s.slowest:.2f}s slowest batch, {s.failed_calls} failed calls"
+        )
+
+
+class ChainReader:
+    """
+    Picks the read strategy with the best measured throughput.
+    Until every strategy has been measured, each call list lends a probe of `probe_size`
+    calls to the next unmeasured strategy. The first call of a probe is sent on its own to pay
+    the one-off costs, and the rest are timed on the requests the strategy sent to the node,
+    so calls answered from the cache are not counted. A probe answered entirely from the cache
+    leaves the strategy unmeasured. A strategy that raises is demoted: it is not picked
+    until `retry_after` seconds have passed, then it is probed again like an unmeasured one.
+    Calls that revert raise a `FailedCallsException` naming them, unless `allow_failure` is passed.
+
+    :param `readers`: strategies by name, tried in order
+    :param `strategy`: name of a strategy to always use, or "auto".
+    None reads it from `CHAIN_READ_STRATEGY`, and checks it, on first use.
+    :param `retry_after`: seconds before a strategy that raised is probed again
+    """
+
+    def __init__(
+        self,
+        readers: dict[str, Reader],
+        strategy: Optional[str] = "auto",
+        probe_size: int = PROBE_SIZE,
+        retry_after: float = RETRY_DEMOTED_SECONDS,
+    ):
+        self.readers = readers
+        self._strategy = strategy
+        if strategy is not None:
+            self._check(strategy)
+        self.probe_size = probe_size
+        self.retry_after = retry_after
+        self.throughput: dict[str, float] = {}
+        self.last_error: Optional[Exception] = None
+        self._demoted: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, strategy: str) -> str:
+        if strategy != "auto" and strategy not in self.readers:
+            raise ValueError(f"Unknown read strategy {strategy}")
+        return strategy
+
+    @property
+    def strategy(self) -> str:
+        if self._strategy is None:
+            self._strategy = self._check(env.CHAIN_READ_STRATEGY)
+        return self._strategy
+
+    @property
+    def best(self) -> Optional[str]:
+        if self.strategy != "auto":
+            return self.strategy
+        measured = {k: v for k, v in self.throughput.items() if v > 0}
+        if measured:
+            return max(measured, key=measured.__getitem__)
+        # nothing measured yet, for example every probe came from the cache
+        return next((k for k in self.readers if k not in self._demoted), None)
+
+    def _next_unmeasured(self, tried: set[str]) -> Optional[str]:
+        """A strategy not measured yet, or demoted long enough ago to be probed again"""
+        now = time.monotonic()
+        with self._lock:
+            return next(
+                (
+                    k
+                    for k in self.readers
+                    if k not in tried
+                    and (
+                        k not in self.throughput
+                        or now - self._demoted.get(k, now) >= self.retry_after
+                    )
+                ),
+                None,
+            )
+
+    def _demote(self, name: str, error: Exception) -> None:
+        """Stop picking a strategy that raised, until it is due to be probed again"""
+        logger.warning(
+            "%s read strategy failed, probing it again in %.0fs: %r",
+            name,
+            self.retry_after,
+            error,
+        )
+        with self._lock:
+            self.throughput[name] = 0.0
+            self._demoted[name] = time.monotonic()
+            self.last_error = error
+
+    def _measure(self, name: str, calls: list[Call], block_id: int) -> Optional[dict]:
+        reader = self.readers[name]
+        try:
+            # untimed, it pays for the imports, the first connection and the chain id lookup
+            result = reader(calls[:1], block_id)
+            sent = len(reader.stats.chunks)
+            result.update(reader(calls[1:], block_id))
+        except Exception as e:
+            self._demote(name, e)
+            return None
+
+        timed = reader.stats.chunks[sent:]
+        fetched = sum(c.calls for c in timed)
+        if fetched:
+            seconds = sum(c.seconds for c in timed)
+            with self._lock:
+                self.throughput[name] = fetched / max(seconds, 1e-9)
+                self._demoted.pop(name, None)
+        return result
+
+    def _probe(self, calls: list[Call], block_id: int) -> tuple[dict, list[Call]]:
+        """Spend probes on unmeasured strategies, returns their results and the calls left over"""
+        results: dict[Any, Any] = {}
+        remaining = calls
+        tried: set[str] = set()
+        while self.strategy == "auto" and remaining:
+            name = self._next_unmeasured(tried)
+            if name is None:
+                break
+            tried.add(name)
+            probe = remaining[: self.probe_size]
+            probed = self._measure(name, probe, block_id)
+            if probed is not None:
+                results.update(probed)
+                remaining = remaining[len(probe) :]
+        return results, remaining
+
+    def _chosen(self) -> str:
+        best = self.best
+        if best is None:
+            raise RuntimeError(
+                "Every on-chain read strategy failed"
+            ) from self.last_error
+        return best
+
+    def __call__(
+        self, calls: list[Call], block_id: int, allow_failure: bool = False
+    ) -> dict[Any, Any]:
+        """
+        :param `allow_failure`: return None for the calls that revert rather than raising
+        """
+        results, remaining = self._probe(calls, block_id)
+        while remaining:
+            name = self._chosen()
+            try:
+                results.update(self.readers[name](remaining, block_id))
+                remaining = []
+            except Exception as e:
+                # a strategy picked explicitly has nothing to fall back to
+                if self.strategy != "auto":
+                    raise
+                self._demote(name, e)
+        return results if allow_failure else raise_for_failures(calls, results)
+
+    async def coroutine(
+        self, calls: list[Call], block_id: int, allow_failure: bool = False
+    ) -> dict[Any, Any]:
+        results, remaining = await asyncio.to_thread(self._probe, calls, block_id)
+        while remaining:
+            name = self._chosen()
+            try:
+                results.update(await self.readers[name].coroutine(remaining, block_id))
+                remaining = []
+            except Exception as e:
+                if self.strategy != "auto":
+                    raise
+                self._demote(name, e)
+        return results if allow_failure else raise_for_failures(calls, results)
+
+    def summary(self) -> str:
+        measured = ", ".join(
+            f"{name} {tput:.0f} calls/s" for name, tput in self.throughput.items()
+        )
+        return "\n".join(
+            [f"🔀 read strategy: {self.best} ({measured or 'not measured'})"]
+            + [reader.summary() for reader in self.readers.values()]
+        )
+
+
+# one reader for the whole run, so the strategy is only measured once
+chain_reader = ChainReader(
+    {"multicall": multicall_executor, "batch": RPCBatchExecutor()}, strategy=None
+)
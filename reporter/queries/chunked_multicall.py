@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, cast
+from urllib.parse import urlparse
+
+from reporter.queries.cache import DiskCache
+from reporter.queries.common import get_w3, pooled_async_w3
+from reporter.queries.rpc_cache import eth_call_cache, eth_call_cache_key
+
+if TYPE_CHECKING:
+    from multicall import Call, Signature  # type: ignore
+    from web3 import Web3
+
+"""
+A single Multicall over every holder quickly runs into the gas and response size limits
+of the RPC, or simply times out. We split the calls into chunks, send the chunks
+from a small pool of workers and merge the results back into one dict, as `Multicall` would return.
+The same chunks can be sent from an event loop instead, through the pooled async provider.
+
+Chunks use `tryAggregate`, so a reverting call comes back as None rather than failing its chunk.
+If a whole chunk goes over a gas or payload limit of the node, it is split in half and each half retried.
+Any other error, such as a timeout or a rate limit, is raised straight away.
+Once a chunk has had to be split, the largest chunk size that succeeded is stored for the RPC endpoint,
+and later runs send chunks of that size rather than probing the node's limit again.
+
+Each call's result is cached on its own, under the key of the eth_call the batch strategy would send for it,
+so a rerun finds every result whichever chunk it was first sent in.
+"""
+
+# calls packed into a single aggregate eth_call
+MULTICALL_CHUNK_SIZE = 500
+
+# aggregates in flight at the same time
+MULTICALL_MAX_WORKERS = 4
+
+# Multicall3 is deployed at the same address on every chain we report on
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+TRY_AGGREGATE = "tryAggregate(bool,(address,bytes)[])((bool,bytes)[])"
+
+# chunk sizes learned for each endpoint, shared by every epoch
+BATCH_SIZES_FILE = "reports/.multicall-batch-sizes.json"
+
+# RPC errors for an aggregate that was too big for the node, smaller chunks can still succeed
+LIMIT_ERROR_MESSAGES = (
+    "out of gas",
+    "gas limit",
+    "gas required exceeds",
+    "execution reverted",
+    "too large",
+    "size exceeded",
+    "size limit",
+)
+
+# HTTP status of a request body over the node's limit
+PAYLOAD_TOO_LARGE = 413
+
+# success flag and return data of each call in an aggregate
+Output = tuple[bool, bytes]
+
+
+@dataclass
+class ChunkTiming:
+    """
+    Wall clock time of a single aggregate eth_call
+    :param `index`: position of the chunk in the call list
+    :param `calls`: number of calls in the chunk
+    """
+
+    index: int
+    calls: int
+    seconds: float
+
+
+@dataclass
+class MulticallStats:
+    """
+    Per chunk latencies of every batch sent through a `MulticallExecutor`
+    :param `splits`: chunks that failed as a whole and were split in half
+    :param `failed_calls`: individual calls that reverted, returned as None
+    """
+
+    chunks: list[ChunkTiming] = field(default_factory=list)
+    splits: int = 0
+    failed_calls: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(c.seconds for c in self.chunks)
+
+    @property
+    def slowest(self) -> float:
+        return max((c.seconds for c in self.chunks), default=0.0)
+
+
+def is_limit_error(e: Exception) -> bool:
+    """Whether `e` means the aggregate was too big for the node, rather than the node failing"""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None) or getattr(e, "status", None)
+    if status == PAYLOAD_TOO_LARGE:
+        return True
+    message = str(e).lower()
+    return any(m in message for m in LIMIT_ERROR_MESSAGES)
+
+
+class BatchSizes:
+    """
+    Largest chunk size known to work for each RPC endpoint, kept in a JSON file.
+    Endpoints are stored by host and a hash of the full URL, so API keys are not written to disk.
+    """
+
+    def __init__(self, path: str = BATCH_SIZES_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(endpoint: str) -> str:
+        return f"{urlparse(endpoint).netloc}#{DiskCache.key(endpoint)[:12]}"
+
+    def _load(self) -> dict[str, int]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, endpoint: str) -> Optional[int]:
+        with self._lock:
+            return self._load().get(self.endpoint_key(endpoint))
+
+    def set(self, endpoint: str, size: int) -> None:
+        with self._lock:
+            sizes = self._load()
+            sizes[self.endpoint_key(endpoint)] = size
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(sizes, f, indent=4)
+            os.replace(tmp, self.path)
+
+
+@functools.lru_cache(maxsize=None)
+def try_aggregate() -> Signature:
+    """`TRY_AGGREGATE` signature, built on first use so multicall is only imported when needed"""
+    from multicall import Signature
+
+    return Signature(TRY_AGGREGATE)
+
+
+def chunk_calls(calls: list[Call], size: int) -> list[list[Call]]:
+    return [calls[i : i + size] for i in range(0, len(calls), size)]
+
+
+def aggregate_tx(calls: list[Call]) -> dict[str, Any]:
+    """Transaction for a Multicall3 `tryAggregate` over `calls` that tolerates reverts"""
+    return {
+        "to": MULTICALL3_ADDRESS,
+        "data": try_aggregate().encode_data(
+            [False, [[c.target, c.data] for c in calls]]
+        ),
+    }
+
+
+def decode_aggregate(output: Any) -> list[Output]:
+    """Split the result of `aggregate_tx` into the output of each call"""
+    (outputs,) = try_aggregate().decode_data(output)
+    return [(success, bytes(out)) for success, out in outputs]
+
+
+def decode_outputs(
+    calls: list[Call], outputs: list[Output]
+) -> tuple[dict[Any, Any], int]:
+    """
+    Decode the output of each call into a dict keyed by the calls' return names.
+    Calls that reverted map each of their names to None.
+    Returns the results and the number of failed calls.
+    """
+    from multicall import Call
+
+    result: dict[Any, Any] = {}
+    failed = 0
+    for call, (success, out) in zip(calls, outputs):
+        decoded = None
+        if success and out:
+            try:
+                decoded = Call.decode_output(out, call.signature, call.returns)
+            except Exception:
+                decoded = None
+        if decoded is None:
+            failed += 1
+            decoded = {name: None for name, _ in call.returns}
+        result.update(decoded)
+    return result, failed
+
+
+def _endpoint(_w3: Any) -> str:
+    provider = getattr(_w3, "provider", None)
+    return str(getattr(provider, "endpoint_uri", None) or "default")
+
+
+class MulticallExecutor:
+    """
+    Run a list of `multicall.Call`s as several aggregates of at most `chunk_size` calls,
+    at most `max_workers` at a time.
+
+    :param `chunk_size`: calls per aggregate eth_call, lowered to the size learned for the endpoint
+    :param `max_workers`: aggregates sent concurrently
+    :param `_w3`: web3 instance to send the calls through, defaults to the shared one
+    :param `batch_sizes`: where learned chunk sizes are kept, pass None to not persist them
+    :param `cache`: eth_call cache to keep each call's result in, shared with `RPCBatchExecutor`
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = MULTICALL_CHUNK_SIZE,
+        max_workers: int = MULTICALL_MAX_WORKERS,
+        _w3: Optional[Web3] = None,
+        batch_sizes: Optional[BatchSizes] = None,
+        cache: Optional[DiskCache] = None,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._w3 = _w3
+        self.batch_sizes = batch_sizes
+        self.cache = cache
+        self.stats = MulticallStats()
+        self._lock = threading.Lock()
+        self._batch_size: Optional[int] = None
+        self._chain_id: Optional[str] = None
+
+        # bounds on the node's limit seen by this executor
+        self._largest_ok = 0
+        self._smallest_failed: Optional[int] = None
+
+    @property
+    def w3(self) -> Web3:
+        return self._w3 or get_w3()
+
+    @property
+    def batch_size(self) -> int:
+        """Chunk size to use for the next batch"""
+        with self._lock:
+            if self._batch_size is None:
+                stored = None
+                if self.batch_sizes is not None:
+                    stored = self.batch_sizes.get(_endpoint(self.w3))
+                self._batch_size = min(stored or self.chunk_size, self.chunk_size)
+            return self._batch_size
+
+    def _record(self, index: int, calls: list[Call], start: float) -> None:
+        with self._lock:
+            self.stats.chunks.append(
+                ChunkTiming(
+                    index=index, calls=len(calls), seconds=time.monotonic() - start
+                )
+            )
+            self._largest_ok = max(self._largest_ok, len(calls))
+
+    def _split(self, calls: list[Call]) -> tuple[list[Call], list[Call]]:
+        """A chunk went over the node's limit, so it is retried in halves"""
+        half = len(calls) // 2
+        with self._lock:
+            self.stats.splits += 1
+            if self._smallest_failed is None or len(calls) < self._smallest_failed:
+                self._smallest_failed = len(calls)
+        return calls[:half], calls[half:]
+
+    def _run_chunk(self, index: int, calls: list[Call], block_id: int) -> list[Output]:
+        start = time.monotonic()
+        try:
+            # sent through `w3` itself rather than `Multicall`, which opens its own async provider
+            output = self.w3.eth.call(aggregate_tx(calls), block_id)  # type: ignore
+        except Exception as e:
+            # only an aggregate over the node's limits can succeed in smaller pieces,
+            # and a single call that fails as a whole is a problem with the node, not the batch
+            if len(calls) == 1 or not is_limit_error(e):
+                raise
+            left, right = self._split(calls)
+            return self._run_chunk(index, left, block_id) + self._run_chunk(
+                index, right, block_id
+            )
+        self._record(index, calls, start)
+        return decode_aggregate(output)
+
+    async def _run_chunk_async(
+        self,
+        semaphore: asyncio.Semaphore,
+        index: int,
+        calls: list[Call],
+        block_id: int,
+    ) -> list[Output]:
+        output = None
+        async with semaphore:
+            async_w3 = await pooled_async_w3()
+            start = time.monotonic()
+            try:
+                output = await async_w3.eth.call(aggregate_tx(calls), block_id)  # type: ignore
+                self._record(index, calls, start)
+            except Exception as e:
+                if len(calls) == 1 or not is_limit_error(e):
+                    raise
+
+        if output is None:
+            # retry the halves once the slot is released, so they can take it
+            left, right = self._split(calls)
+            return await self._run_chunk_async(
+                semaphore, index, left, block_id
+            ) + await self._run_chunk_async(semaphore, index, right, block_id)
+        return decode_aggregate(output)
+
+    def _keys(
+        self, calls: list[Call], block_id: int, chain_id: Optional[str]
+    ) -> list[Optional[str]]:
+        """Cache key of each call, as the eth_call `RPCBatchExecutor` sends for it"""
+        if self.cache is None or chain_id is None:
+            return [None] * len(calls)
+        return [
+            eth_call_cache_key(chain_id, [{"to": c.target, "data": c.data}, block_id])
+            for c in calls
+        ]
+
+    def _cached(self, keys: list[Optional[str]]) -> list[Optional[Output]]:
+        outputs: list[Optional[Output]] = []
+        for key in keys:
+            cached = self.cache.get(key) if self.cache is not None and key else None
+            outputs.append(
+                None if cached is None else (True, bytes.fromhex(cached["result"][2:]))
+            )
+        return outputs
+
+    def _store(
+        self,
+        keys: list[Optional[str]],
+        outputs: list[Optional[Output]],
+        missing: list[int],
+        fetched: list[Output],
+    ) -> list[Output]:
+        """Fill in the fetched outputs and cache the successful ones"""
+        for i, (success, out) in zip(missing, fetched):
+            outputs[i] = (success, out)
+            key = keys[i]
+            if self.cache is not None and key and success and out:
+                self.cache.set(key, {"result": "0x" + out.hex()})
+        return cast(list[Output], outputs)
+
+    def _decoded(self, calls: list[Call], outputs: list[Output]) -> dict[Any, Any]:
+        result, failed = decode_outputs(calls, outputs)
+        if failed:
+            with self._lock:
+                self.stats.failed_calls += failed
+        return result
+
+    def _remember(self) -> None:
+        """
+        Once a chunk has been split, settle on the largest size that succeeded
+        below the smallest that failed, and store it for the endpoint
+        """
+        size = self.batch_size
+        with self._lock:
+            if self._smallest_failed is None or not self._largest_ok:
+                return
+            ceiling = max(1, min(self._largest_ok, self._smallest_failed - 1, size))
+            if ceiling == size:
+                return
+            self._batch_size = ceiling
+        if self.batch_sizes is not None:
+            self.batch_sizes.set(_endpoint(self.w3), ceiling)
+
+    def __call__(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        """
+        Execute every call at `block_id` and merge the results, keyed by the return names
+        """
+        if not calls:
+            return {}
+        chain_id = None
+        if self.cache is not None:
+            with self._lock:
+                if self._chain_id is None:
+                    self._chain_id = hex(self.w3.eth.chain_id)
+                chain_id = self._chain_id
+
+        keys = self._keys(calls, block_id, chain_id)
+        outputs = self._cached(keys)
+        missing = [i for i, o in enumerate(outputs) if o is None]
+        chunks = chunk_calls([calls[i] for i in missing], self.batch_size)
+
+        fetched: list[Output] = []
+        if chunks:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(chunks))
+            ) as pool:
+                # map keeps chunk order, so outputs line up with the missing calls
+                for result in pool.map(
+                    lambda args: self._run_chunk(*args, block_id),
+                    enumerate(chunks),
+                ):
+                    fetched += result
+            self._remember()
+
+        # decoded in call order, so later duplicate keys win as they would in one aggregate
+        return self._decoded(calls, self._store(keys, outputs, missing, fetched))
+
+    async def coroutine(self, calls: list[Call], block_id: int) -> dict[Any, Any]:
+        """
+        Awaitable version of calling the executor, so on-chain reads can run
+        alongside other fetches on the same event loop
+        """
+        if not calls:
+            return {}
+        chain_id = None
+        if self.cache is not None:
+            if self._chain_id is None:
+                async_w3 = await pooled_async_w3()
+                self._chain_id = hex(await async_w3.eth.chain_id)  # type: ignore
+            chain_id = self._chain_id
+
+        keys = self._keys(calls, block_id, chain_id)
+        outputs = self._cached(keys)
+        missing = [i for i, o in enumerate(outputs) if o is None]
+        chunks = chunk_calls([calls[i] for i in missing], self.batch_size)
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+        results = await asyncio.gather(
+            *(
+                self._run_chunk_async(semaphore, i, chunk, block_id)
+                for i, chunk in enumerate(chunks)
+            )
+        )
+        fetched = [output for result in results for output in result]
+        if chunks:
+            self._remember()
+        return self._decoded(calls, self._store(keys, outputs, missing, fetched))
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"⛓️ multicall: {len(s.chunks)} chunks of up to {self.batch_size} calls, "
+            f"{s.seconds:.2f}s total, {s.slowest:.2f}s slowest chunk, "
+            f"{s.splits} splits, {s.failed_calls} failed calls"
+        )
+
+
+# one executor for the whole run, so chunk latencies are reported together
+multicall_executor = MulticallExecutor(batch_sizes=BatchSizes(), cache=eth_call_cache)
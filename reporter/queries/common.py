@@ -1,14 +1,119 @@
+import asyncio
+import functools
+import random
+import re
+import threading
+import time
 from copy import deepcopy
-from typing import Any, TypedDict, TypeVar, cast
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from queue import Full, Queue
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypedDict,
+    TypeVar,
+    cast,
+)
+from urllib.parse import urlparse
 
 import requests
-from web3 import Web3
+from requests.adapters import HTTPAdapter
 
-from reporter.env import RPC_URL, SUBGRAPHS
+from reporter import env
+from reporter.env import SUBGRAPHS
 from reporter.errors import EmptyQueryError, TooManyLoopsError
-from reporter.models import GraphQL_Response, Config, EthereumAddress
+from reporter.models import GraphQL_Response, Config, ERC20Snapshot, EthereumAddress
+from reporter.queries.cache import DiskCache, page_cache
+from reporter.queries.rpc_cache import (
+    construct_async_eth_call_cache_middleware,
+    construct_eth_call_cache_middleware,
+    eth_call_cache,
+)
 
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
+if TYPE_CHECKING:
+    from web3 import Web3
+
+# web3 and aiohttp are slow to import, so the providers are only built
+# the first time something reads from the chain
+
+
+@functools.lru_cache(maxsize=None)
+def get_w3() -> "Web3":
+    """
+    Shared web3 instance for `RPC_URL`,
+    historical eth_calls are read from disk when we have already made them
+    """
+    from web3 import Web3
+
+    w3 = Web3(Web3.HTTPProvider(env.RPC_URL))
+    w3.middleware_onion.add(
+        construct_eth_call_cache_middleware(eth_call_cache), "eth_call_cache"
+    )
+    return w3
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_w3() -> "Web3":
+    """
+    Async twin of `get_w3`, for on-chain reads that overlap with other fetches
+    the sync middlewares are not compatible with the async provider
+    """
+    from web3 import AsyncHTTPProvider, Web3
+    from web3.eth import AsyncEth
+
+    return Web3(
+        AsyncHTTPProvider(env.RPC_URL),
+        modules={"eth": (AsyncEth,)},
+        middlewares=[construct_async_eth_call_cache_middleware(eth_call_cache)],
+    )
+
+
+# max keep-alive connections to the RPC from `get_async_w3`
+ASYNC_RPC_POOL_SIZE = 20
+
+_async_rpc_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_rpc_session: Optional[AsyncIterator[None]] = None
+
+
+async def _session_lifetime(session: Any) -> AsyncIterator[None]:
+    """
+    Stays suspended for as long as its event loop runs.
+    `asyncio.run` closes the async generators still open when it shuts the loop down,
+    which closes the session along with the loop it was created on.
+    """
+    try:
+        yield
+    finally:
+        await session.close()
+
+
+async def pooled_async_w3() -> "Web3":
+    """
+    `get_async_w3`, with one aiohttp session per event loop so concurrent eth_calls
+    share a pool of `ASYNC_RPC_POOL_SIZE` connections rather than opening one each.
+    The session is closed when the loop is shut down.
+    """
+    import aiohttp
+
+    global _async_rpc_loop, _async_rpc_session
+    async_w3 = get_async_w3()
+    loop = asyncio.get_running_loop()
+    if _async_rpc_loop is not loop:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_RPC_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=60),
+        )
+        await async_w3.provider.cache_async_session(session)  # type: ignore
+        lifetime = _session_lifetime(session)
+        await lifetime.__anext__()
+        _async_rpc_loop, _async_rpc_session = loop, lifetime
+    return async_w3
 
 
 class GraphQLConfig(TypedDict):
@@ -22,10 +127,188 @@ class GraphQLConfig(TypedDict):
     variables: dict[str, Any]
 
 
+class GraphQLCursor(NamedTuple):
+    """
+    Keyset pagination settings for `graphql_iterate_query`
+    :param `field`: key on each result holding the cursor value, eg 'id'
+    :param `variable`: query variable advanced to the last value seen, eg 'id_gt'
+    :param `unique`: for inclusive cursors (eg 'created_gte'), the key used to drop rows
+    already returned on the previous page
+    """
+
+    field: str
+    variable: str
+    unique: Optional[str] = None
+
+
+# stable ordering on the entity id, works for any subgraph entity
+ID_CURSOR = GraphQLCursor(field="id", variable="id_gt")
+
+# the graph caps page sizes at 1000
+PAGE_SIZE = 1000
+
+
+# [lower, upper) bounds of an address range, None for an open end
+ShardBounds = tuple[Optional[str], Optional[str]]
+
+
+class GraphQLShards(NamedTuple):
+    """
+    Split a query into disjoint ranges of an address field and fetch them concurrently.
+    Each range adds `<field>_gte` and `<field>_lt` filters to the first `where` clause of the query,
+    so the query only filters on the field when it is sharded.
+    :param `field`: the address field to split on, eg 'account'
+    :param `count`: number of ranges, each covers an equal slice of the address space
+    :param `max_workers`: how many ranges are fetched at the same time
+    :param `type`: GraphQL type of the field's filters, account ids are `Bytes`
+    """
+
+    field: str
+    count: int = 16
+    max_workers: int = 4
+    type: str = "Bytes"
+
+    def filters(self, bounds: ShardBounds) -> dict[str, str]:
+        """Filter variables for a single range, an open end is not filtered on"""
+        lower, upper = bounds
+        filters = {}
+        if lower is not None:
+            filters[f"{self.field}_gte"] = lower
+        if upper is not None:
+            filters[f"{self.field}_lt"] = upper
+        return filters
+
+
+# holders and depositors are split on the account they belong to
+ACCOUNT_SHARDS = GraphQLShards(field="account")
+
 # python insantiates generics separate to function definition
 T = TypeVar("T")
 
 
+@dataclass
+class HostStats:
+    """
+    Running totals of the requests sent to a single host
+    :param `bytes`: bytes received over the wire, before decompression
+    """
+
+    requests: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.seconds / self.requests if self.requests else 0.0
+
+
+class JSONClient:
+    """
+    Shared HTTP client for endpoints that take and return JSON, like GraphQL and JSON-RPC.
+    Keeps a pool of keep-alive connections per host, applies a deadline to every request,
+    negotiates compressed responses and retries failed POSTs with jittered exponential backoff.
+    It only sends reads, GraphQL queries and eth_calls, which are always safe to retry.
+
+    :param `timeout`: (connect, read) timeout in seconds for each request
+    :param `retries`: how many times to retry a request after the first attempt
+    :param `backoff`: base delay in seconds, doubled after each failed attempt
+    :param `pool_size`: max connections kept open per host
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        timeout: tuple[float, float] = (10, 60),
+        retries: int = 4,
+        backoff: float = 0.5,
+        pool_size: int = 10,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.sessions: dict[str, requests.Session] = {}
+        self.stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def session(self, host: str) -> requests.Session:
+        with self._lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate"})
+                self.sessions[host] = session
+                self.stats[host] = HostStats()
+            return self.sessions[host]
+
+    def _record(
+        self,
+        host: str,
+        start: float,
+        response: Optional[requests.Response],
+        retry: bool,
+    ) -> None:
+        received = 0
+        if response is not None:
+            try:
+                # bytes read off the socket, which is the compressed size
+                received = response.raw.tell()
+            except AttributeError:
+                received = len(response.content)
+
+        with self._lock:
+            stats = self.stats[host]
+            stats.requests += 1
+            stats.retries += int(retry)
+            stats.seconds += time.monotonic() - start
+            stats.bytes += received
+
+    def post(self, url: str, payload: Any) -> Any:
+        """
+        POST `payload` as JSON and return the decoded JSON body
+        """
+        host = urlparse(url).netloc
+        session = self.session(host)
+
+        for attempt in range(self.retries + 1):
+            start = time.monotonic()
+            response: Optional[requests.Response] = None
+            try:
+                response = session.post(url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            finally:
+                self._record(host, start, response, retry=attempt > 0)
+
+            if response is not None:
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                if attempt == self.retries:
+                    response.raise_for_status()
+
+            # full jitter avoids retrying in lockstep with other workers
+            time.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+        raise requests.exceptions.RetryError(f"Retries exhausted for {url}")
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"🌐 {host}: {s.requests} requests ({s.retries} retries), "
+            f"{s.mean_latency:.2f}s avg latency, {s.bytes / 1024:.1f} kB received"
+            for host, s in self.stats.items()
+        )
+
+
+# one client for the whole run, so connections are reused across queries
+subgraph_client = JSONClient()
+
+
 def extract_nested_graphql(res: GraphQL_Response, access_path: list[str]):
     """
     This function walks through a dictionary until it finds the data you want.
@@ -43,8 +326,42 @@ def extract_nested_graphql(res: GraphQL_Response, access_path: list[str]):
     return current
 
 
+def post_graphql(
+    url: str, params: GraphQLConfig, cache: Optional[DiskCache] = None
+) -> GraphQL_Response:
+    """
+    Send a single GraphQL request and raise if the response is empty or contains errors
+    :param `cache`: if passed, responses are read from and saved to the cache
+    """
+    if cache is not None:
+        key = DiskCache.key(url, params.get("query"), params.get("variables"))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    response: GraphQL_Response = subgraph_client.post(url, params)
+
+    if not response:
+        raise EmptyQueryError(f"No results for graph query to {url}")
+    if "errors" in response:
+        raise EmptyQueryError(
+            f"Error in graph query to {url}: {cast(dict, response)['errors']}"
+        )
+
+    if cache is not None:
+        cache.set(key, response)
+    return response
+
+
 def graphql_iterate_query(
-    url: str, access_path: list[str], params: GraphQLConfig, max_loops: int = 1000
+    url: str,
+    access_path: list[str],
+    params: GraphQLConfig,
+    max_loops: int = 1000,
+    cursor: Optional[GraphQLCursor] = None,
+    page_size: int = PAGE_SIZE,
+    cache: Optional[DiskCache] = None,
+    shards: Optional[GraphQLShards] = None,
 ) -> list[T]:
     """
     The graph allows fetching of Max 1000 results for subgraphs.
@@ -52,77 +369,532 @@ def graphql_iterate_query(
     :param `url`: the subgraph endpoint
     :param `access_path`: eg ['erc20accounts', 'balances'] - set of keys to fetch data
     :param `params`: GraphQL config such as the actual query and variables
+    :param `cursor`: if passed, pages on the cursor variable instead of `skip`.
+    The query must order by the cursor field, and iteration stops on the first short page.
+    :param `page_size`: the `first` argument of the query, used to detect the last page
+    :param `cache`: only pass for queries whose results can no longer change,
+    such as those pinned to a past block
+    :param `shards`: if passed, split the query into address ranges fetched concurrently.
+    Requires a `cursor`.
     """
+    if shards is not None:
+        return graphql_iterate_shards(
+            url, access_path, params, shards, cursor, page_size, max_loops, cache
+        )
 
-    response: GraphQL_Response = requests.post(url, json=params).json()
+    all_results: list[T] = []
+    for page in graphql_iterate_pages(
+        url, access_path, params, max_loops, cursor, page_size, cache
+    ):
+        all_results += page
+    return all_results
 
-    if not response:
-        raise EmptyQueryError(f"No results for graph query to {url}")
-    if "errors" in response:
-        raise EmptyQueryError(
-            f"Error in graph query to {url}: {cast(dict, response)['errors']}"
+
+def shard_bounds(count: int) -> list[ShardBounds]:
+    """
+    Split the address space into `count` contiguous [lower, upper) ranges on whole byte prefixes,
+    so every bound is valid `Bytes`. The first range has no lower bound and the last no upper bound.
+    """
+    if count < 1:
+        raise ValueError(f"count must be positive, got {count}")
+    width = 1
+    while 256**width < count:
+        width += 1
+    space = 256**width
+
+    starts: list[Optional[str]] = [
+        "0x" + format(i * space // count, f"0{2 * width}x") for i in range(1, count)
+    ]
+    return list(zip([None] + starts, starts + [None]))
+
+
+WHERE_CLAUSE = re.compile(r"where:\s*\{")
+
+
+def add_filters(field: str, names: Iterable[str]) -> str:
+    """Add a `name: $name` filter for each of `names` to the first `where` clause of `field`"""
+    filters = "".join(f" {name}: ${name}," for name in names)
+    if not filters:
+        return field
+    filtered, found = WHERE_CLAUSE.subn(lambda m: m.group(0) + filters, field, count=1)
+    if not found:
+        raise ValueError("Sharded queries need a `where` clause to filter on")
+    return filtered
+
+
+def declare_variables(document: str, types: dict[str, str]) -> str:
+    """Add variable declarations to the `query` operation of `document`"""
+    declarations = ", ".join(f"${name}: {type}" for name, type in types.items())
+    if not declarations:
+        return document
+    declared, found = re.subn(
+        r"query\s*\(", f"query({declarations}, ", document, count=1
+    )
+    if not found:
+        declared, found = re.subn(
+            r"query\s*(?=\{)", f"query({declarations}) ", document, count=1
+        )
+    if not found:
+        raise ValueError("Sharded queries need a named `query` operation")
+    return declared
+
+
+def shard_params(
+    params: GraphQLConfig, shards: GraphQLShards, bounds: ShardBounds
+) -> GraphQLConfig:
+    """`params` restricted to a single address range"""
+    filters = shards.filters(bounds)
+    query = add_filters(params["query"], filters)
+    return dict(
+        query=declare_variables(query, {name: shards.type for name in filters}),
+        variables={**deepcopy(params.get("variables", {})), **filters},
+    )
+
+
+def graphql_iterate_shards(
+    url: str,
+    access_path: list[str],
+    params: GraphQLConfig,
+    shards: GraphQLShards,
+    cursor: Optional[GraphQLCursor],
+    page_size: int = PAGE_SIZE,
+    max_loops: int = 1000,
+    cache: Optional[DiskCache] = None,
+) -> list[T]:
+    """
+    Page through each address range with its own cursor, on a pool of `shards.max_workers` threads.
+    Results are joined in range order, so the output does not depend on which shard finished first.
+    """
+    if cursor is None:
+        raise ValueError("Sharded queries need a cursor to page within each shard")
+
+    def fetch(bounds: ShardBounds) -> list[T]:
+        return graphql_iterate_query(
+            url,
+            access_path,
+            shard_params(params, shards, bounds),
+            max_loops,
+            cursor,
+            page_size,
+            cache,
         )
 
-    all_results: list[T] = extract_nested_graphql(response, access_path)
+    with ThreadPoolExecutor(max_workers=shards.max_workers) as pool:
+        results = list(pool.map(fetch, shard_bounds(shards.count)))
+    return [row for shard in results for row in shard]
+
 
-    current_batch = all_results
+def graphql_iterate_pages(
+    url: str,
+    access_path: list[str],
+    params: GraphQLConfig,
+    max_loops: int = 1000,
+    cursor: Optional[GraphQLCursor] = None,
+    page_size: int = PAGE_SIZE,
+    cache: Optional[DiskCache] = None,
+) -> Iterator[list[T]]:
+    """
+    Generator version of `graphql_iterate_query`, takes the same arguments.
+    Yields each page as soon as it arrives, and only requests the next page when asked for it.
+    """
+    if cursor is not None:
+        yield from graphql_cursor_pages(
+            url, access_path, params, cursor, page_size, max_loops, cache
+        )
+        return
+
+    current_batch: list[T] = extract_nested_graphql(
+        post_graphql(url, params, cache), access_path
+    )
+    offset = 0
     loops = 0
     while len(current_batch) > 0:
+        yield current_batch
         if loops > max_loops:
             raise TooManyLoopsError("graphql_iterate_query")
-        params["variables"]["skip"] = len(current_batch)
-        response = requests.post(url, json=params).json()
+        offset += len(current_batch)
+        params["variables"]["skip"] = offset
+        response = post_graphql(url, params, cache)
         current_batch = extract_nested_graphql(response, access_path)
-        all_results += current_batch
         loops += 1
-    return all_results
 
 
-def get_token_hodlers(conf: Config, token_address: EthereumAddress) -> list:
+class CursorPager:
     """
-    Fetch holders along with total balances grom the graph.
-    This can be used for Auxo, ARV and PRV but bear in mind that:
-    - ARV balances are subject to decay (for the purposes of rewards)
-    - PRV balances may be deposited into the RollStaker
+    Position of a keyset paginated query between pages.
+    Each page filters on values after the last one seen,
+    so the subgraph never has to scan past rows with `skip`.
+    :param `variables`: the query variables, the cursor variable is updated in place
+    """
+
+    def __init__(
+        self, cursor: GraphQLCursor, variables: dict[str, Any], page_size: int
+    ):
+        self.cursor = cursor
+        self.variables = variables
+        self.page_size = page_size
+        self.done = False
+
+        # unique keys of rows sitting on the current (inclusive) cursor value
+        self.boundary: set[Any] = set()
+
+    def advance(self, batch: list[Any]) -> list[Any]:
+        """
+        Drop rows already returned, then move the cursor past the page
+        """
+        cursor = self.cursor
+        new = [
+            row
+            for row in batch
+            if cursor.unique is None or row[cursor.unique] not in self.boundary
+        ]
+
+        # a short page is the last page, no need to ask for an empty one
+        if len(batch) < self.page_size:
+            self.done = True
+            return new
+
+        if not new:
+            raise TooManyLoopsError(
+                f"CursorPager: {cursor.variable} did not advance past {self.variables[cursor.variable]}"
+            )
+
+        last = batch[-1][cursor.field]
+        if cursor.unique is not None:
+            if last != self.variables[cursor.variable]:
+                self.boundary = set()
+            self.boundary |= {
+                row[cursor.unique] for row in batch if row[cursor.field] == last
+            }
+        self.variables[cursor.variable] = last
+        return new
+
+
+def graphql_cursor_pages(
+    url: str,
+    access_path: list[str],
+    params: GraphQLConfig,
+    cursor: GraphQLCursor,
+    page_size: int = PAGE_SIZE,
+    max_loops: int = 1000,
+    cache: Optional[DiskCache] = None,
+) -> Iterator[list[T]]:
+    """
+    Yield each page of a keyset paginated query
+    """
+    pager = CursorPager(cursor, params["variables"], page_size)
+
+    loops = 0
+    while not pager.done:
+        if loops > max_loops:
+            raise TooManyLoopsError("graphql_cursor_pages")
+
+        batch: list[Any] = extract_nested_graphql(
+            post_graphql(url, params, cache), access_path
+        )
+        new = pager.advance(batch)
+        if new:
+            yield new
+        loops += 1
+
+
+class PagedQuery(NamedTuple):
+    """
+    A keyset paginated query over a single top level field.
+    It can be sent on its own, or packed into one request with other queries using aliases.
+    :param `field`: the top level field and its selection, referencing variables as `$name`
+    :param `types`: GraphQL type of each variable, eg {'block': 'Int'}
+    :param `variables`: initial value of each variable
+    :param `access_path`: keys below the top level field leading to the list of results
+    :param `cursor`: how to page through the results
+    """
+
+    field: str
+    types: dict[str, str]
+    variables: dict[str, Any]
+    access_path: list[str]
+    cursor: GraphQLCursor = ID_CURSOR
+
+    def selection(self, alias: str = "") -> str:
+        """The field, with variables and the field itself prefixed by `alias`"""
+        if not alias:
+            return self.field
+        renamed = re.sub(r"\$(\w+)", rf"${alias}_\1", self.field.strip())
+        return f"{alias}: {renamed}"
+
+    def declarations(self, alias: str = "") -> list[str]:
+        prefix = f"{alias}_" if alias else ""
+        return [f"${prefix}{name}: {type}" for name, type in self.types.items()]
+
+    def params(self) -> GraphQLConfig:
+        """The query as a standalone request"""
+        return dict(
+            query=f"query({', '.join(self.declarations())}) {{ {self.field} }}",
+            variables=deepcopy(self.variables),
+        )
+
+    def sharded(self, shards: GraphQLShards, bounds: ShardBounds) -> "PagedQuery":
+        """The query restricted to a single address range"""
+        filters = shards.filters(bounds)
+        return self._replace(
+            field=add_filters(self.field, filters),
+            types={**self.types, **{name: shards.type for name in filters}},
+            variables={**deepcopy(self.variables), **filters},
+        )
+
+
+# upper limit of page windows packed into a single request
+MAX_ALIASES = 16
+
+
+@dataclass
+class _Window:
+    """One page window of a batched query: a query, or a single shard of one"""
+
+    name: str
+    query: PagedQuery
+    pager: CursorPager
+    rows: list[Any]
+
+
+def graphql_batch_iterate(
+    url: str,
+    queries: dict[str, PagedQuery],
+    shards: Optional[GraphQLShards] = None,
+    max_aliases: int = MAX_ALIASES,
+    page_size: int = PAGE_SIZE,
+    max_loops: int = 1000,
+    cache: Optional[DiskCache] = None,
+) -> dict[str, list[Any]]:
+    """
+    Page through several queries against the same endpoint, packing the next page of each
+    into a single GraphQL document with aliases, eg `w0: balances(...) w1: balances(...)`.
+    With `shards`, each address range of each query is its own window, so a round of paging
+    takes one request per `max_aliases` windows rather than one request per page.
+
+    :param `queries`: queries by name, the results are returned under the same names
+    :param `shards`: if passed, split every query into address ranges
+    :param `max_aliases`: the most windows packed into a single request
+    """
+    windows: list[_Window] = []
+    for name, query in queries.items():
+        ranges = (
+            [query.sharded(shards, b) for b in shard_bounds(shards.count)]
+            if shards is not None
+            else [query]
+        )
+        for q in ranges:
+            pager = CursorPager(q.cursor, deepcopy(q.variables), page_size)
+            windows.append(_Window(name, q, pager, []))
+
+    loops = 0
+    while active := [(i, w) for i, w in enumerate(windows) if not w.pager.done]:
+        if loops > max_loops:
+            raise TooManyLoopsError("graphql_batch_iterate")
+
+        for start in range(0, len(active), max_aliases):
+            batch = active[start : start + max_aliases]
+
+            declarations: list[str] = []
+            selections: list[str] = []
+            variables: dict[str, Any] = {}
+            for i, w in batch:
+                alias = f"w{i}"
+                declarations += w.query.declarations(alias)
+                selections.append(w.query.selection(alias))
+                variables.update(
+                    {f"{alias}_{k}": v for k, v in w.pager.variables.items()}
+                )
+
+            document = "query({}) {{ {} }}".format(
+                ", ".join(declarations), " ".join(selections)
+            )
+            response = post_graphql(
+                url, dict(query=document, variables=variables), cache
+            )
+            for i, w in batch:
+                page = extract_nested_graphql(response, [f"w{i}", *w.query.access_path])
+                w.rows += w.pager.advance(page)
+        loops += 1
+
+    # windows are in query then shard order, so results are deterministic
+    results: dict[str, list[Any]] = {name: [] for name in queries}
+    for w in windows:
+        results[w.name] += w.rows
+    return results
+
+
+# marks the end of a prefetched iterator
+_DONE = object()
+
+
+def prefetch(items: Iterable[T], depth: int = 1) -> Iterator[T]:
+    """
+    Pull from `items` in a background thread, staying up to `depth` items ahead of the consumer.
+    Wrapping a page generator lets the next page download while the current one is processed,
+    without holding more than `depth` pages in memory.
+    Exceptions in the producer are raised in the consumer.
+    """
+    queue: Queue = Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: Any, error: Optional[BaseException] = None) -> None:
+        while not stop.is_set():
+            try:
+                queue.put((item, error), timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                put(item)
+            put(_DONE)
+        except BaseException as e:
+            put(_DONE, e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        # the consumer stopped early or is done, release the producer
+        stop.set()
+
+
+@functools.lru_cache
+def get_block_timestamp(block: int) -> int:
+    """Timestamp of a block, which never changes once mined"""
+    return get_w3().eth.get_block(block)["timestamp"]
+
+
+@functools.lru_cache
+def get_token_metadata(token_address: EthereumAddress, block: int) -> ERC20Snapshot:
+    """
+    Fetch token level data at `block` in a single request.
+    Results are memoized per token and block, so treat the returned object as read only.
     """
     query = """
-        query($token: String, $block: Int, $skip: Int) {
+        query($token: String, $block: Int) {
             erc20Contract(
                 id: $token,
                 block: {number: $block}
             ) {
-                decimals
                 id
                 name
-                symbol      
+                symbol
+                decimals
                 totalSupply {
-                    value
                     valueExact
                 }
-                balances(
-                    orderBy: valueExact
-                    orderDirection: desc
-                    where: {account_not: null, valueExact_gt: 0}
-                    first: 1000
-                    skip: $skip
-                ) {
-                    account {
-                        id
-                    }
-                    value
-                    valueExact
+            }
+        }
+    """
+    variables = {"token": token_address, "block": block}
+    token = extract_nested_graphql(
+        post_graphql(SUBGRAPHS.AUXO_STAKING, dict(query=query, variables=variables)),
+        ["erc20Contract"],
+    )
+    return ERC20Snapshot(
+        address=token["id"],
+        name=token["name"],
+        symbol=token["symbol"],
+        decimals=token["decimals"],
+        total_supply=token["totalSupply"]["valueExact"],
+    )
+
+
+TOKEN_HODLERS_PATH = ["erc20Contract", "balances"]
+
+
+def token_hodlers_query(conf: Config, token_address: EthereumAddress) -> PagedQuery:
+    """
+    Query for token balances at the config's block snapshot, paged on the balance id.
+    Only the holder and the balance are requested on each page, token level data
+    is fetched once with `get_token_metadata`.
+    """
+    field = """
+        erc20Contract(
+            id: $token,
+            block: {number: $block}
+        ) {
+            balances(
+                orderBy: id
+                orderDirection: asc
+                where: {
+                    account_not: null
+                    valueExact_gt: 0
+                    id_gt: $id_gt
+                }
+                first: 1000
+            ) {
+                id
+                account {
+                    id
                 }
+                valueExact
             }
         }
     """
+    types = {
+        "token": "String",
+        "block": "Int",
+        "id_gt": "String",
+    }
     variables = {
         "token": token_address,
         "block": conf.block_snapshot,
-        "skip": 0,
+        "id_gt": "",
     }
+    return PagedQuery(field, types, variables, access_path=["balances"])
+
+
+def token_hodlers_params(conf: Config, token_address: EthereumAddress) -> GraphQLConfig:
+    return token_hodlers_query(conf, token_address).params()
 
+
+def get_token_hodlers(
+    conf: Config,
+    token_address: EthereumAddress,
+    shards: Optional[GraphQLShards] = None,
+) -> list:
+    """
+    Fetch holders along with total balances grom the graph.
+    This can be used for Auxo, ARV and PRV but bear in mind that:
+    - ARV balances are subject to decay (for the purposes of rewards)
+    - PRV balances may be deposited into the RollStaker
+    :param `shards`: how to split the holders for concurrent fetching, like `ACCOUNT_SHARDS`.
+    None fetches them in one sequence, which is quicker when they fit in a few pages
+    """
     return graphql_iterate_query(
         SUBGRAPHS.AUXO_STAKING,
-        ["erc20Contract", "balances"],
-        dict(query=query, variables=variables),
+        TOKEN_HODLERS_PATH,
+        token_hodlers_params(conf, token_address),
+        cursor=ID_CURSOR,
+        cache=page_cache(conf),
+        shards=shards,
+    )
+
+
+def stream_token_hodlers(conf: Config, token_address: EthereumAddress) -> Iterator:
+    """
+    Streaming version of `get_token_hodlers`, yields each holder as its page arrives.
+    The next page is downloaded in the background while the current one is consumed.
+    """
+    pages = graphql_iterate_pages(
+        SUBGRAPHS.AUXO_STAKING,
+        TOKEN_HODLERS_PATH,
+        token_hodlers_params(conf, token_address),
+        cursor=ID_CURSOR,
+        cache=page_cache(conf),
     )
+    for page in prefetch(pages):
+        yield from page
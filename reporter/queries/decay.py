@@ -0,0 +1,112 @@
+import random
+from typing import Callable, Mapping, Optional, Union, cast
+
+from reporter.errors import DecayMismatchException
+from reporter.models import ARV, ARVStaker, EthereumAddress
+
+"""
+The DecayOracle derives each staker's boosted balance from their lock: ARV decays linearly
+from the full balance when the lock starts to zero when it expires. Once the locks are known
+we can apply the same formula to every staker at once, instead of one `balanceOf` call each,
+and check a sample against the oracle to make sure the two agree.
+"""
+
+# share of stakers checked against the oracle after computing balances locally
+DECAY_VERIFY_FRACTION = 0.01
+
+# always check at least this many stakers, or all of them if there are fewer
+DECAY_VERIFY_MIN_SAMPLE = 20
+
+BoostOracle = Callable[[list[ARVStaker]], Mapping[EthereumAddress, Union[int, str]]]
+
+
+def decayed_balances(
+    balances: list[int],
+    locked_at: list[int],
+    durations: list[int],
+    timestamp: int,
+) -> list[int]:
+    """
+    Linear decay over columns of lock data, using integer division as the contract does.
+    Balances are uint256, which is beyond float precision, so this stays in python ints.
+
+    :param `balances`: non decayed ARV balances
+    :param `locked_at`: lock start times
+    :param `durations`: lock durations, in seconds
+    :param `timestamp`: time to decay to, usually the timestamp of the snapshot block
+    """
+    return [
+        # time elapsed is clamped to the lock, so nothing decays before it starts
+        balance * (duration - min(max(timestamp - start, 0), duration)) // duration
+        if duration
+        else 0
+        for balance, start, duration in zip(balances, locked_at, durations)
+    ]
+
+
+def compute_boosted_balances(
+    stakers: list[ARVStaker], timestamp: int
+) -> dict[EthereumAddress, int]:
+    """
+    Boosted balance of every staker from the lock already attached to their ARV
+    """
+    tokens = [cast(ARV, s.token) for s in stakers]
+    for s, t in zip(stakers, tokens):
+        if t.lock is None:
+            raise ValueError(f"Staker {s.address} has no lock, fetch locks first")
+
+    boosted = decayed_balances(
+        [int(t.amount) for t in tokens],
+        [t.lock.lockedAt for t in tokens],  # type: ignore
+        [t.lock.lockDuration for t in tokens],  # type: ignore
+        timestamp,
+    )
+    return {s.address: b for s, b in zip(stakers, boosted)}
+
+
+def decay_sample(
+    stakers: list[ARVStaker],
+    fraction: float = DECAY_VERIFY_FRACTION,
+    min_sample: int = DECAY_VERIFY_MIN_SAMPLE,
+    seed: Optional[int] = None,
+) -> list[ARVStaker]:
+    """
+    Random subset of `stakers` to check, of size `fraction` but never fewer than `min_sample`
+    """
+    size = min(len(stakers), max(min_sample, round(len(stakers) * fraction)))
+    return random.Random(seed).sample(stakers, size)
+
+
+def verify_boosted_balances(
+    stakers: list[ARVStaker],
+    computed: Mapping[EthereumAddress, int],
+    oracle: BoostOracle,
+    fraction: float = DECAY_VERIFY_FRACTION,
+    min_sample: int = DECAY_VERIFY_MIN_SAMPLE,
+    seed: Optional[int] = None,
+) -> None:
+    """
+    Check a sample of locally computed balances against the DecayOracle,
+    raise `DecayMismatchException` if any of them disagree.
+
+    :param `oracle`: fetches the oracle balance for a list of stakers, eg `get_boosted_lock`
+    :param `fraction`: share of stakers to check, pass 1 to check all of them
+    """
+    sample = decay_sample(stakers, fraction, min_sample, seed)
+    if not sample:
+        return
+
+    expected = oracle(sample)
+    mismatches = [
+        (s.address, computed[s.address], int(expected[s.address]))
+        for s in sample
+        if computed[s.address] != int(expected[s.address])
+    ]
+    if mismatches:
+        details = ", ".join(
+            f"{addr}: computed {ours}, oracle {theirs}"
+            for addr, ours, theirs in mismatches[:5]
+        )
+        raise DecayMismatchException(
+            f"{len(mismatches)} of {len(sample)} sampled boosted balances differ from the DecayOracle: {details}"
+        )
@@ -1,6 +1,6 @@
-from typing import Literal
+from __future__ import annotations
 
-from multicall import Call, Multicall  # type: ignore
+from typing import TYPE_CHECKING, Iterator, Literal, Optional
 
 from reporter.env import ADDRESSES
 from reporter.models import (
@@ -10,7 +10,21 @@ from reporter.models import (
     EthereumAddress,
     PRVStaker,
 )
-from reporter.queries.common import SUBGRAPHS, graphql_iterate_query, w3
+from reporter.queries.cache import DiskCache, page_cache
+from reporter.queries.chain_reader import chain_reader
+from reporter.queries.common import (
+    ID_CURSOR,
+    SUBGRAPHS,
+    GraphQLConfig,
+    GraphQLShards,
+    PagedQuery,
+    graphql_iterate_pages,
+    graphql_iterate_query,
+    prefetch,
+)
+
+if TYPE_CHECKING:
+    from multicall import Call  # type: ignore
 
 """
 We calculate PRV differently to ARV. ARV rewards are distributed to active voters, PRV rewards
@@ -26,39 +40,85 @@ PRVDepositorGraphQLReturn = list[
 ]
 
 
-def get_all_prv_depositors(block: int) -> PRVDepositorGraphQLReturn:
-    """
-    returns a simple list of every user that has a nonzero PRV staked balance in the rollstaker.
-    This will include pending stakes that should not be counted as active
+PRV_DEPOSITORS_PATH = ["prvstakingBalances"]
 
-    Therefore, ensure you check the user's active balance (in the current epoch) before assigning rewards.
+
+def prv_depositors_query(block: int) -> PagedQuery:
     """
-    query = """
-    query ($block: Int, $skip: Int) {
-      prvstakingBalances(skip: $skip, block: { number: $block }, where: { value_not: "0" }) {
+    Query for nonzero RollStaker balances at `block`, paged on the balance id
+    """
+    field = """
+      prvstakingBalances(
+        first: 1000
+        orderBy: id
+        orderDirection: asc
+        block: { number: $block }
+        where: {
+          value_not: "0"
+          id_gt: $id_gt
+        }
+      ) {
+        id
         account {
           id
         }
         value
       }
-    }
     """
+    types = {"block": "Int", "id_gt": "String"}
     # this also needs to be at the block number
+    variables = {"id_gt": "", "block": block}
+    return PagedQuery(field, types, variables, access_path=[])
+
+
+def prv_depositors_params(block: int) -> GraphQLConfig:
+    return prv_depositors_query(block).params()
+
+
+def get_all_prv_depositors(
+    block: int,
+    cache: Optional[DiskCache] = None,
+    shards: Optional[GraphQLShards] = None,
+) -> PRVDepositorGraphQLReturn:
+    """
+    returns a simple list of every user that has a nonzero PRV staked balance in the rollstaker.
+    This will include pending stakes that should not be counted as active
+
+    Therefore, ensure you check the user's active balance (in the current epoch) before assigning rewards.
+    :param `shards`: how to split the depositors for concurrent fetching, like `ACCOUNT_SHARDS`.
+    None fetches them in one sequence, which is quicker when they fit in a few pages
+    """
     return graphql_iterate_query(
         SUBGRAPHS.AUXO_STAKING,
-        ["prvstakingBalances"],
-        dict(query=query, variables={"skip": 0, "block": block}),
+        PRV_DEPOSITORS_PATH,
+        prv_depositors_params(block),
+        cursor=ID_CURSOR,
+        cache=cache,
+        shards=shards,
     )
 
 
-def get_prv_staked_balances(
-    stakers: list[EthereumAddress],
-    conf: Config,
-) -> dict[EthereumAddress, str]:
+def stream_prv_depositors(
+    block: int, cache: Optional[DiskCache] = None
+) -> Iterator[dict[Literal["account"], dict[Literal["id"], EthereumAddress]]]:
     """
-    For a given list of stakers, fetch the balance in the current epoch that is earning rewards
+    Streaming version of `get_all_prv_depositors`, yields each depositor as its page arrives
     """
-    calls = [
+    pages = graphql_iterate_pages(
+        SUBGRAPHS.AUXO_STAKING,
+        PRV_DEPOSITORS_PATH,
+        prv_depositors_params(block),
+        cursor=ID_CURSOR,
+        cache=cache,
+    )
+    for page in prefetch(pages):
+        yield from page
+
+
+def prv_staked_balance_calls(stakers: list[EthereumAddress]) -> list[Call]:
+    from multicall import Call
+
+    return [
         Call(
             # address to call:
             ADDRESSES.PRV_ROLLSTAKER,
@@ -70,22 +130,52 @@ def get_prv_staked_balances(
         for s in stakers
     ]
 
-    # Immediately execute the multicall
-    # need to add the block number here
-    return Multicall(calls, _w3=w3, block_id=conf.block_snapshot)()
+
+def get_prv_staked_balances(
+    stakers: list[EthereumAddress],
+    conf: Config,
+) -> dict[EthereumAddress, str]:
+    """
+    For a given list of stakers, fetch the balance in the current epoch that is earning rewards
+    """
+
+    # Immediately execute the multicall, in chunks
+    return chain_reader(prv_staked_balance_calls(stakers), conf.block_snapshot)
 
 
-def get_prv_stakers(conf: Config) -> list[PRVStaker]:
+async def get_prv_staked_balances_async(
+    stakers: list[EthereumAddress],
+    conf: Config,
+) -> dict[EthereumAddress, str]:
     """
-    Fetch a list of all accounts with deposits in the RollStaker contract
-    Then filter to just those with a currently active balance of > 1
+    Awaitable version of `get_prv_staked_balances`
     """
+    return await chain_reader.coroutine(
+        prv_staked_balance_calls(stakers), conf.block_snapshot
+    )
 
-    all_depositors = [
-        d["account"]["id"] for d in get_all_prv_depositors(conf.block_snapshot)
-    ]
 
-    prv_balances = get_prv_staked_balances(all_depositors, conf)
+def depositor_addresses(depositors: PRVDepositorGraphQLReturn) -> list[EthereumAddress]:
+    return [d["account"]["id"] for d in depositors]
+
+
+def get_prv_stakers(
+    conf: Config,
+    depositors: Optional[PRVDepositorGraphQLReturn] = None,
+    balances: Optional[dict[EthereumAddress, str]] = None,
+) -> list[PRVStaker]:
+    """
+    Fetch a list of all accounts with deposits in the RollStaker contract
+    Then filter to just those with a currently active balance of > 1
+    :param `depositors`: already fetched results of `get_all_prv_depositors`, if available
+    :param `balances`: already read results of `get_prv_staked_balances` for the depositors, if available
+    """
+    if balances is not None:
+        prv_balances = balances
+    else:
+        if depositors is None:
+            depositors = get_all_prv_depositors(conf.block_snapshot, page_cache(conf))
+        prv_balances = get_prv_staked_balances(depositor_addresses(depositors), conf)
 
     return [
         PRVStaker(address=addr, prv_holding=staked)
@@ -112,6 +202,10 @@ def prv_stakers_to_accounts(stakers: list[PRVStaker], conf: Config) -> list[Acco
     ]
 
 
-def get_prv_accounts(conf: Config) -> list[Account]:
-    stakers = get_prv_stakers(conf)
+def get_prv_accounts(
+    conf: Config,
+    depositors: Optional[PRVDepositorGraphQLReturn] = None,
+    balances: Optional[dict[EthereumAddress, str]] = None,
+) -> list[Account]:
+    stakers = get_prv_stakers(conf, depositors, balances)
     return prv_stakers_to_accounts(stakers, conf)
@@ -0,0 +1,113 @@
+import threading
+from typing import Any, Callable, Optional
+
+from hexbytes import HexBytes
+
+from reporter.queries.cache import DiskCache
+
+"""
+eth_calls pinned to a block number (the epoch's `block_snapshot`) return the same result forever,
+so we keep them on disk and skip the RPC when a run, or a test scenario, repeats them.
+Calls against a tag such as "latest" are passed straight through.
+"""
+
+# shared by every epoch: a result depends only on the chain, the block and the call
+ETH_CALL_CACHE_DIR = "reports/.eth-call-cache"
+
+# block tags whose result can still change
+MUTABLE_BLOCK_TAGS = {"latest", "pending", "safe", "finalized", "earliest"}
+
+
+def eth_call_cache_key(chain_id: Any, params: list[Any]) -> Optional[str]:
+    """
+    Cache key for the params of an eth_call, or None if the call is not pinned to a block
+    """
+    if len(params) != 2:
+        # state overrides or missing block
+        return None
+
+    tx, block = params
+    if block is None or block in MUTABLE_BLOCK_TAGS:
+        return None
+
+    block_number = block if isinstance(block, int) else int(block, 16)
+    data = HexBytes(tx.get("data") or tx.get("input") or b"").hex()
+    return DiskCache.key(
+        "eth_call", chain_id, block_number, str(tx["to"]).lower(), data
+    )
+
+
+def construct_eth_call_cache_middleware(cache: DiskCache) -> Callable:
+    """
+    Web3 middleware that reads historical eth_call results from `cache`
+    and stores every successful one it has to fetch
+    """
+
+    def middleware(make_request: Callable, w3: Any) -> Callable:
+        chain: dict[str, Any] = {}
+        lock = threading.Lock()
+
+        def chain_id() -> Any:
+            # asked once per provider, rather than once per call
+            with lock:
+                if "id" not in chain:
+                    chain["id"] = make_request("eth_chainId", [])["result"]
+                return chain["id"]
+
+        def inner(method: str, params: Any) -> Any:
+            if method != "eth_call":
+                return make_request(method, params)
+
+            key = eth_call_cache_key(chain_id(), list(params))
+            if key is None:
+                return make_request(method, params)
+
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+            response = make_request(method, params)
+            if "error" not in response and response.get("result") is not None:
+                cache.set(key, dict(response))
+            return response
+
+        return inner
+
+    return middleware
+
+
+def construct_async_eth_call_cache_middleware(cache: DiskCache) -> Callable:
+    """
+    Async version of `construct_eth_call_cache_middleware`, for `async_w3`
+    """
+
+    async def middleware(make_request: Callable, w3: Any) -> Callable:
+        chain: dict[str, Any] = {}
+
+        async def inner(method: str, params: Any) -> Any:
+            if method != "eth_call":
+                return await make_request(method, params)
+
+            if "id" not in chain:
+                chain["id"] = (await make_request("eth_chainId", []))["result"]
+
+            key = eth_call_cache_key(chain["id"], list(params))
+            if key is None:
+                return await make_request(method, params)
+
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+            response = await make_request(method, params)
+            if "error" not in response and response.get("result") is not None:
+                cache.set(key, dict(response))
+            return response
+
+        return inner
+
+    return middleware
+
+
+# one cache for the whole run, so its hit and miss counts can be reported
+eth_call_cache = DiskCache(ETH_CALL_CACHE_DIR)
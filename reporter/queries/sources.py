@@ -0,0 +1,148 @@
+import asyncio
+from decimal import Decimal
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
+
+import reporter.queries.arv_stakers as arv_stakers
+import reporter.queries.prv_stakers as prv_stakers
+import reporter.queries.total_supply as total_supply
+import reporter.queries.voters as voters
+from reporter import env
+from reporter.env import ADDRESSES
+from reporter.models import Config, EthereumAddress
+from reporter.queries.cache import page_cache
+from reporter.queries.common import (
+    ACCOUNT_SHARDS,
+    SUBGRAPHS,
+    graphql_batch_iterate,
+    token_hodlers_query,
+)
+from reporter.queries.arv_stakers import ARVOnchainState, holder_addresses
+from reporter.queries.prv_stakers import (
+    PRVDepositorGraphQLReturn,
+    depositor_addresses,
+    prv_depositors_query,
+)
+
+"""
+The raw data for an epoch comes from independent sources (Snapshot, the Governor subgraph,
+the staking subgraph and the chain), so there is no reason to wait on one before asking the next.
+The on-chain reads need the holders from the staking subgraph, but not the votes,
+so they are sent as soon as the holders arrive and overlap with the vote paging.
+The functions are looked up on their modules at call time so they can be monkeypatched in tests.
+"""
+
+# how many sources can be fetched at the same time
+MAX_CONCURRENT_FETCHES = 4
+
+T = TypeVar("T")
+
+
+class EpochSources(NamedTuple):
+    """
+    Raw results of each independent data source for the epoch
+    :param `offchain_votes`: snapshot votes, as returned by `get_offchain_votes`
+    :param `onchain_votes`: governor votes, as returned by `get_onchain_votes`
+    :param `arv_holders`: ARV balances at the snapshot block, as returned by `get_token_hodlers`
+    :param `prv_depositors`: RollStaker depositors, as returned by `get_all_prv_depositors`
+    :param `prv_total_supply`: PRV supply at the snapshot block
+    :param `arv_onchain`: locks and boosted balances of the ARV holders, as returned by `get_arv_onchain_state`
+    :param `prv_balances`: active RollStaker balances of the depositors, as returned by `get_prv_staked_balances`
+    """
+
+    offchain_votes: list[Any]
+    onchain_votes: list[Any]
+    arv_holders: list[Any]
+    prv_depositors: PRVDepositorGraphQLReturn
+    prv_total_supply: Decimal
+    arv_onchain: Optional[ARVOnchainState] = None
+    prv_balances: Optional[dict[EthereumAddress, str]] = None
+
+
+def get_holders_and_depositors(
+    conf: Config,
+) -> tuple[list[Any], PRVDepositorGraphQLReturn]:
+    """
+    ARV holders and PRV depositors both come from the staking subgraph at the snapshot block,
+    so the pages of both, across every address range, are packed into shared requests.
+    Returns the same results as `get_token_hodlers` and `get_all_prv_depositors`.
+    """
+    results = graphql_batch_iterate(
+        SUBGRAPHS.AUXO_STAKING,
+        {
+            "arv_holders": token_hodlers_query(conf, ADDRESSES.ARV),
+            "prv_depositors": prv_depositors_query(conf.block_snapshot),
+        },
+        shards=ACCOUNT_SHARDS,
+        cache=page_cache(conf),
+    )
+    return results["arv_holders"], results["prv_depositors"]
+
+
+async def _bounded(semaphore: asyncio.Semaphore, fn: Callable[..., T], *args) -> T:
+    """Run a blocking fetch in a worker thread once a slot is free"""
+    async with semaphore:
+        return await asyncio.to_thread(fn, *args)
+
+
+async def fetch_stakers(
+    conf: Config, semaphore: asyncio.Semaphore
+) -> tuple[
+    list[Any], PRVDepositorGraphQLReturn, ARVOnchainState, dict[EthereumAddress, str]
+]:
+    """
+    Holders and depositors from the subgraph, then their on-chain reads.
+    The reads are awaited on the event loop rather than a worker thread, so they do not take a slot.
+    """
+    arv_holders, prv_depositors = await _bounded(
+        semaphore, get_holders_and_depositors, conf
+    )
+    arv_onchain, prv_balances = await asyncio.gather(
+        arv_stakers.get_arv_onchain_state_async(
+            holder_addresses(arv_holders),
+            conf.block_snapshot,
+            with_boost=not env.ARV_LOCAL_DECAY,
+        ),
+        prv_stakers.get_prv_staked_balances_async(
+            depositor_addresses(prv_depositors), conf
+        ),
+    )
+    return arv_holders, prv_depositors, arv_onchain, prv_balances
+
+
+async def fetch_epoch_sources_async(
+    conf: Config, max_concurrency: int = MAX_CONCURRENT_FETCHES
+) -> EpochSources:
+    """
+    Start every independent fetch together, at most `max_concurrency` at a time
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    (
+        offchain_votes,
+        onchain_votes,
+        (arv_holders, prv_depositors, arv_onchain, prv_balances),
+        prv_total_supply,
+    ) = await asyncio.gather(
+        _bounded(semaphore, voters.get_offchain_votes, conf),
+        _bounded(semaphore, voters.get_onchain_votes, conf),
+        fetch_stakers(conf, semaphore),
+        _bounded(semaphore, total_supply.get_prv_total_supply, conf.block_snapshot),
+    )
+    return EpochSources(
+        offchain_votes=offchain_votes,
+        onchain_votes=onchain_votes,
+        arv_holders=arv_holders,
+        prv_depositors=prv_depositors,
+        prv_total_supply=prv_total_supply,
+        arv_onchain=arv_onchain,
+        prv_balances=prv_balances,
+    )
+
+
+def fetch_epoch_sources(
+    conf: Config, max_concurrency: int = MAX_CONCURRENT_FETCHES
+) -> EpochSources:
+    """
+    Blocking entrypoint: fetch all epoch data sources concurrently.
+    Wall clock time is that of the slowest source, rather than the sum of all of them.
+    """
+    return asyncio.run(fetch_epoch_sources_async(conf, max_concurrency))
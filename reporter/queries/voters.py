@@ -1,10 +1,11 @@
-from typing import Any
+from typing import Any, Iterable, Iterator, Optional, Union
 
 import requests
 from pydantic import parse_obj_as
 
 import reporter.utils as utils
-from reporter.env import ADDRESSES, SNAPSHOT_SPACE_ID
+from reporter import env
+from reporter.env import ADDRESSES
 from reporter.models import (
     Config,
     Delegate,
@@ -13,16 +14,39 @@ from reporter.models import (
     OnChainProposal,
     OnChainVote,
     ARVStaker,
+    StakerTable,
+    address_id,
+    address_ids,
+    VoterIndex,
+)
+from reporter.queries.cache import window_cache
+from reporter.queries.common import (
+    ID_CURSOR,
+    SUBGRAPHS,
+    GraphQLConfig,
+    GraphQLCursor,
+    graphql_iterate_pages,
+    graphql_iterate_query,
+    prefetch,
 )
-from reporter.queries.common import SUBGRAPHS, graphql_iterate_query
 
+# snapshot votes are paged on their creation time rather than their id.
+# The cursor is inclusive so votes sharing a timestamp across pages are not lost.
+SNAPSHOT_CURSOR = GraphQLCursor(field="created", variable="created_gte", unique="id")
 
-def get_offchain_votes(conf: Config):
-    """Fetch snapshot votes for the DAO between start and end timestamps in config object"""
+
+def offchain_votes_params(conf: Config) -> GraphQLConfig:
+    """Snapshot votes query for the DAO between start and end timestamps in config object"""
 
     votes_query = """
-        query($skip: Int, $space: String, $created_gte: Int, $created_lte: Int) { 
-            votes(skip: $skip, first: 1000, where: {space: $space, created_gte: $created_gte, created_lte: $created_lte}) {
+        query($space: String, $created_gte: Int, $created_lte: Int) { 
+            votes(
+                first: 1000
+                orderBy: "created"
+                orderDirection: asc
+                where: {space: $space, created_gte: $created_gte, created_lte: $created_lte}
+            ) {
+                id
                 voter
                 choice
                 created
@@ -40,14 +64,21 @@ def get_offchain_votes(conf: Config):
     """
 
     variables = {
-        "skip": 0,
-        "space": SNAPSHOT_SPACE_ID,
+        "space": env.SNAPSHOT_SPACE_ID,
         "created_gte": conf.start_timestamp,
         "created_lte": conf.end_timestamp,
     }
+    return dict(query=votes_query, variables=variables)
+
 
+def get_offchain_votes(conf: Config):
+    """Fetch snapshot votes for the DAO between start and end timestamps in config object"""
     votes: list[Any] = graphql_iterate_query(
-        SUBGRAPHS.SNAPSHOT, ["votes"], dict(query=votes_query, variables=variables)
+        SUBGRAPHS.SNAPSHOT,
+        ["votes"],
+        offchain_votes_params(conf),
+        cursor=SNAPSHOT_CURSOR,
+        cache=window_cache(conf),
     )
     return votes
 
@@ -58,14 +89,16 @@ def get_onchain_votes(conf: Config) -> list:
     """
 
     votes_query = """
-    query($governor: String, $timestamp_gt: Int, $timestamp_lte: Int, $skip: Int) {
+    query($governor: String, $timestamp_gt: Int, $timestamp_lte: Int, $id_gt: String) {
         voteCasts(
             first: 1000
-            skip: $skip
+            orderBy: id
+            orderDirection: asc
             where: { 
                 timestamp_gt: $timestamp_gt,
                 timestamp_lte: $timestamp_lte,
-                governor: $governor
+                governor: $governor,
+                id_gt: $id_gt
             }
         ) {
             id
@@ -101,7 +134,7 @@ def get_onchain_votes(conf: Config) -> list:
     """
 
     variables = {
-        "skip": 0,
+        "id_gt": "",
         "governor": ADDRESSES.GOVERNOR,
         "timestamp_gt": conf.start_timestamp,
         "timestamp_lte": conf.end_timestamp,
@@ -110,33 +143,86 @@ def get_onchain_votes(conf: Config) -> list:
         SUBGRAPHS.AUXO_GOV,
         ["voteCasts"],
         dict(query=votes_query, variables=variables),
+        cursor=ID_CURSOR,
+        cache=window_cache(conf),
     )
     return votes
 
 
+class ProposalTable:
+    """
+    Proposals seen while reading votes, interned by id.
+    Every vote repeats its proposal in full, so the table parses each proposal once
+    and the votes on it hold a reference to the same `Proposal`.
+    """
+
+    def __init__(self) -> None:
+        self.proposals: dict[str, Proposal] = {}
+        self._onchain: dict[str, OnChainProposal] = {}
+
+    def __len__(self) -> int:
+        return len(self.proposals)
+
+    def __iter__(self) -> Iterator[Proposal]:
+        return iter(self.proposals.values())
+
+    @classmethod
+    def from_votes(cls, votes: Iterable[Vote]) -> "ProposalTable":
+        table = cls()
+        for v in votes:
+            table.add(v.proposal)
+        return table
+
+    def add(self, proposal: Proposal) -> Proposal:
+        """Add `proposal`, or return the proposal already in the table with its id"""
+        return self.proposals.setdefault(proposal.id, proposal)
+
+    def parse(self, raw: Any) -> Proposal:
+        """Snapshot proposal data `raw`, validated only the first time its id is seen"""
+        proposal = self.proposals.get(raw["id"])
+        if proposal is None:
+            proposal = self.proposals[raw["id"]] = Proposal.parse_obj(raw)
+        return proposal
+
+    def parse_onchain(self, raw: Any) -> OnChainProposal:
+        """Governor proposal data `raw`, validated only the first time its id is seen"""
+        onchain = self._onchain.get(raw["id"])
+        if onchain is None:
+            onchain = self._onchain[raw["id"]] = OnChainProposal.parse_obj(raw)
+        return onchain
+
+    def coerce(self, onchain: OnChainProposal) -> Proposal:
+        """`onchain` as a snapshot `Proposal`, coerced only the first time its id is seen"""
+        proposal = self.proposals.get(onchain.id)
+        if proposal is None:
+            proposal = self.proposals[onchain.id] = onchain.coerce_to_proposal()
+        return proposal
+
+
 def filter_votes_by_proposal(
     votes: list[Vote],
+    proposals: Optional[ProposalTable] = None,
 ) -> tuple[list[Vote], list[Proposal]]:
     """
     Prompt the operator to remove invalid proposals this month
     :param `votes`: list of all votes
+    :param `proposals`: the table the votes were read into, built from `votes` if not passed
     :returns: A tuple of valid votes and proposals
     """
 
-    unique_proposals = {v.proposal.id: v.proposal for v in votes}
+    table = ProposalTable.from_votes(votes) if proposals is None else proposals
     if utils.yes_or_no("Do you want to filter proposals?"):
-        proposals = []
-        proposals_ids = []
-        for p in unique_proposals.values():
+        valid = [
+            p
+            for p in table
+            if utils.yes_or_no(f"Is proposal {p.title} a valid proposal?")
+        ]
+        valid_ids = {p.id for p in valid}
 
-            if utils.yes_or_no(f"Is proposal {p.title} a valid proposal?"):
-                proposals.append(p)
-                proposals_ids.append(p.id)
-
-        return ([v for v in votes if v.proposal.id in proposals_ids], proposals)
+        return ([v for v in votes if v.proposal.id in valid_ids], valid)
 
     else:
-        return (votes, list(unique_proposals.values()))
+        return (votes, list(table))
 
 
 # TODO: Delegation is not currently supported
@@ -152,8 +238,41 @@ def get_delegates() -> list[Delegate]:
     # return parse_obj_as(list[Delegate], delegate_data.get("delegates"))
 
 
+def classify_voters(
+    votes: list[Vote], stakers: Union[list[ARVStaker], StakerTable]
+) -> VoterIndex:
+    """
+    Compare the list of `stakers` to the list of `votes` to see who has/has not voted this month,
+    in a single pass over the stakers.
+    Also factors in delegated votes for whitelisted accounts.
+
+    The voter and delegator ids are indexed once, so each staker is classified with set lookups.
+    Stakers keep their order, followed by the delegators in the order they were delegated.
+    :returns: a `VoterIndex` that can be passed on to `init_account_rewards`
+    """
+    # compare registry ids rather than address strings
+    voters = address_ids(v.voter for v in votes)
+    stakers_ids = (
+        stakers.address_ids
+        if isinstance(stakers, StakerTable)
+        else [s.address_id for s in stakers]
+    )
+
+    # TODO: Delegation is not currently supported
+    delegates = get_delegates()
+    delegators = address_ids(d.delegator for d in delegates)
+
+    index = VoterIndex()
+    for i in stakers_ids:
+        if i not in delegators:
+            index.add(i, i in voters)
+    for d in delegates:
+        index.add(address_id(d.delegator), address_id(d.delegate) in voters)
+    return index
+
+
 def get_voters(
-    votes: list[Vote], stakers: list[ARVStaker]
+    votes: list[Vote], stakers: Union[list[ARVStaker], StakerTable]
 ) -> tuple[list[str], list[str]]:
     """
     Compare the list of `stakers` to the list of `votes` to see who has/has not voted this month.
@@ -162,58 +281,145 @@ def get_voters(
         * First is all addresses that voted
         * Second is all addresses that have not voted
     """
-    voters = set([v.voter for v in votes])
-    stakers_addrs = [s.address for s in stakers]
+    index = classify_voters(votes, stakers)
+    return index.voted, index.not_voted
 
-    # TODO: Delegation is not currently supported
-    delegates = get_delegates()
 
-    stakers_addrs_no_delegators = [
-        addr for addr in stakers_addrs if addr not in delegates
-    ]
+def parse_vote(vote: Any, proposals: ProposalTable) -> Vote:
+    """
+    Validate a snapshot vote, taking its proposal from `proposals`
+    so each proposal is validated once and shared by all its votes
+    """
+    raw = vote.get("proposal") if isinstance(vote, dict) else None
+    if not isinstance(raw, dict) or "id" not in raw:
+        parsed = Vote.parse_obj(vote)
+        proposals.add(parsed.proposal)
+        return parsed
+    return Vote.parse_obj({**vote, "proposal": proposals.parse(raw)})
+
+
+def parse_votes(
+    votes: list[Any], proposals: Optional[ProposalTable] = None
+) -> list[Vote]:
+    table = ProposalTable() if proposals is None else proposals
+    return [parse_vote(v, table) for v in votes]
+
 
-    voted = [addr for addr in stakers_addrs_no_delegators if addr in voters] + [
-        d.delegator for d in delegates if d.delegate in voters
-    ]
+def parse_offchain_votes(
+    conf: Config, proposals: Optional[ProposalTable] = None
+) -> list[Vote]:
+    return parse_votes(get_offchain_votes(conf), proposals)
+
+
+def stream_offchain_votes(
+    conf: Config, proposals: Optional[ProposalTable] = None
+) -> Iterator[Vote]:
+    """
+    Streaming version of `parse_offchain_votes`, yields each vote as its page arrives
+    """
+    pages = graphql_iterate_pages(
+        SUBGRAPHS.SNAPSHOT,
+        ["votes"],
+        offchain_votes_params(conf),
+        cursor=SNAPSHOT_CURSOR,
+        cache=window_cache(conf),
+    )
+    table = ProposalTable() if proposals is None else proposals
+    for page in prefetch(pages):
+        for vote in page:
+            yield parse_vote(vote, table)
 
-    not_voted = [addr for addr in stakers_addrs_no_delegators if addr not in voters] + [
-        d.delegator for d in delegates if d.delegate not in voters
-    ]
 
-    return (utils.unique(voted), utils.unique(not_voted))
+def parse_governor_vote(vote: Any, proposals: ProposalTable) -> OnChainVote:
+    """On chain version of `parse_vote`"""
+    raw = vote.get("proposal") if isinstance(vote, dict) else None
+    if not isinstance(raw, dict) or "id" not in raw:
+        return OnChainVote.parse_obj(vote)
+    return OnChainVote.parse_obj({**vote, "proposal": proposals.parse_onchain(raw)})
 
 
-def parse_offchain_votes(conf: Config) -> list[Vote]:
-    return parse_obj_as(list[Vote], get_offchain_votes(conf))
+def parse_governor_votes(
+    votes: list[Any], proposals: Optional[ProposalTable] = None
+) -> list[OnChainVote]:
+    table = ProposalTable() if proposals is None else proposals
+    return [parse_governor_vote(v, table) for v in votes]
 
 
-def parse_onchain_votes(conf: Config) -> list[OnChainVote]:
-    return parse_obj_as(list[OnChainVote], get_onchain_votes(conf))
+def parse_onchain_votes(
+    conf: Config, proposals: Optional[ProposalTable] = None
+) -> list[OnChainVote]:
+    return parse_governor_votes(get_onchain_votes(conf), proposals)
 
 
 def combine_on_off_chain_proposals(
-    offchain: list[Proposal], onchain: list[OnChainProposal]
+    offchain: list[Proposal],
+    onchain: list[OnChainProposal],
+    proposals: Optional[ProposalTable] = None,
 ) -> list[Proposal]:
-
-    coerced = [ocp.coerce_to_proposal() for ocp in onchain]
-    return offchain + coerced
+    """
+    All proposals once each, with the on chain proposals coerced to snapshot proposals
+    :param `proposals`: table to add the proposals to, a new one if not passed
+    """
+    table = ProposalTable() if proposals is None else proposals
+    for p in offchain:
+        table.add(p)
+    for ocp in onchain:
+        table.coerce(ocp)
+    return list(table)
 
 
 def combine_on_off_chain_votes(
-    offchain: list[Vote], onchain: list[OnChainVote]
+    offchain: list[Vote],
+    onchain: list[OnChainVote],
+    proposals: Optional[ProposalTable] = None,
 ) -> list[Vote]:
-
-    coerced = [ocv.coerce_to_vote() for ocv in onchain]
+    """
+    :param `proposals`: table the proposals of all votes are added to, a new one if not passed
+    """
+    table = ProposalTable() if proposals is None else proposals
+    for v in offchain:
+        table.add(v.proposal)
+    coerced = [ocv.coerce_to_vote(table.coerce(ocv.proposal)) for ocv in onchain]
     return offchain + coerced
 
 
-def get_votes(conf: Config) -> tuple[list[Vote], list[Proposal]]:
+def vote_dicts(votes: list[Vote]) -> list[dict[str, Any]]:
+    """`Vote.dict()` of each vote, serialising each shared proposal once"""
+    proposals: dict[str, dict[str, Any]] = {}
+    dicts = []
+    for v in votes:
+        proposal = proposals.get(v.proposal.id)
+        if proposal is None:
+            proposal = proposals[v.proposal.id] = v.proposal.dict()
+        dicts.append({**v.dict(exclude={"proposal"}), "proposal": proposal})
+    return dicts
+
+
+def get_votes(
+    conf: Config,
+    offchain: Optional[list[Any]] = None,
+    onchain: Optional[list[Any]] = None,
+) -> tuple[list[Vote], list[Proposal]]:
     """
     Fetch all votes from offchain and onchain sources and combine them
+    :param `offchain`: already fetched results of `get_offchain_votes`, if available
+    :param `onchain`: already fetched results of `get_onchain_votes`, if available
     """
-    offchain_votes = parse_offchain_votes(conf)
-    onchain_votes = parse_onchain_votes(conf)
+    # one table for both sources, so each proposal is parsed once and shared by its votes
+    proposals = ProposalTable()
+    offchain_votes = (
+        parse_offchain_votes(conf, proposals)
+        if offchain is None
+        else parse_votes(offchain, proposals)
+    )
+    onchain_votes = (
+        parse_onchain_votes(conf, proposals)
+        if onchain is None
+        else parse_governor_votes(onchain, proposals)
+    )
 
-    combined_votes = combine_on_off_chain_votes(offchain_votes, onchain_votes)
+    combined_votes = combine_on_off_chain_votes(
+        offchain_votes, onchain_votes, proposals
+    )
 
-    return filter_votes_by_proposal(combined_votes)
+    return filter_votes_by_proposal(combined_votes, proposals)
@@ -1,5 +1,4 @@
-from decimal import Decimal
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
 from reporter import utils
 from reporter.models import (
@@ -7,71 +6,94 @@ from reporter.models import (
     AccountState,
     Config,
     ARVStaker,
+    StakerTable,
     TokenSummaryStats,
     ARVRewardSummary,
+    VoterIndex,
+    voter_ids,
 )
 from reporter.rewards import compute_rewards
 
 
 def init_account_rewards(
-    stakers: list[ARVStaker], voters: list[str], conf: Config
-) -> list[Account]:
+    stakers: Union[list[ARVStaker], StakerTable],
+    voters: Union[VoterIndex, list[str]],
+    conf: Config,
+) -> Union[list[Account], StakerTable]:
     """
     Create the base Account object from a list of stakers.
     Rewards will be added later based on the account state.
 
-    :param `stakers`: all vetoken stakers
-    :param `voters`: list of all accounts that voted that month
+    :param `stakers`: all vetoken stakers, a `StakerTable` gives back a table of accounts
+    :param `voters`: all accounts that voted that month, as a list or a `VoterIndex`
     """
+    if isinstance(stakers, StakerTable):
+        # both set a new column, so the others can be shared with the stakers
+        accounts = stakers.replace()
+        accounts.set_states(voters)
+        accounts.init_rewards(conf.reward_token())
+        return accounts
+
+    active_ids = voter_ids(voters)
+    # each account gets its own copy of the reward token
+    rewards = conf.reward_token()
     return [
         Account.from_arv_staker(
             staker,
             state=AccountState.ACTIVE
-            if staker.address in voters
+            if staker.address_id in active_ids
             else AccountState.INACTIVE,
-            rewards=conf.reward_token(),
+            rewards=rewards,
         )
         for staker in stakers
     ]
 
 
 def tokens_by_status(
-    accounts: list[Account], state: Optional[AccountState] = None
-) -> Decimal:
+    accounts: Union[list[Account], StakerTable], state: Optional[AccountState] = None
+) -> int:
     """helper mehod to get total staked holdings by active or inactive"""
+    if isinstance(accounts, StakerTable):
+        return accounts.total(state)
+
     accounts_to_summarize = accounts
 
     if state:
         accounts_to_summarize = utils.filter_state(accounts, state)
 
-    return Decimal(
-        sum(Decimal(account.token.amount) for account in accounts_to_summarize)
-    )
+    return sum(account.token.amount for account in accounts_to_summarize)
 
 
-def compute_token_stats(accounts: list[Account]) -> TokenSummaryStats:
+def compute_token_stats(
+    accounts: Union[list[Account], StakerTable]
+) -> TokenSummaryStats:
     """Summarize token balances by state"""
     total_active_tokens = tokens_by_status(accounts, AccountState.ACTIVE)
     total_inactive_tokens = tokens_by_status(accounts, AccountState.INACTIVE)
     total_tokens = tokens_by_status(accounts, None)
 
     tokenStats = TokenSummaryStats(
-        total=str(int(total_tokens)),
-        active=str(int(total_active_tokens)),
-        inactive=str(int(total_inactive_tokens)),
+        total=total_tokens,
+        active=total_active_tokens,
+        inactive=total_inactive_tokens,
     )
     return tokenStats
 
 
 def distribute(
-    conf: Config, stakers: list[ARVStaker], voters: list[str]
-) -> Tuple[list[Account], ARVRewardSummary, TokenSummaryStats]:
-    """Compute the distribution for all accounts, and summarize the data"""
+    conf: Config,
+    stakers: Union[list[ARVStaker], StakerTable],
+    voters: Union[VoterIndex, list[str]],
+) -> Tuple[Union[list[Account], StakerTable], ARVRewardSummary, TokenSummaryStats]:
+    """
+    Compute the distribution for all accounts, and summarize the data.
+    Passing a `StakerTable` gives back the distribution as a table.
+    """
 
     accounts = init_account_rewards(stakers, voters, conf)
     token_stats = compute_token_stats(accounts)
     distribution, distribution_rewards = compute_rewards(
-        conf.arv_erc20, Decimal(token_stats.active), accounts
+        conf.arv_erc20, token_stats.active, accounts
     )
     summary = ARVRewardSummary.from_existing(distribution_rewards)
 
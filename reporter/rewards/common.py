@@ -1,35 +1,91 @@
-import itertools
 from decimal import Decimal
-from copy import deepcopy
+from fractions import Fraction
+from typing import Optional, Sequence, Union
 
 from reporter.models import (
+    STATE_CODES,
     Account,
     AccountState,
     ERC20Amount,
     RewardSummary,
+    StakerTable,
+    trusted_copy,
 )
 
 
-def distribute_rewards(account: Account, pro_rata: Decimal) -> Account:
+def batch_rewards(
+    amounts: Sequence[int],
+    active: Sequence[bool],
+    total: Union[int, Decimal],
+    total_active: Union[int, Decimal],
+) -> list[Optional[int]]:
+    """
+    Reward of every account in one pass, `amount * total // total_active` for active accounts
+    and None for inactive ones. The arithmetic is exact on integers, rather than going through
+    a pro-rata rate rounded to the decimal precision.
+
+    :param `amounts`: token balance of each account
+    :param `active`: whether each account is active
+    :param `total`: rewards to distribute amongst active accounts, may be a fraction of a unit
+    :param `total_active`: tokens held by all active accounts
+    """
+    if total_active == 0:
+        return [0 if a else None for a in active]
+
+    share = Fraction(total) / Fraction(total_active)
+    numerator, denominator = share.numerator, share.denominator
+    return [
+        amount * numerator // denominator if a else None
+        for amount, a in zip(amounts, active)
+    ]
+
+
+def distribute_rewards(account: Account, reward: Optional[int]) -> Account:
     """
     Add the rewards for the account, for a particular token.
     :param `account`: the account to add rewards to
-    :param `pro_rata`: quantity of reward token to be add per token units held by account
+    :param `reward`: the reward computed by `batch_rewards`, None if the account is inactive
     """
-    # pass by reference can cause errors, so we allocate a new item in memory
-    new_account = deepcopy(account)
-    if account.state == AccountState.ACTIVE:
-        account_reward = int(pro_rata * Decimal(account.token.amount))
-        new_account.rewards.amount = str(
-            Decimal(account.rewards.amount) + account_reward
-        )
-        new_account.notes.append(f"active reward of {account_reward}")
-    return new_account
+    # accounts are immutable, an inactive account is passed on as it is
+    # and an active one is replaced, sharing its nested models with the original
+    if reward is None:
+        return account
+
+    rewards = trusted_copy(account.rewards, amount=account.rewards.amount + reward)
+    return trusted_copy(
+        account,
+        rewards=rewards,
+        notes=[*account.notes, f"active reward of {reward}"],
+    )
+
+
+def distribute_table_rewards(
+    accounts: StakerTable, total: Union[int, Decimal], total_active: Union[int, Decimal]
+) -> StakerTable:
+    """
+    `batch_rewards` over the columns of a `StakerTable`, returns a new table
+    and leaves `accounts` as it was
+    """
+    active = STATE_CODES[AccountState.ACTIVE]
+    account_rewards = batch_rewards(
+        accounts.amounts, [s == active for s in accounts.states], total, total_active
+    )
+    rewards = list(accounts.rewards)
+    notes = dict(accounts.notes)
+    for i, reward in enumerate(account_rewards):
+        if reward is not None:
+            rewards[i] += reward
+            notes[i] = [*notes.get(i, []), f"active reward of {reward}"]
+    # only the rewards and notes change, every other column is shared
+    return accounts.replace(rewards=rewards, notes=notes)
 
 
 def compute_rewards(
-    total_rewards: ERC20Amount, total_active_tokens: Decimal, accounts: list[Account]
-) -> tuple[list[Account], RewardSummary]:
+    total_rewards: ERC20Amount,
+    total_active_tokens: Union[int, Decimal],
+    accounts: Union[list[Account], StakerTable],
+    exact_total: Optional[Decimal] = None,
+) -> tuple[Union[list[Account], StakerTable], RewardSummary]:
     """
 
     Add the rewards that will be distributed across all users, including the pro-rata reward rate for each token
@@ -37,30 +93,32 @@ def compute_rewards(
 
     :param `total_rewards`: rewards token with total quantities to distribute amongst stakers
     :param `total_active_tokens`: tokens belonging to active stakers (total - inactive)
-    :param `accounts`: base array of Account objects that have yet to have rewards added
+    :param `accounts`: base array of Account objects, or a `StakerTable` of accounts,
+    that have yet to have rewards added
+    :param `exact_total`: the rewards before rounding down to whole units of the reward token,
+    if they were computed as a fraction, so the pro-rata rate is not rounded twice
     """
-    pro_rata = (
-        0
-        if total_active_tokens == 0
-        else Decimal(total_rewards.amount) / total_active_tokens
-    )
+    total = total_rewards.amount if exact_total is None else exact_total
+    # only reported in the summary, the rewards are computed exactly by `batch_rewards`
+    pro_rata = 0 if total_active_tokens == 0 else Decimal(total) / total_active_tokens
 
-    rewarded_accounts = list(
-        map(
-            distribute_rewards,  # type: ignore
-            accounts,
-            itertools.repeat(pro_rata),
+    rewarded_accounts: Union[list[Account], StakerTable]
+    if isinstance(accounts, StakerTable):
+        rewarded_accounts = distribute_table_rewards(
+            accounts, total, total_active_tokens
         )
-    )
-    """ 
-    the active rewards are correctly inserted as a string
-    but the total is incorrect
-    
-    """
+    else:
+        account_rewards = batch_rewards(
+            [a.token.amount for a in accounts],
+            [a.state == AccountState.ACTIVE for a in accounts],
+            total,
+            total_active_tokens,
+        )
+        rewarded_accounts = list(map(distribute_rewards, accounts, account_rewards))
 
     # add to summary
     distribution_rewards = RewardSummary(
-        **total_rewards.dict(),
+        **dict(total_rewards),
         pro_rata=str(pro_rata),
     )
 
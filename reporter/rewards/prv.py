@@ -1,16 +1,20 @@
 from decimal import Decimal
-from copy import deepcopy
+from typing import Union, cast
+
 from reporter.models import (
     Account,
     AccountState,
     Config,
+    EthereumAddress,
     PRV,
     RedistributionOption,
     RedistributionWeight,
     TokenSummaryStats,
+    address_id,
     RedistributionContainer,
     PRVRewardSummary,
     RewardSummary,
+    trusted_copy,
 )
 
 
@@ -40,7 +44,7 @@ def prv_active_rewards(
 
 
 def compute_prv_token_stats(
-    accounts: list[Account], total_supply: Decimal
+    accounts: list[Account], total_supply: Union[int, Decimal]
 ) -> TokenSummaryStats:
     """
     Computes summary statistics for a token based on a list of accounts holding that token.
@@ -53,14 +57,61 @@ def compute_prv_token_stats(
         A TokenSummaryStats object containing the total, active, and inactive amounts of the token.
 
     """
-    active = sum(int(a.token.amount) for a in accounts)
+    active = sum(a.token.amount for a in accounts)
     return TokenSummaryStats(
-        total=str(total_supply),
-        active=str(active),
-        inactive=str(int(total_supply) - active),
+        total=total_supply,
+        active=active,
+        inactive=int(total_supply) - active,
     )
 
 
+class AccountIndex:
+    """
+    The accounts of a distribution with the position of each address, built once
+    so that each transfer is a lookup rather than a scan of every account.
+    Addresses are keyed by their `address_registry` id, so any spelling of an address finds its account.
+    """
+
+    def __init__(self, accounts: list[Account]) -> None:
+        # a copy of the list, changed accounts are replaced in it and the original is not modified
+        self.accounts = list(accounts)
+        self.positions: dict[int, int] = {}
+        for i, account in enumerate(self.accounts):
+            self.positions.setdefault(account.address_id, i)
+
+    def transfer(self, r: RedistributionWeight, conf: Config) -> None:
+        """
+        Add the transfer `r` to the account at `r.address`, or to a new account if there is none.
+        Accounts are immutable, so the account receiving it is replaced by a new one.
+        """
+        address = cast(EthereumAddress, r.address)
+        i = self.positions.get(address_id(address))
+
+        # account found, add the additional transfer
+        if i is not None:
+            account = self.accounts[i]
+            self.accounts[i] = trusted_copy(
+                account,
+                notes=[*account.notes, f"Transfer of {r.rewards}"],
+                rewards=trusted_copy(
+                    account.rewards, amount=account.rewards.amount + r.rewards
+                ),
+            )
+            return
+
+        # cant find the account in the list this is a new account (like a multisig)
+        # set it as inactive and add the transfer
+        account = Account(
+            address=address,
+            token=PRV(amount=0),
+            rewards=conf.reward_token(amount=r.rewards),
+            state=AccountState.INACTIVE,
+            notes=[f"Transfer of {r.rewards}"],
+        )
+        self.positions[account.address_id] = len(self.accounts)
+        self.accounts.append(account)
+
+
 def transfer_redistribution(
     _accounts: list[Account], r: RedistributionWeight, conf: Config
 ) -> list[Account]:
@@ -71,29 +122,9 @@ def transfer_redistribution(
         r: A RedistributionWeight object specifying the account address and transfer amount.
         conf: A Config object containing information on reward tokens.
     """
-    accounts = deepcopy(_accounts)
-    # check to see if the account already is due to receive rewards
-    found_account = False
-    for account in accounts:
-        # account found, add the additional transfer
-        if account.address == r.address:
-            found_account = True
-            account.notes.append(f"Transfer of {r.rewards}")
-            account.rewards.amount = str(int(account.rewards.amount) + int(r.rewards))
-
-    # cant find the account in the list this is a new account (like a multisig)
-    # set it as inactive and add the transfer
-    if not found_account:
-        accounts.append(
-            Account(
-                address=r.address,
-                token=PRV(amount="0"),
-                rewards=conf.reward_token(amount=str(r.rewards)),
-                state=AccountState.INACTIVE,
-                notes=[f"Transfer of {r.rewards}"],
-            )
-        )
-    return accounts
+    index = AccountIndex(_accounts)
+    index.transfer(r, conf)
+    return index.accounts
 
 
 def redistribute(
@@ -108,14 +139,14 @@ def redistribute(
     Returns:
         the updated accounts list
     """
-    # copy so as not to modify the original
-    accounts = deepcopy(_accounts)
+    # indexed once for all transfers, the original list is not modified
+    index = AccountIndex(_accounts)
 
     # go through the accounts and make any manual transfers
     for r in container.redistributions:
         if r.option == RedistributionOption.TRANSFER:
-            accounts = transfer_redistribution(accounts, r, conf)
-    return accounts
+            index.transfer(r, conf)
+    return index.accounts
 
 
 def create_prv_reward_summary(
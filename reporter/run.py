@@ -1,10 +1,27 @@
 import sys
 import config
+from reporter.config import load_conf
+from reporter.queries import (
+    chain_reader,
+    eth_call_cache,
+    fetch_epoch_sources,
+    subgraph_client,
+)
 from reporter.run_prv import run_prv
 from reporter.run_arv import run_arv
 
 
 if __name__ == "__main__":
     epoch = config.main()
-    run_arv(epoch)
-    run_prv(epoch)
+
+    # fetch every independent data source at once, before computing distributions
+    sources = fetch_epoch_sources(load_conf(epoch))
+
+    run_arv(epoch, sources)
+    run_prv(epoch, sources)
+
+    print(subgraph_client.summary())
+    print(chain_reader.summary())
+    print(
+        f"💾 eth_call cache: {eth_call_cache.hits} hits, {eth_call_cache.misses} misses"
+    )
@@ -1,14 +1,19 @@
 from decimal import getcontext
+from typing import Optional
 from reporter.config import load_conf
 from reporter.models import (
+    ARV,
     ARVRewardSummary,
     DB,
+    StakerTable,
     Writer,
 )
 from reporter.queries import (
+    EpochSources,
+    classify_voters,
     get_arv_stakers_and_boost,
-    get_voters,
     get_votes,
+    vote_dicts,
 )
 
 from reporter.rewards import distribute
@@ -18,10 +23,12 @@ from reporter.rewards import distribute
 getcontext().prec = 42
 
 
-def run_arv(path_to_config) -> None:
+def run_arv(path_to_config, sources: Optional[EpochSources] = None) -> None:
     """
     The main() function is the entry point of the program and is responsible
     for orchestrating the various steps of the ARV token distribution process.
+
+    :param `sources`: prefetched epoch data, if not passed it is fetched as needed
     """
 
     # load the configuration file
@@ -33,17 +40,30 @@ def run_arv(path_to_config) -> None:
     # instantiate a fresh DB
     db = DB(config, drop=True)
 
-    # fetch ARV Stakers
-    stakers = get_arv_stakers_and_boost(config)
+    # fetch ARV Stakers, then keep them as columns for the rest of the run
+    stakers = StakerTable.from_stakers(
+        get_arv_stakers_and_boost(
+            config,
+            sources.arv_holders if sources else None,
+            onchain=sources.arv_onchain if sources else None,
+        ),
+        token=ARV(amount="0"),
+    )
 
     # fetch votes and proposals
-    votes, proposals = get_votes(config)
+    if sources:
+        votes, proposals = get_votes(
+            config, sources.offchain_votes, sources.onchain_votes
+        )
+    else:
+        votes, proposals = get_votes(config)
 
-    # separate voters from non-voters
-    voters, non_voters = get_voters(votes, stakers)
+    # separate voters from non-voters, once, for both the rewards and the reports
+    index = classify_voters(votes, stakers)
+    voters, non_voters = index.voted, index.not_voted
 
     # compute the distribution of ARV tokens
-    distribution, reward_summaries, stats = distribute(config, stakers, voters)
+    distribution, reward_summaries, stats = distribute(config, stakers, index)
 
     # update the DB and create claims
     db.write_arv_stats(
@@ -58,7 +78,7 @@ def run_arv(path_to_config) -> None:
     db.write_claims_and_distribution(distribution, "ARV")
 
     # write our data to individual CSV and JSON files
-    writer.to_csv_and_json([s.dict() for s in stakers], "ARV_stakers")
-    writer.to_csv_and_json([v.dict() for v in votes], "votes")
+    writer.to_csv_and_json(stakers, "ARV_stakers")
+    writer.to_csv_and_json(vote_dicts(votes), "votes")
     writer.to_csv_and_json([p.dict() for p in proposals], "proposals")
     writer.lists_to_csv_and_json([("voters", voters), ("non_voters", non_voters)])
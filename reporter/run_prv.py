@@ -1,4 +1,5 @@
 from decimal import Decimal, getcontext
+from typing import Optional
 from reporter.config import load_conf
 from reporter.models import (
     DB,
@@ -9,6 +10,7 @@ from reporter.models import (
 )
 from reporter.errors import MissingDBException
 from reporter.queries import (
+    EpochSources,
     get_prv_total_supply,
     get_prv_accounts,
 )
@@ -29,7 +31,7 @@ def initialize_container(inactive: Decimal, config: Config) -> RedistributionCon
     return container
 
 
-def run_prv(path_to_config) -> None:
+def run_prv(path_to_config, sources: Optional[EpochSources] = None) -> None:
 
     # load the config file
     config = load_conf(path_to_config)
@@ -44,10 +46,18 @@ def run_prv(path_to_config) -> None:
     db = DB(config, drop=False)
 
     # compute supply at the passed block
-    supply = get_prv_total_supply(config.block_snapshot)
+    if sources:
+        supply = sources.prv_total_supply
+    else:
+        supply = get_prv_total_supply(config.block_snapshot)
 
     # fetch the list of accounts and compute active vs. total
-    accounts = get_prv_accounts(config)
+    if sources:
+        accounts = get_prv_accounts(
+            config, sources.prv_depositors, sources.prv_balances
+        )
+    else:
+        accounts = get_prv_accounts(config)
 
     # compute the stats for the PRV token
     prv_stats = compute_prv_token_stats(accounts, supply)
@@ -58,10 +68,13 @@ def run_prv(path_to_config) -> None:
     container = initialize_container(inactive_rewards, config)
     accounts_redistributed = redistribute(accounts, container, config)
 
+    # the active rewards are a fraction, share out the exact total rather than whole units
+    to_distribute = active_rewards + container.to_stakers
     distribution, distribution_rewards = compute_rewards(
-        config.reward_token(amount=str(active_rewards + container.to_stakers)),
-        Decimal(prv_stats.active),  # active PRV not rewards
+        config.reward_token(amount=int(to_distribute)),
+        prv_stats.active,  # active PRV not rewards
         accounts_redistributed,
+        exact_total=to_distribute,
     )
 
     # yield the summary for reporting
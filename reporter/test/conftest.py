@@ -50,5 +50,7 @@ def mock_token_holders(monkeypatch, stub: str) -> None:
 
     monkeypatch.setattr(
         "reporter.queries.graphql_iterate_query",
-        lambda url, accessor, json: mock_holders["data"]["erc20Contract"]["balances"],
+        lambda url, accessor, json, **_: mock_holders["data"]["erc20Contract"][
+            "balances"
+        ],
     )
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from pytest import raises
 from reporter.models import *
 
@@ -34,17 +36,40 @@ def test_user_checksum_address():
 def test_staker():
     arv = ARVStaker(arv_holding="100", address=USER)
 
-    assert arv.token.amount == "100"
+    assert arv.token.amount == 100
     assert arv.address == USER
     assert arv.token == ARV(amount="100")
 
     prv = PRVStaker(prv_holding="100", address=USER)
 
-    assert prv.token.amount == "100"
+    assert prv.token.amount == 100
     assert prv.address == USER
     assert prv.token == PRV(amount="100")
 
 
+def test_amounts_are_ints_written_as_strings():
+    big = 10**30 + 1
+    account = Account(
+        address=USER,
+        token=ARV(amount=str(big), lock=Lock(amount=big, lockDuration=1, lockedAt=2)),
+        rewards=PRV(amount=Decimal(5)),
+        state=AccountState.ACTIVE,
+    )
+
+    assert account.token.amount == big
+    assert account.rewards.amount == 5
+
+    as_dict = account.dict()
+    assert as_dict["token"]["amount"] == str(big)
+    assert as_dict["token"]["lock"]["amount"] == str(big)
+    assert as_dict["token"]["non_decayed_amount"] is None
+    assert as_dict["rewards"]["amount"] == "5"
+
+    for bad in ["1.5", Decimal("1.5"), True, None, 1.0]:
+        with raises(ValueError):
+            PRV(amount=bad)
+
+
 def test_account_from_prv_staker():
     staker = PRVStaker(prv_holding="100", address=USER)
     rewards = ERC20Amount(
@@ -72,3 +97,17 @@ def test_account_from_arv_staker():
     assert isinstance(account, Account)
     assert account.rewards == rewards
     assert account.state == state
+
+
+def test_accounts_from_stakers_do_not_share_rewards():
+    staker = PRVStaker(prv_holding="100", address=USER)
+    rewards = ERC20Amount(
+        address=ADDRESSES.GOVERNOR, amount="0", symbol="TEST", decimals=18
+    )
+
+    first = Account.from_prv_staker(staker, rewards, AccountState.ACTIVE)
+    second = Account.from_prv_staker(staker, rewards, AccountState.ACTIVE)
+    first.rewards.amount = 99
+
+    assert second.rewards.amount == 0
+    assert rewards.amount == 0
@@ -0,0 +1,46 @@
+import eth_utils
+from pytest import raises
+
+from reporter.models import AddressRegistry, ARVStaker, address_ids
+
+USER = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+
+
+def test_registry_checksums_each_address_once(monkeypatch):
+    checksummed = []
+
+    def counting(address):
+        checksummed.append(address)
+        return to_checksum(address)
+
+    to_checksum = eth_utils.to_checksum_address
+    monkeypatch.setattr(eth_utils, "to_checksum_address", counting)
+    registry = AddressRegistry()
+
+    i = registry.id_of(USER.lower())
+    assert registry.id_of(USER) == i
+    assert registry.id_of(USER.lower()) == i
+    assert registry.checksum(USER.upper().replace("0X", "0x")) == USER
+    assert registry.address(i) == USER
+    assert len(registry) == 1
+
+    # one keccak per spelling never seen before, none for repeats
+    assert checksummed == [USER.lower(), USER.upper().replace("0X", "0x")]
+
+    assert registry.id_of("0x0000000000000000000000000000000000000001") == i + 1
+
+
+def test_registry_rejects_invalid_addresses():
+    registry = AddressRegistry()
+    for address in ["", "0x", "0x742d35cc6634c0532925a3b844bc454e4438f44"]:
+        with raises(ValueError):
+            registry.id_of(address)
+    assert len(registry) == 0
+
+
+def test_models_share_address_ids():
+    staker = ARVStaker(address=USER.lower(), arv_holding="1")
+
+    assert staker.address == USER
+    assert staker.address_id in address_ids([USER])
+    assert address_ids(USER) == address_ids([USER.lower()])
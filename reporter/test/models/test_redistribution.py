@@ -21,15 +21,15 @@ def test_normalized_redistribution_weights():
     assert container.redistributions[1].weight == 1
 
     # check reward assignment
-    assert container.redistributions[0].rewards == "0"
-    assert container.redistributions[1].rewards == "0"
+    assert container.redistributions[0].rewards == 0
+    assert container.redistributions[1].rewards == 0
 
     container.redistribute(Decimal(100))
     assert container.total_redistributed == Decimal(100)
 
     assert container.redistributions[0].distributed == True
-    assert container.redistributions[0].rewards == "66"
-    assert container.redistributions[1].rewards == "33"
+    assert container.redistributions[0].rewards == 66
+    assert container.redistributions[1].rewards == 33
 
 
 def test_redistribution_container():
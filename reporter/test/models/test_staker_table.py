@@ -0,0 +1,89 @@
+import pytest
+
+from reporter.models import (
+    Account,
+    AccountState,
+    ARV,
+    ARVStaker,
+    Lock,
+    PRV,
+    PRVStaker,
+    StakerTable,
+)
+from reporter.rewards import compute_token_stats, distribute
+
+
+def arv_stakers(addresses: list[str]) -> list[ARVStaker]:
+    stakers = []
+    for i, address in enumerate(addresses):
+        staker = ARVStaker(address=address, arv_holding=str((i + 1) * 100))
+        staker.token.non_decayed_amount = str((i + 1) * 150)
+        staker.token.lock = Lock(amount=str((i + 1) * 150), lockDuration=6, lockedAt=i)
+        stakers.append(staker)
+    return stakers
+
+
+def test_staker_table_round_trip(ADDRESSES):
+    stakers = arv_stakers(ADDRESSES)
+    table = StakerTable.from_stakers(stakers)
+
+    assert len(table) == len(stakers)
+    assert table.addresses == [s.address for s in stakers]
+    assert table.amounts == [100, 200, 300, 400, 500]
+    assert list(table.dicts()) == [s.dict() for s in stakers]
+    assert table.to_stakers() == stakers
+
+
+def test_staker_table_prv_accounts(ADDRESSES, config):
+    accounts = [
+        Account(
+            address=a,
+            token=PRV(amount="10"),
+            rewards=config.reward_token(amount=str(i)),
+            state=AccountState.ACTIVE if i % 2 else AccountState.INACTIVE,
+            notes=["a note"] if i == 1 else [],
+        )
+        for i, a in enumerate(ADDRESSES)
+    ]
+    table = StakerTable.from_stakers(accounts)
+
+    assert table.has_rewards
+    assert list(table.dicts()) == [a.dict() for a in accounts]
+    assert table.to_accounts() == accounts
+    assert table.total(AccountState.ACTIVE) == 20
+
+
+def test_staker_table_requires_one_token(ADDRESSES):
+    with pytest.raises(ValueError):
+        StakerTable.from_stakers(
+            [
+                ARVStaker(address=ADDRESSES[0], arv_holding="1"),
+                PRVStaker(address=ADDRESSES[1], prv_holding="1"),
+            ]
+        )
+
+    with pytest.raises(ValueError):
+        StakerTable.from_stakers([])
+
+    empty = StakerTable.from_stakers([], token=ARV(amount="0"))
+    assert list(empty.dicts()) == []
+
+
+def test_distribute_table_matches_models(ADDRESSES, config):
+    stakers = arv_stakers(ADDRESSES)
+    voters = ADDRESSES[1:3]
+
+    distribution, summary, stats = distribute(config, stakers, voters)
+    table = StakerTable.from_stakers(stakers)
+    table_distribution, table_summary, table_stats = distribute(config, table, voters)
+
+    assert isinstance(table_distribution, StakerTable)
+    assert list(table_distribution.dicts()) == [a.dict() for a in distribution]
+    assert table_summary == summary
+    assert table_stats == stats == compute_token_stats(table_distribution)
+
+    # the input table is left as it was
+    assert not table.has_rewards
+    # and shares the columns the distribution does not change
+    assert table_distribution.amounts is table.amounts
+    assert table_distribution.address_ids is table.address_ids
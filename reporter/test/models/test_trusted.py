@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from pydantic import ValidationError, parse_obj_as
+
+from reporter.models import (
+    Account,
+    AccountState,
+    ARVStaker,
+    ERC20Amount,
+    Proposal,
+    Vote,
+)
+from reporter.queries.voters import parse_votes
+from reporter.rewards import compute_rewards, init_account_rewards
+
+USER = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+
+
+def test_from_arv_staker_keeps_validated_fields(monkeypatch, config):
+    monkeypatch.setattr("reporter.env.VALIDATE_MODELS", False)
+    staker = ARVStaker(address=USER, arv_holding="100")
+    staker.token.non_decayed_amount = "150"
+    rewards = config.reward_token()
+
+    account = Account.from_arv_staker(staker, rewards, AccountState.ACTIVE)
+
+    # same result as building the account through the validators
+    assert account == Account(
+        **staker.dict(), rewards=rewards, state=AccountState.ACTIVE
+    )
+    assert type(account.token) is ERC20Amount
+    assert account.rewards is not rewards
+
+
+def test_trusted_skips_validators_unless_debugging(monkeypatch, config):
+    monkeypatch.setattr("reporter.env.VALIDATE_MODELS", False)
+    token = ERC20Amount.trusted(USER, "ARV", 18, "1")
+    account = Account.trusted("not an address", token, token, AccountState.ACTIVE)
+    assert account.address == "not an address"
+
+    monkeypatch.setattr("reporter.env.VALIDATE_MODELS", True)
+    with pytest.raises(ValidationError):
+        Account.trusted("not an address", token, token, AccountState.ACTIVE)
+    assert (
+        Account.trusted(USER.lower(), token, token, AccountState.ACTIVE).address == USER
+    )
+
+
+def test_rewarded_copies_leave_the_originals(ADDRESSES, config):
+    stakers = [ARVStaker(address=a, arv_holding="100") for a in ADDRESSES[:2]]
+    accounts = init_account_rewards(stakers, ADDRESSES[:1], config)
+    before = [a.dict() for a in accounts]
+
+    rewarded, _ = compute_rewards(config.arv_erc20, 100, accounts)
+
+    assert [a.dict() for a in accounts] == before
+    assert rewarded[0].rewards.amount != "0"
+    assert rewarded[0].notes and not accounts[0].notes
+    assert rewarded[1] == accounts[1]
+
+
+def test_parse_votes_validates_each_proposal_once(monkeypatch):
+    with open("reporter/test/stubs/snapshot-votes.json") as j:
+        raw = json.load(j)
+
+    parsed = []
+    parse_obj = Proposal.parse_obj.__func__  # type: ignore
+
+    def counting(cls, obj):
+        parsed.append(obj["id"])
+        return parse_obj(cls, obj)
+
+    monkeypatch.setattr(Proposal, "parse_obj", classmethod(counting))
+    votes = parse_votes(raw)
+    monkeypatch.undo()
+
+    assert votes == parse_obj_as(list[Vote], raw)
+    assert sorted(parsed) == sorted({v["proposal"]["id"] for v in raw})
@@ -0,0 +1,89 @@
+import os
+
+from reporter.queries import ID_CURSOR, DiskCache, graphql_iterate_query
+
+
+def test_cache_roundtrip(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = DiskCache.key("url", "query", {"block": 1})
+
+    assert cache.get(key) is None
+    cache.set(key, {"data": [1, 2, 3]})
+    assert cache.get(key) == {"data": [1, 2, 3]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # key is independent of dict ordering
+    assert key == DiskCache.key("url", "query", {"block": 1})
+    assert key != DiskCache.key("url", "query", {"block": 2})
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    entry = "x" * 100
+    cache = DiskCache(str(tmp_path), max_bytes=350)
+
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.set(key, entry)
+        os.utime(tmp_path / f"{key}.json", (i, i))
+
+    # reading 'a' makes 'b' the oldest entry
+    assert cache.get("a") == entry
+    cache.set("d", entry)
+
+    assert cache.get("b") is None
+    assert all(cache.get(k) == entry for k in ["a", "c", "d"])
+
+
+def test_cache_size_counts_bytes_once_per_key(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10_000)
+    cache.set("a", "x")
+
+    # overwriting a key replaces its size rather than adding to it
+    cache.set("b", "y" * 100)
+    cache.set("b", "z" * 200)
+
+    on_disk = sum(f.stat().st_size for f in tmp_path.glob("*.json"))
+    assert cache._size == on_disk
+    assert cache.get("a") == "x"
+
+
+def test_iterate_query_replays_and_resumes(monkeypatch, tmp_path):
+    pages = {
+        "": {"data": {"rows": [{"id": "a"}, {"id": "b"}]}},
+        "b": {"data": {"rows": [{"id": "c"}, {"id": "d"}]}},
+        "d": {"data": {"rows": [{"id": "e"}]}},
+    }
+    sent = []
+
+    def post(url, params):
+        cursor = params["variables"]["id_gt"]
+        sent.append(cursor)
+        if cursor == "d" and sent.count("d") == 1:
+            raise ConnectionError("run interrupted")
+        return pages[cursor]
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+    cache = DiskCache(str(tmp_path))
+
+    def fetch():
+        return graphql_iterate_query(
+            "https://graphql.example.com",
+            ["rows"],
+            {"query": "query {}", "variables": {"id_gt": ""}},
+            cursor=ID_CURSOR,
+            page_size=2,
+            cache=cache,
+        )
+
+    try:
+        fetch()
+    except ConnectionError:
+        pass
+    assert sent == ["", "b", "d"]
+
+    # the rerun picks up from the page that failed
+    assert [r["id"] for r in fetch()] == ["a", "b", "c", "d", "e"]
+    assert sent == ["", "b", "d", "d"]
+
+    # and a third run never leaves the disk
+    assert [r["id"] for r in fetch()] == ["a", "b", "c", "d", "e"]
+    assert sent == ["", "b", "d", "d"]
@@ -0,0 +1,252 @@
+import asyncio
+import random
+
+import pytest
+from multicall import Call, Signature  # type: ignore
+
+from reporter.queries.cache import DiskCache
+from reporter.queries.chain_reader import ChainReader, RPCBatchExecutor
+from reporter.queries.chunked_multicall import ChunkTiming, MulticallStats
+
+ORACLE = "0x0000000000000000000000000000000000000001"
+UINT = Signature("out(uint256)()")
+
+
+def balance_calls(n: int) -> list[Call]:
+    addresses = ["0x%040x" % (i + 1) for i in range(n)]
+    return [
+        Call(ORACLE, ["balanceOf(address)(uint256)", a], [[a, None]]) for a in addresses
+    ]
+
+
+class FakeNode:
+    """Answers JSON-RPC batches out of order, with the last byte of the address as the balance"""
+
+    def __init__(self, reverts: set[int] = set()):
+        self.reverts = reverts
+        self.batches: list[int] = []
+
+    def post(self, url, payload):
+        if isinstance(payload, dict):
+            assert payload["method"] == "eth_chainId"
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x1"}
+
+        self.batches.append(len(payload))
+        responses = []
+        for request in payload:
+            assert request["method"] == "eth_call"
+            tx, block = request["params"]
+            assert block == hex(123)
+            last = int(tx["data"][-2:], 16)
+            if last in self.reverts:
+                response = {"error": {"code": 3, "message": "execution reverted"}}
+            else:
+                response = {"result": "0x" + UINT.encode_data([last])[4:].hex()}
+            responses.append({"jsonrpc": "2.0", "id": request["id"], **response})
+        random.shuffle(responses)
+        return responses
+
+
+def test_rpc_batch_executor(tmp_path):
+    node = FakeNode(reverts={5})
+    executor = RPCBatchExecutor(
+        batch_size=4, endpoint="http://node", client=node, cache=DiskCache(tmp_path)
+    )
+    calls = balance_calls(10)
+
+    result = executor(calls, 123)
+
+    assert sorted(node.batches) == [2, 4, 4]
+    assert result[calls[4].returns[0][0]] is None
+    assert all(result[c.returns[0][0]] == i + 1 for i, c in enumerate(calls) if i != 4)
+    assert executor.stats.failed_calls == 1
+
+    # successful results come from the cache on the next run, only the revert is asked again
+    node.batches.clear()
+    assert executor(calls, 123) == result
+    assert node.batches == [1]
+
+
+def test_rpc_batch_drops_unmatched_ids():
+    class ConfusedNode(FakeNode):
+        def post(self, url, payload):
+            responses = super().post(url, payload)
+            if isinstance(payload, list):
+                answered = {r["id"]: r for r in responses}
+                # the first call is answered twice, with the second answer for the last call,
+                # the second call gets a null id and the third an id that was never sent
+                return [
+                    answered[0],
+                    {**answered[len(payload) - 1], "id": 0},
+                    {**answered[1], "id": None},
+                    {**answered[2], "id": 99},
+                    *(answered[i] for i in range(3, len(payload))),
+                ]
+            return responses
+
+    executor = RPCBatchExecutor(
+        endpoint="http://node", client=ConfusedNode(), cache=None
+    )
+    calls = balance_calls(5)
+
+    result = executor(calls, 123)
+
+    assert [result[c.returns[0][0]] for c in calls] == [1, None, None, 4, 5]
+    assert executor.stats.failed_calls == 2
+
+
+def test_rpc_batch_rejected():
+    class RejectingNode(FakeNode):
+        def post(self, url, payload):
+            if isinstance(payload, list):
+                return {"jsonrpc": "2.0", "id": None, "error": {"message": "too big"}}
+            return super().post(url, payload)
+
+    executor = RPCBatchExecutor(
+        endpoint="http://node", client=RejectingNode(), cache=None
+    )
+    with pytest.raises(ValueError):
+        executor(balance_calls(3), 123)
+
+
+class FakeReader:
+    """
+    Records a request taking `delay` seconds for each call list,
+    plus `cold` seconds on the first one, unless `cached` answers it
+    """
+
+    def __init__(
+        self, delay: float, fail: bool = False, cold: float = 0.0, cached=False
+    ):
+        self.delay = delay
+        self.fail = fail
+        self.cold = cold
+        self.cached = cached
+        self.sizes: list[int] = []
+        self.stats = MulticallStats()
+
+    def __call__(self, calls, block_id):
+        self.sizes.append(len(calls))
+        if self.fail:
+            raise ValueError("no multicall contract")
+        if calls and not self.cached:
+            seconds = self.delay + self.cold
+            self.cold = 0.0
+            self.stats.chunks.append(ChunkTiming(0, len(calls), seconds))
+        return {c.returns[0][0]: block_id for c in calls}
+
+    async def coroutine(self, calls, block_id):
+        return self(calls, block_id)
+
+    def summary(self):
+        return ""
+
+
+def test_chain_reader_picks_fastest():
+    slow, fast = FakeReader(0.05), FakeReader(0.0)
+    reader = ChainReader({"multicall": slow, "batch": fast}, probe_size=5)
+    calls = balance_calls(30)
+
+    result = reader(calls, 7)
+
+    assert result == {c.returns[0][0]: 7 for c in calls}
+    # each probe sends one call to warm up, then times the other four
+    assert slow.sizes == [1, 4]
+    assert fast.sizes == [1, 4, 20]
+    assert reader.best == "batch"
+
+    # once measured, no more probes
+    reader(calls, 7)
+    assert slow.sizes == [1, 4]
+    assert fast.sizes[-1] == 30
+
+
+def test_chain_reader_does_not_time_the_cold_start():
+    # the faster strategy is the one that pays for the first connection and the imports
+    cold, warm = FakeReader(0.01, cold=1.0), FakeReader(0.05)
+    reader = ChainReader({"multicall": cold, "batch": warm}, probe_size=5)
+
+    reader(balance_calls(30), 7)
+
+    assert reader.best == "multicall"
+
+
+def test_chain_reader_does_not_time_cached_calls():
+    cached, batch = FakeReader(0.05, cached=True), FakeReader(0.05)
+    reader = ChainReader({"multicall": cached, "batch": batch}, probe_size=5)
+    calls = balance_calls(30)
+
+    assert reader(calls, 7) == {c.returns[0][0]: 7 for c in calls}
+    assert "multicall" not in reader.throughput
+    assert reader.best == "batch"
+
+    # with every probe answered from the cache, the first strategy is used unmeasured
+    everything_cached = ChainReader(
+        {"multicall": FakeReader(0.0, cached=True), "batch": cached}, probe_size=5
+    )
+    assert everything_cached(calls, 7) == {c.returns[0][0]: 7 for c in calls}
+    assert everything_cached.throughput == {}
+    assert everything_cached.best == "multicall"
+
+
+def test_chain_reader_falls_back_when_a_strategy_fails():
+    broken, batch = FakeReader(0.0, fail=True), FakeReader(0.0)
+    reader = ChainReader({"multicall": broken, "batch": batch}, probe_size=5)
+    calls = balance_calls(12)
+
+    assert reader(calls, 1) == {c.returns[0][0]: 1 for c in calls}
+    assert reader.best == "batch"
+    assert reader.throughput["multicall"] == 0
+
+    result = asyncio.run(reader.coroutine(calls, 2))
+    assert result == {c.returns[0][0]: 2 for c in calls}
+
+
+def test_chain_reader_probes_a_demoted_strategy_again(caplog):
+    flaky, batch = FakeReader(0.0, fail=True), FakeReader(0.01)
+    reader = ChainReader(
+        {"multicall": flaky, "batch": batch}, probe_size=5, retry_after=0
+    )
+    calls = balance_calls(12)
+
+    reader(calls, 1)
+    assert reader.best == "batch"
+    assert "multicall read strategy failed" in caplog.text
+
+    # the error was transient, the next call list measures it again
+    flaky.fail = False
+    reader(calls, 1)
+    assert reader.throughput["multicall"] > 0
+    assert reader.best == "multicall"
+
+    # not before it is due
+    slow_retry = ChainReader(
+        {"multicall": FakeReader(0.0, fail=True), "batch": batch}, probe_size=5
+    )
+    slow_retry(calls, 1)
+    slow_retry.readers["multicall"].fail = False
+    slow_retry(calls, 1)
+    assert slow_retry.readers["multicall"].sizes == [1]
+
+
+def test_chain_reader_raises_from_the_last_failure():
+    reader = ChainReader(
+        {"multicall": FakeReader(0.0, fail=True), "batch": FakeReader(0.0, fail=True)}
+    )
+
+    with pytest.raises(RuntimeError) as e:
+        reader(balance_calls(3), 1)
+    assert isinstance(e.value.__cause__, ValueError)
+    assert "no multicall contract" in str(e.value.__cause__)
+
+
+def test_chain_reader_fixed_strategy():
+    broken, batch = FakeReader(0.0, fail=True), FakeReader(0.0)
+    reader = ChainReader({"multicall": broken, "batch": batch}, strategy="multicall")
+
+    with pytest.raises(ValueError):
+        reader(balance_calls(3), 1)
+    assert batch.sizes == []
+
+    with pytest.raises(ValueError):
+        ChainReader({"multicall": broken}, strategy="graphql")
@@ -0,0 +1,353 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+from unittest.mock import Mock
+from multicall import Call, Signature  # type: ignore
+
+from reporter.env import ADDRESSES
+from reporter.errors import FailedCallsException
+from reporter.queries.cache import DiskCache
+from reporter.queries.chain_reader import ChainReader, RPCBatchExecutor
+from reporter.queries.chunked_multicall import (
+    MULTICALL3_ADDRESS,
+    PAYLOAD_TOO_LARGE,
+    BatchSizes,
+    MulticallExecutor,
+    chunk_calls,
+    is_limit_error,
+)
+from reporter.queries.arv_stakers import get_arv_onchain_state
+from reporter.queries.prv_stakers import get_prv_staked_balances
+
+ORACLE = "0x0000000000000000000000000000000000000001"
+
+
+def balance_calls(n: int) -> list[Call]:
+    addresses = ["0x%040x" % (i + 1) for i in range(n)]
+    return [
+        Call(ORACLE, ["balanceOf(address)(uint256)", a], [[a, None]]) for a in addresses
+    ]
+
+
+def test_chunk_calls():
+    calls = balance_calls(7)
+    chunks = chunk_calls(calls, 3)
+
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert [c for chunk in chunks for c in chunk] == calls
+
+
+# decode the aggregate's arguments, encode its return values
+AGGREGATE_IN = Signature("tryAggregate()(bool,(address,bytes)[])")
+AGGREGATE_OUT = Signature("out((bool,bytes)[])()")
+UINT = Signature("out(uint256)()")
+
+
+def aggregate_pairs(tx) -> list:
+    assert tx["to"] == MULTICALL3_ADDRESS
+    require_success, pairs = AGGREGATE_IN.decode_data(tx["data"][4:])
+    assert require_success is False
+    return pairs
+
+
+def fake_aggregate(tx, block_id, reverts: set[int] = set()) -> bytes:
+    """
+    Answer an aggregate with the last byte of each address as its balance,
+    the calls for the addresses ending in `reverts` revert
+    """
+    results = []
+    for _, data in aggregate_pairs(tx):
+        if data[-1] in reverts:
+            results.append((False, b""))
+        else:
+            results.append((True, UINT.encode_data([int(data[-1])])[4:]))
+    return AGGREGATE_OUT.encode_data([results])[4:]
+
+
+def test_executor_chunks_and_merges():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    sizes = []
+
+    class FakeEth:
+        def call(self, tx, block_id):
+            nonlocal in_flight, peak
+            assert block_id == 123
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                sizes.append(len(aggregate_pairs(tx)))
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+            return fake_aggregate(tx, block_id)
+
+    class FakeW3:
+        eth = FakeEth()
+
+    executor = MulticallExecutor(chunk_size=10, max_workers=3, _w3=FakeW3())
+    calls = balance_calls(95)
+    result = executor(calls, 123)
+
+    assert list(result) == [c.returns[0][0] for c in calls]
+    assert all(v == int(k, 16) % 256 for k, v in result.items())
+    assert sorted(sizes) == [5] + [10] * 9
+    assert peak <= 3
+    assert len(executor.stats.chunks) == 10
+    assert sorted(c.index for c in executor.stats.chunks) == list(range(10))
+
+
+def test_executor_empty_and_invalid():
+    assert MulticallExecutor(_w3=object())([], 1) == {}
+    with pytest.raises(ValueError):
+        MulticallExecutor(chunk_size=0)
+
+
+def test_executor_coroutine(monkeypatch):
+    requests = []
+
+    class FakeEth:
+        async def call(self, tx, block_id):
+            requests.append(len(aggregate_pairs(tx)))
+            await asyncio.sleep(0.01)
+            return fake_aggregate(tx, block_id)
+
+    class FakeW3:
+        eth = FakeEth()
+
+    async def pooled():
+        return FakeW3()
+
+    monkeypatch.setattr("reporter.queries.chunked_multicall.pooled_async_w3", pooled)
+
+    executor = MulticallExecutor(chunk_size=4, max_workers=2, _w3=object())
+    calls = balance_calls(10)
+    result = asyncio.run(executor.coroutine(calls, 123))
+
+    assert sorted(requests) == [2, 4, 4]
+    assert result == {c.returns[0][0]: i + 1 for i, c in enumerate(calls)}
+    assert len(executor.stats.chunks) == 3
+
+
+def test_executor_isolates_reverts():
+    class FakeEth:
+        def call(self, tx, block_id):
+            return fake_aggregate(tx, block_id, reverts={3, 7})
+
+    class FakeW3:
+        eth = FakeEth()
+
+    executor = MulticallExecutor(chunk_size=4, _w3=FakeW3())
+    calls = balance_calls(10)
+    result = executor(calls, 1)
+
+    assert result[calls[2].returns[0][0]] is None
+    assert result[calls[6].returns[0][0]] is None
+    assert result[calls[0].returns[0][0]] == 1
+    assert executor.stats.failed_calls == 2
+    assert executor.stats.splits == 0
+
+
+class LimitedNode:
+    """Rejects any aggregate of more than `limit` calls, as a node over its gas limit would"""
+
+    endpoint_uri = "https://rpc.example.com/v3/secret-key"
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.sizes: list[int] = []
+        self.provider = self
+        self.eth = self
+
+    def call(self, tx, block_id):
+        size = len(aggregate_pairs(tx))
+        self.sizes.append(size)
+        if size > self.limit:
+            raise ValueError("out of gas")
+        return fake_aggregate(tx, block_id)
+
+
+def test_executor_bisects_and_learns_batch_size(tmp_path):
+    sizes = BatchSizes(str(tmp_path / "sizes.json"))
+    node = LimitedNode(limit=3)
+    calls = balance_calls(16)
+
+    executor = MulticallExecutor(
+        chunk_size=8, max_workers=1, _w3=node, batch_sizes=sizes
+    )
+    result = executor(calls, 1)
+
+    assert result == {c.returns[0][0]: i + 1 for i, c in enumerate(calls)}
+    # 8 fails, the halves of 4 fail, then every 2 succeeds
+    assert node.sizes[:3] == [8, 4, 2]
+    assert executor.stats.splits > 0
+    assert executor.batch_size == 2
+    assert sizes.get(node.endpoint_uri) == 2
+    assert "secret-key" not in (tmp_path / "sizes.json").read_text()
+
+    # later runs keep the learned size, so the chunks do not change between runs
+    for _ in range(2):
+        node.sizes.clear()
+        rerun = MulticallExecutor(
+            chunk_size=8, max_workers=1, _w3=node, batch_sizes=sizes
+        )
+        rerun(calls, 1)
+
+        assert set(node.sizes) == {2}
+        assert rerun.stats.splits == 0
+        assert sizes.get(node.endpoint_uri) == 2
+
+
+def test_executor_learns_largest_size_that_succeeded(tmp_path):
+    sizes = BatchSizes(str(tmp_path / "sizes.json"))
+    node = LimitedNode(limit=5)
+
+    executor = MulticallExecutor(
+        chunk_size=8, max_workers=1, _w3=node, batch_sizes=sizes
+    )
+    executor(balance_calls(21), 1)
+
+    # chunks of 8 split into 4s, the last chunk of 5 went through
+    assert node.sizes == [8, 4, 4, 8, 4, 4, 5]
+    assert executor.batch_size == 5
+    assert sizes.get(node.endpoint_uri) == 5
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        requests.Timeout("read timed out"),
+        requests.HTTPError("429 Too Many Requests", response=Mock(status_code=429)),
+        requests.ConnectionError("connection reset"),
+    ],
+)
+def test_executor_raises_errors_that_are_not_limits(tmp_path, error):
+    sizes = BatchSizes(str(tmp_path / "sizes.json"))
+    node = LimitedNode(limit=100)
+    node.call = Mock(side_effect=error)
+
+    executor = MulticallExecutor(chunk_size=8, _w3=node, batch_sizes=sizes)
+    with pytest.raises(type(error)):
+        executor(balance_calls(8), 1)
+
+    # no bisecting, and nothing learned
+    assert node.call.call_count == 1
+    assert executor.stats.splits == 0
+    assert executor.batch_size == 8
+    assert sizes.get(node.endpoint_uri) is None
+
+
+def test_is_limit_error():
+    assert is_limit_error(ValueError({"code": -32000, "message": "out of gas"}))
+    assert is_limit_error(
+        requests.HTTPError("413", response=Mock(status_code=PAYLOAD_TOO_LARGE))
+    )
+    assert not is_limit_error(requests.Timeout("read timed out"))
+    assert not is_limit_error(
+        requests.HTTPError("401 Unauthorized", response=Mock(status_code=401))
+    )
+
+
+def test_executor_caches_each_call(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    node = LimitedNode(limit=100)
+    node.chain_id = 1
+    calls = balance_calls(10)
+
+    first = MulticallExecutor(chunk_size=4, _w3=node, cache=cache)(calls, 123)
+
+    # the cache does not depend on how the calls were chunked
+    node.sizes.clear()
+    rerun = MulticallExecutor(chunk_size=3, _w3=node, cache=cache)
+    assert rerun(calls, 123) == first
+    assert node.sizes == []
+
+    # and is shared with the batch strategy
+    batch = RPCBatchExecutor(endpoint="http://node", client=Mock(), cache=cache)
+    batch._chain_id = "0x1"
+    assert batch(calls, 123) == first
+    assert batch.client.post.call_count == 0
+
+
+def test_executor_raises_when_single_call_fails():
+    node = LimitedNode(limit=0)
+    executor = MulticallExecutor(chunk_size=4, _w3=node)
+
+    with pytest.raises(ValueError):
+        executor(balance_calls(4), 1)
+
+
+def test_executor_coroutine_bisects(monkeypatch):
+    node = LimitedNode(limit=2)
+
+    class AsyncEth:
+        async def call(self, tx, block_id):
+            return node.call(tx, block_id)
+
+    class FakeW3:
+        eth = AsyncEth()
+
+    async def pooled():
+        return FakeW3()
+
+    monkeypatch.setattr("reporter.queries.chunked_multicall.pooled_async_w3", pooled)
+
+    executor = MulticallExecutor(chunk_size=8, max_workers=2, _w3=node)
+    calls = balance_calls(12)
+    result = asyncio.run(executor.coroutine(calls, 1))
+
+    assert result == {c.returns[0][0]: i + 1 for i, c in enumerate(calls)}
+    assert executor.batch_size == 2
+
+
+LOCK = Signature("out(uint256,uint256,uint256)()")
+
+
+def test_reverted_reads_raise(monkeypatch, config):
+    """One RollStaker balance and one lock revert, the others answer"""
+    addresses = ["0x%040x" % (i + 1) for i in range(3)]
+
+    class Node:
+        @property
+        def eth(self):
+            return self
+
+        def call(self, tx, block_id):
+            results = []
+            for target, data in aggregate_pairs(tx):
+                last = data[-1]
+                if target.lower() == ADDRESSES.PRV_ROLLSTAKER.lower():
+                    ok, out = last != 2, UINT.encode_data([last])
+                else:
+                    ok, out = last != 3, LOCK.encode_data([last, 1, 2])
+                results.append((True, out[4:]) if ok else (False, b""))
+            return AGGREGATE_OUT.encode_data([results])[4:]
+
+    reader = ChainReader(
+        {"multicall": MulticallExecutor(_w3=Node())}, strategy="multicall"
+    )
+    monkeypatch.setattr("reporter.queries.prv_stakers.chain_reader", reader)
+    monkeypatch.setattr("reporter.queries.arv_stakers.chain_reader", reader)
+
+    with pytest.raises(FailedCallsException) as e:
+        get_prv_staked_balances(addresses, config)
+    assert e.value.keys == [addresses[1]]
+
+    with pytest.raises(FailedCallsException) as e:
+        get_arv_onchain_state(addresses, 1, with_boost=False)
+    assert e.value.keys == [(addresses[2], "lock")]
+
+    # callers that can handle a revert get None for it
+    calls = [
+        Call(ADDRESSES.PRV_ROLLSTAKER, ["balanceOf(address)(uint256)", a], [[a, None]])
+        for a in addresses
+    ]
+    assert reader(calls, 1, allow_failure=True) == {
+        addresses[0]: 1,
+        addresses[1]: None,
+        addresses[2]: 3,
+    }
@@ -0,0 +1,94 @@
+import pytest
+
+from reporter.errors import DecayMismatchException
+from reporter.models import ARV, ARVStaker, Lock
+from reporter.queries.decay import (
+    compute_boosted_balances,
+    decay_sample,
+    decayed_balances,
+    verify_boosted_balances,
+)
+
+START = 1683038428
+DURATION = 3110400
+
+
+def staker(i: int, amount: int, locked_at: int = START) -> ARVStaker:
+    s = ARVStaker(str(amount), address="0x%040x" % (i + 1))
+    s.token.lock = Lock(amount=str(amount), lockedAt=locked_at, lockDuration=DURATION)
+    return s
+
+
+def test_decayed_balances():
+    balances = [10**21, 10**21, 10**21, 10**21, 10**21]
+    locked_at = [START] * 5
+    durations = [DURATION, DURATION, DURATION, DURATION, 0]
+    timestamps = START + DURATION // 4
+
+    assert decayed_balances(balances, locked_at, durations, timestamps) == [
+        75 * 10**19,
+        75 * 10**19,
+        75 * 10**19,
+        75 * 10**19,
+        0,
+    ]
+    # expired locks have no balance, and nothing decays before the lock starts
+    assert decayed_balances([10**21], [START], [DURATION], START + DURATION + 1) == [
+        0
+    ]
+    assert decayed_balances([10**21], [START], [DURATION], START) == [10**21]
+    assert decayed_balances([10**21], [START], [DURATION], START - DURATION) == [
+        10**21
+    ]
+
+
+def test_decayed_balances_truncates_like_solidity():
+    balance = 2**190 + 12345
+    elapsed = 777
+    expected = balance * (DURATION - elapsed) // DURATION
+    assert decayed_balances([balance], [START], [DURATION], START + elapsed) == [
+        expected
+    ]
+
+
+def test_compute_boosted_balances():
+    stakers = [staker(0, 10**21), staker(1, 2 * 10**21, START + DURATION // 2)]
+    boosted = compute_boosted_balances(stakers, START + DURATION // 2)
+
+    assert boosted == {
+        stakers[0].address: 5 * 10**20,
+        stakers[1].address: 2 * 10**21,
+    }
+
+    stakers[0].token.lock = None
+    with pytest.raises(ValueError):
+        compute_boosted_balances(stakers, START)
+
+
+def test_decay_sample():
+    stakers = [staker(i, 10**21) for i in range(1000)]
+
+    assert len(decay_sample(stakers, fraction=0.05)) == 50
+    assert len(decay_sample(stakers, fraction=0.001, min_sample=20)) == 20
+    assert len(decay_sample(stakers[:5], fraction=0.01, min_sample=20)) == 5
+    assert decay_sample(stakers, seed=1) == decay_sample(stakers, seed=1)
+
+
+def test_verify_boosted_balances():
+    stakers = [staker(i, 10**21) for i in range(100)]
+    timestamp = START + DURATION // 3
+    computed = compute_boosted_balances(stakers, timestamp)
+    checked = []
+
+    def oracle(sample):
+        checked.extend(sample)
+        return {s.address: str(computed[s.address]) for s in sample}
+
+    verify_boosted_balances(stakers, computed, oracle, fraction=0.1, min_sample=1)
+    assert len(checked) == 10
+
+    def wrong_oracle(sample):
+        return {s.address: computed[s.address] + 1 for s in sample}
+
+    with pytest.raises(DecayMismatchException):
+        verify_boosted_balances(stakers, computed, wrong_oracle, fraction=1)
@@ -1,6 +1,15 @@
+import asyncio
+
 import pytest
 
-from reporter.queries import get_locks, get_arv_stakers
+from reporter.models import Lock
+from reporter.queries import get_arv_stakers
+from reporter.queries.arv_stakers import (
+    PRV_TOTAL_SUPPLY_KEY,
+    get_arv_onchain_state,
+    get_arv_onchain_state_async,
+    get_arv_stakers_and_boost,
+)
 from reporter.config import load_conf
 from reporter.test.conftest import LIVE_CALLS_DISABLED, SKIP_REASON
 
@@ -11,4 +20,102 @@ def test_get_locks():
 
     stakers = get_arv_stakers(conf)
     addresses = [s.address for s in stakers]
-    get_locks(addresses, conf)
+    state = get_arv_onchain_state(addresses, conf.block_snapshot, with_boost=False)
+    assert all(isinstance(state.stakers[a].lock, Lock) for a in addresses)
+
+
+def test_arv_onchain_state_single_pass(monkeypatch):
+    addresses = ["0x%040x" % (i + 1) for i in range(3)]
+    batches = []
+
+    def executor(calls, block_id):
+        batches.append(calls)
+        results = {}
+        for c in calls:
+            name, handler = c.returns[0]
+            if name == PRV_TOTAL_SUPPLY_KEY:
+                results[name] = 10**24
+            elif name[1] == "lock":
+                results[name] = handler((10**18, 1683038428, 3110400))
+            else:
+                results[name] = int(name[0], 16) * 100
+        return results
+
+    monkeypatch.setattr("reporter.queries.arv_stakers.chain_reader", executor)
+
+    state = get_arv_onchain_state(
+        addresses, 17_000_000, with_prv_balances=True, with_prv_supply=True
+    )
+
+    # one aggregate covers every read for every address
+    assert len(batches) == 1
+    assert len(batches[0]) == 3 * len(addresses) + 1
+    assert state.prv_total_supply == 10**24
+
+    reads = state.stakers[addresses[1]]
+    assert reads.lock == Lock(
+        amount=10**18, lockedAt=1683038428, lockDuration=3110400
+    )
+    assert reads.boosted_balance == 200
+    assert reads.prv_active_balance == 200
+
+    lean = get_arv_onchain_state(addresses, 17_000_000)
+    assert len(batches[1]) == 2 * len(addresses)
+    assert lean.prv_total_supply is None
+    assert lean.stakers[addresses[0]].prv_active_balance is None
+
+
+def test_arv_onchain_state_async(monkeypatch):
+    addresses = ["0x%040x" % (i + 1) for i in range(2)]
+
+    class Reader:
+        async def coroutine(self, calls, block_id):
+            assert block_id == 17_000_000
+            return {
+                c.returns[0][0]: (
+                    c.returns[0][1]((1, 2, 3)) if c.returns[0][0][1] == "lock" else 7
+                )
+                for c in calls
+            }
+
+    monkeypatch.setattr("reporter.queries.arv_stakers.chain_reader", Reader())
+
+    state = asyncio.run(get_arv_onchain_state_async(addresses, 17_000_000))
+
+    assert state.stakers[addresses[0]] == (
+        Lock(amount=1, lockedAt=2, lockDuration=3),
+        7,
+        None,
+    )
+
+
+def test_local_decay_skips_oracle_for_most_stakers(monkeypatch, config):
+    holders = [
+        {"account": {"id": "0x%040x" % (i + 1)}, "valueExact": str(10**21)}
+        for i in range(200)
+    ]
+    oracle_calls = []
+
+    def executor(calls, block_id):
+        results = {}
+        for c in calls:
+            name, handler = c.returns[0]
+            if isinstance(name, tuple) and name[1] == "lock":
+                results[name] = handler((10**21, 1000, 4000))
+            else:
+                # oracle balance for a staker, a quarter of the way through the lock
+                oracle_calls.append(name)
+                results[name] = 75 * 10**19
+        return results
+
+    monkeypatch.setattr("reporter.queries.arv_stakers.chain_reader", executor)
+    monkeypatch.setattr(
+        "reporter.queries.arv_stakers.get_block_timestamp", lambda _: 2000
+    )
+
+    stakers = get_arv_stakers_and_boost(config, holders, local_decay=True)
+
+    assert all(s.token.amount == 75 * 10**19 for s in stakers)
+    assert all(s.token.non_decayed_amount == 10**21 for s in stakers)
+    # only the verification sample goes to the oracle
+    assert 0 < len(oracle_calls) < len(holders)
@@ -0,0 +1,84 @@
+import asyncio
+
+from reporter.queries.cache import DiskCache
+from reporter.queries.rpc_cache import (
+    construct_async_eth_call_cache_middleware,
+    construct_eth_call_cache_middleware,
+    eth_call_cache_key,
+)
+
+TX = {"to": "0x0000000000000000000000000000000000000001", "data": "0x70a08231"}
+
+
+def fake_node():
+    sent = []
+
+    def make_request(method, params):
+        sent.append(method)
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+        if params[0]["data"] == "0xdead":
+            return {"jsonrpc": "2.0", "id": 1, "error": {"message": "reverted"}}
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x" + "00" * 31 + "2a"}
+
+    return make_request, sent
+
+
+def test_eth_call_cache_key():
+    assert eth_call_cache_key("0x1", [TX, "0x10"]) == eth_call_cache_key(
+        "0x1", [TX, 16]
+    )
+    assert eth_call_cache_key("0x1", [TX, "0x10"]) != eth_call_cache_key(
+        "0x1", [TX, "0x11"]
+    )
+    assert eth_call_cache_key("0x1", [TX, "0x10"]) != eth_call_cache_key(
+        "0x5", [TX, "0x10"]
+    )
+    assert eth_call_cache_key("0x1", [TX, "latest"]) is None
+
+
+def test_eth_call_cache_middleware(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    make_request, sent = fake_node()
+    request = construct_eth_call_cache_middleware(cache)(make_request, None)
+
+    first = request("eth_call", [TX, "0x10"])
+    second = request("eth_call", [TX, "0x10"])
+
+    assert first == second
+    assert sent == ["eth_chainId", "eth_call"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a fresh run reads the same file without going to the node
+    make_request, sent = fake_node()
+    request = construct_eth_call_cache_middleware(DiskCache(str(tmp_path)))(
+        make_request, None
+    )
+    assert request("eth_call", [TX, "0x10"]) == first
+    assert sent == ["eth_chainId"]
+
+    # unpinned calls and errors are never stored
+    request("eth_call", [TX, "latest"])
+    request("eth_call", [TX, "latest"])
+    request("eth_call", [{**TX, "data": "0xdead"}, "0x10"])
+    request("eth_call", [{**TX, "data": "0xdead"}, "0x10"])
+    assert sent.count("eth_call") == 4
+
+
+def test_async_eth_call_cache_middleware(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    make_request, sent = fake_node()
+
+    async def make_request_async(method, params):
+        return make_request(method, params)
+
+    async def run():
+        middleware = construct_async_eth_call_cache_middleware(cache)
+        request = await middleware(make_request_async, None)
+        return [await request("eth_call", [TX, "0x10"]) for _ in range(3)]
+
+    results = asyncio.run(run())
+
+    assert results[0] == results[1] == results[2]
+    assert sent == ["eth_chainId", "eth_call"]
+    assert cache.hits == 2
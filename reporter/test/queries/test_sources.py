@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from decimal import Decimal
+
+from reporter.queries import EpochSources, fetch_epoch_sources
+
+DELAY = 0.2
+
+HOLDER = "0x742d35cc6634c0532925a3b844bc454e4438f44e"
+HOLDERS = [{"account": {"id": HOLDER}, "valueExact": "1"}]
+DEPOSITORS = [{"account": {"id": HOLDER}}]
+
+
+def mock_sources(monkeypatch) -> dict[str, int]:
+    """Each source takes `DELAY` seconds and records how many run at once"""
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def slow(result):
+        def fetch(*_):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(DELAY)
+            with lock:
+                running["now"] -= 1
+            return result
+
+        return fetch
+
+    def slow_read(result):
+        async def read(addresses, *_, **__):
+            running.setdefault("reads", []).append(addresses)
+            await asyncio.sleep(DELAY)
+            return result
+
+        return read
+
+    monkeypatch.setattr("reporter.queries.voters.get_offchain_votes", slow(["off"]))
+    monkeypatch.setattr("reporter.queries.voters.get_onchain_votes", slow(["on"]))
+    monkeypatch.setattr(
+        "reporter.queries.sources.get_holders_and_depositors",
+        slow((HOLDERS, DEPOSITORS)),
+    )
+    monkeypatch.setattr(
+        "reporter.queries.total_supply.get_prv_total_supply", slow(Decimal(100))
+    )
+    monkeypatch.setattr(
+        "reporter.queries.arv_stakers.get_arv_onchain_state_async",
+        slow_read("arv state"),
+    )
+    monkeypatch.setattr(
+        "reporter.queries.prv_stakers.get_prv_staked_balances_async",
+        slow_read({HOLDER: "5"}),
+    )
+    return running
+
+
+def test_fetch_epoch_sources_runs_concurrently(monkeypatch, config):
+    running = mock_sources(monkeypatch)
+
+    start = time.monotonic()
+    sources = fetch_epoch_sources(config)
+    elapsed = time.monotonic() - start
+
+    assert sources == EpochSources(
+        offchain_votes=["off"],
+        onchain_votes=["on"],
+        arv_holders=HOLDERS,
+        prv_depositors=DEPOSITORS,
+        prv_total_supply=Decimal(100),
+        arv_onchain="arv state",
+        prv_balances={HOLDER: "5"},
+    )
+    assert running["max"] == 4
+    # holders then their reads, while the votes are still being fetched
+    assert elapsed < DELAY * 3
+    # ARV reads use the checksummed addresses of the stakers, PRV reads the raw depositors
+    assert running["reads"] == [
+        ["0x742d35Cc6634C0532925a3b844Bc454e4438f44e"],
+        [HOLDER],
+    ]
+
+
+def test_fetch_epoch_sources_bounded(monkeypatch, config):
+    running = mock_sources(monkeypatch)
+
+    fetch_epoch_sources(config, max_concurrency=2)
+
+    assert running["max"] == 2
@@ -0,0 +1,134 @@
+import gc
+import os
+import random
+import time
+from decimal import Decimal, getcontext
+
+import pytest
+
+from reporter import utils
+from reporter.models import Account, AccountState, ERC20Amount, trusted_copy
+from reporter.rewards import batch_rewards, distribute_rewards, tokens_by_status
+
+BENCHMARK_DISABLED = os.environ.get("PYTEST_BENCHMARK_ENABLED") != "TRUE"
+BENCHMARK_ACCOUNTS = 1_000_000
+
+getcontext().prec = 42
+
+TOKEN = "0x0000000000000000000000000000000000000001"
+REWARD_TOKEN = "0x0000000000000000000000000000000000000002"
+TOTAL_REWARDS = 7 * 10**20
+
+
+def string_tokens_by_status(accounts: list[Account], state: AccountState) -> Decimal:
+    """`tokens_by_status` as it was when amounts were held as strings"""
+    return Decimal(
+        sum(
+            Decimal(account.token.amount)
+            for account in utils.filter_state(accounts, state)
+        )
+    )
+
+
+def string_distribute_rewards(account: Account, pro_rata: Decimal) -> Account:
+    """
+    `distribute_rewards` as it was when amounts were held as strings. The deepcopy it
+    started with was removed separately, so the account is copied the way it is now
+    """
+    if account.state != AccountState.ACTIVE:
+        return account
+    account_reward = int(pro_rata * Decimal(account.token.amount))
+    rewards = trusted_copy(
+        account.rewards,
+        amount=str(Decimal(account.rewards.amount) + account_reward),
+    )
+    return trusted_copy(
+        account,
+        rewards=rewards,
+        notes=[*account.notes, f"active reward of {account_reward}"],
+    )
+
+
+def string_rewards(accounts: list[Account]) -> list[Account]:
+    total_active = string_tokens_by_status(accounts, AccountState.ACTIVE)
+    pro_rata = Decimal(TOTAL_REWARDS) / total_active
+    return [string_distribute_rewards(a, pro_rata) for a in accounts]
+
+
+def int_rewards(accounts: list[Account]) -> list[Account]:
+    total_active = tokens_by_status(accounts, AccountState.ACTIVE)
+    rewards = batch_rewards(
+        [a.token.amount for a in accounts],
+        [a.state == AccountState.ACTIVE for a in accounts],
+        TOTAL_REWARDS,
+        total_active,
+    )
+    return [distribute_rewards(a, r) for a, r in zip(accounts, rewards)]
+
+
+def accounts(n: int, as_str: bool = False) -> list[Account]:
+    """`n` accounts, 70% of them active, with amounts as ints or as the strings they used to be"""
+    rng = random.Random(n)
+    amount = str if as_str else int
+    return [
+        Account.construct(
+            address="0x%040x" % i,
+            token=ERC20Amount.construct(
+                address=TOKEN,
+                symbol="ARV",
+                decimals=18,
+                amount=amount(rng.randrange(10**15, 10**24)),
+            ),
+            rewards=ERC20Amount.construct(
+                address=REWARD_TOKEN, symbol="WETH", decimals=18, amount=amount(0)
+            ),
+            state=AccountState.ACTIVE if rng.random() < 0.7 else AccountState.INACTIVE,
+            notes=[],
+        )
+        for i in range(n)
+    ]
+
+
+def reward_amounts(accounts: list[Account]) -> list[int]:
+    return [int(a.rewards.amount) for a in accounts]
+
+
+def timed(f, accounts: list[Account]) -> tuple[float, list[int]]:
+    """
+    Time `f` over the accounts, returns the reward amounts only, so the accounts of one run
+    are freed before the next and the garbage collector walks the same heap for both
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = f(accounts)
+    seconds = time.perf_counter() - start
+    return seconds, reward_amounts(result)
+
+
+def assert_same_rewards(ints: list[int], strings: list[int]):
+    # the string path rounds through the pro-rata rate, the int path is exact
+    assert len(ints) == len(strings)
+    assert all(abs(i - s) <= 1 for i, s in zip(ints, strings))
+
+
+def test_int_rewards_match_string_rewards():
+    assert_same_rewards(
+        reward_amounts(int_rewards(accounts(1000))),
+        reward_amounts(string_rewards(accounts(1000, as_str=True))),
+    )
+
+
+@pytest.mark.skipif(BENCHMARK_DISABLED, reason="Set PYTEST_BENCHMARK_ENABLED=TRUE")
+def test_benchmark_reward_arithmetic():
+    n = BENCHMARK_ACCOUNTS
+
+    before, expected = timed(string_rewards, accounts(n, as_str=True))
+    after, result = timed(int_rewards, accounts(n))
+
+    print(
+        f"\ntokens_by_status and rewards over {n} accounts, per account:"
+        f"\n  string amounts  {before / n * 1e9:8.0f} ns"
+        f"\n  int amounts     {after / n * 1e9:8.0f} ns"
+    )
+    assert_same_rewards(result, expected)
+    assert after < before
@@ -9,8 +9,10 @@ from reporter.models import (
     ERC20Amount,
     ARVRewardSummary,
     ARV,
+    StakerTable,
 )
 from reporter.rewards import (
+    batch_rewards,
     compute_rewards,
     init_account_rewards,
     tokens_by_status,
@@ -44,6 +46,10 @@ def test_init_account_rewards(ADDRESSES, config):
     assert accounts[1].state == AccountState.INACTIVE
     assert accounts[1].rewards == config.reward_token(amount="0")
 
+    # each account has its own rewards, changing one leaves the others alone
+    accounts[0].rewards.amount = 99
+    assert accounts[1].rewards.amount == 0
+
 
 def test_tokens_by_status(ADDRESSES, config):
     accounts = [
@@ -67,9 +73,9 @@ def test_tokens_by_status(ADDRESSES, config):
 
     stats = compute_token_stats(accounts)
 
-    assert stats.total == "300"
-    assert stats.active == "100"
-    assert stats.inactive == "200"
+    assert stats.total == 300
+    assert stats.active == 100
+    assert stats.inactive == 200
 
 
 def test_distribute(ADDRESSES, config):
@@ -101,10 +107,49 @@ def test_distribute(ADDRESSES, config):
         for acc in distribution
     )
 
-    assert token_stats.total == "300"
-    assert token_stats.active == "100"
-    assert token_stats.inactive == "200"
+    assert token_stats.total == 300
+    assert token_stats.active == 100
+    assert token_stats.inactive == 200
 
-    assert summary.amount == str(config.arv_rewards)
+    assert summary.amount == config.arv_rewards
     assert summary.address == config.reward_token().address
     assert summary.symbol == config.reward_token().symbol
+
+
+def test_batch_rewards_are_exact():
+    # a third each: the rounded pro-rata rate of 0.333... would give 0 to the account holding 3
+    amounts = [3, 1, 5, 1]
+    active = [True, True, False, True]
+
+    assert batch_rewards(amounts, active, 5, 5) == [3, 1, None, 1]
+    assert batch_rewards(amounts, active, 1, 3) == [1, 0, None, 0]
+    assert batch_rewards(amounts, active, Decimal("2.5"), 5) == [1, 0, None, 0]
+    assert batch_rewards(amounts, active, 100, 0) == [0, 0, None, 0]
+
+
+def test_compute_rewards_table_matches_accounts(ADDRESSES, config):
+    accounts = [
+        Account.from_arv_staker(
+            ARVStaker(address=a, arv_holding=str(10**21 + i * 7)),
+            rewards=config.reward_token(),
+            state=AccountState.ACTIVE if i % 2 == 0 else AccountState.INACTIVE,
+        )
+        for i, a in enumerate(ADDRESSES)
+    ]
+    active = tokens_by_status(accounts, AccountState.ACTIVE)
+
+    rewarded, summary = compute_rewards(config.arv_erc20, active, accounts)
+    table, table_summary = compute_rewards(
+        config.arv_erc20, active, StakerTable.from_stakers(accounts)
+    )
+
+    assert list(table.dicts()) == [a.dict() for a in rewarded]
+    assert table_summary == summary
+    assert sum(a.rewards.amount for a in rewarded) <= config.arv_rewards
+    for account, before in zip(rewarded, accounts):
+        expected = before.token.amount * config.arv_rewards // active
+        if before.state == AccountState.ACTIVE:
+            assert account.rewards.amount == expected
+            assert account.notes == [f"active reward of {expected}"]
+        else:
+            assert account == before
@@ -11,7 +11,12 @@ from reporter.models import (
     RedistributionWeight,
     RedistributionContainer,
 )
-from reporter.rewards import prv_active_rewards, transfer_redistribution, redistribute
+from reporter.rewards import (
+    AccountIndex,
+    prv_active_rewards,
+    transfer_redistribution,
+    redistribute,
+)
 
 getcontext().prec = 42
 
@@ -97,9 +102,9 @@ def test_transfer_redistribution(config: Config, ADDRESSES):
     accounts = transfer_redistribution(accounts, r, config)
 
     # # Check that the rewards were redistributed correctly
-    assert accounts[0].rewards.amount == "175"
+    assert accounts[0].rewards.amount == 175
     assert accounts[0].notes == ["Transfer of 75"]
-    assert accounts[1].rewards.amount == "200"
+    assert accounts[1].rewards.amount == 200
     assert accounts[1].notes == []
 
     # Call the function again with a new account
@@ -114,7 +119,7 @@ def test_transfer_redistribution(config: Config, ADDRESSES):
     # Check that the new account was added and rewards were set correctly
     assert len(accounts) == 3
     assert accounts[2].address == ADDRESSES[2]
-    assert accounts[2].rewards.amount == "75"
+    assert accounts[2].rewards.amount == 75
     assert accounts[2].notes == ["Transfer of 75"]
     assert accounts[2].state == AccountState.INACTIVE
 
@@ -164,14 +169,85 @@ def test_redistribute(config: Config, ADDRESSES):
     updated_accounts = redistribute(accounts, container, conf)
 
     # Check that the rewards were redistributed correctly
-    assert updated_accounts[0].rewards.amount == "150"
+    assert updated_accounts[0].rewards.amount == 150
     assert updated_accounts[0].notes == ["Transfer of 50"]
-    assert updated_accounts[1].rewards.amount == "275"
+    assert updated_accounts[1].rewards.amount == 275
     assert updated_accounts[1].notes == ["Transfer of 75"]
 
     # Check that the manual transfer was processed correctly
     assert len(updated_accounts) == 3
     assert updated_accounts[2].address == ADDRESSES[2]
-    assert updated_accounts[2].rewards.amount == "25"
+    assert updated_accounts[2].rewards.amount == 25
     assert updated_accounts[2].notes == ["Transfer of 25"]
     assert updated_accounts[2].state == AccountState.INACTIVE
+
+
+def test_redistribute_replaces_only_paid_accounts(config: Config, ADDRESSES):
+    accounts = [
+        Account(
+            address=a,
+            token=PRV(amount="10"),
+            rewards=config.reward_token(amount="100"),
+            state=AccountState.ACTIVE,
+        )
+        for a in ADDRESSES
+    ]
+    before = list(accounts)
+    container = RedistributionContainer(
+        redistributions=[
+            RedistributionWeight(
+                address=ADDRESSES[1],
+                rewards="50",
+                option=RedistributionOption.TRANSFER,
+                weight=1,
+            ),
+            RedistributionWeight(
+                weight=1, option=RedistributionOption.REDISTRIBUTE_PRV
+            ),
+        ]
+    )
+
+    updated = redistribute(accounts, container, config)
+
+    assert accounts == before
+    assert all(updated[i] is accounts[i] for i in range(len(accounts)) if i != 1)
+    assert updated[1].rewards.amount == 150
+    assert accounts[1].rewards.amount == 100
+
+    # accounts are changed by replacing them, never in place
+    with pytest.raises(TypeError):
+        accounts[0].notes = ["changed"]
+
+
+def test_account_index_transfers(config: Config, ADDRESSES):
+    accounts = [
+        Account(
+            address=a,
+            token=PRV(amount="10"),
+            rewards=config.reward_token(),
+            state=AccountState.ACTIVE,
+        )
+        for a in ADDRESSES[:2]
+    ]
+    index = AccountIndex(accounts)
+
+    def transfer(address: str, rewards: int):
+        r = RedistributionWeight(
+            address=address,
+            rewards=rewards,
+            option=RedistributionOption.TRANSFER,
+            weight=1,
+        )
+        index.transfer(r, config)
+
+    # any spelling of an address finds its account
+    transfer(ADDRESSES[1].lower(), 5)
+    # a new recipient is added once, then found like any other account
+    transfer(ADDRESSES[2], 7)
+    transfer(ADDRESSES[2], 3)
+
+    assert [a.address for a in index.accounts] == ADDRESSES[:3]
+    assert [a.rewards.amount for a in index.accounts] == [0, 5, 10]
+    assert index.accounts[2].notes == ["Transfer of 7", "Transfer of 3"]
+    assert index.accounts[0] is accounts[0]
+    assert len(accounts) == 2
@@ -8,9 +8,17 @@ from reporter.queries import (
     get_arv_stakers,
     parse_offchain_votes,
     get_voters,
+    classify_voters,
 )
 from eth_utils import to_checksum_address
-from reporter.models import OnChainVote, Account, AccountState, Delegate, Vote
+from reporter.models import (
+    OnChainVote,
+    Account,
+    AccountState,
+    ARVStaker,
+    Delegate,
+    Vote,
+)
 from reporter import utils
 from reporter.test.conftest import _addresses
 
@@ -45,14 +53,14 @@ def init_mocks(monkeypatch):
     """
     monkeypatch.setattr(
         "reporter.queries.common.graphql_iterate_query",
-        lambda url, access_path, params: mock_stakers["data"]["erc20Contract"][
+        lambda url, access_path, params, **_: mock_stakers["data"]["erc20Contract"][
             "balances"
         ],
     )
 
     monkeypatch.setattr(
         "reporter.queries.voters.parse_offchain_votes",
-        lambda _: parse_obj_as(list[Vote], mock_votes),
+        lambda *_: parse_obj_as(list[Vote], mock_votes),
     )
 
     # monkeypatch.setattr(
@@ -62,7 +70,7 @@ def init_mocks(monkeypatch):
 
     monkeypatch.setattr(
         "reporter.queries.voters.parse_onchain_votes",
-        lambda _: parse_obj_as(
+        lambda *_: parse_obj_as(
             list[OnChainVote], mock_on_chain_votes["data"]["voteCasts"]
         ),
     )
@@ -94,6 +102,24 @@ def test_get_vote_data(config, monkeypatch):
     assert all(voter in voter_ids for voter in voters)
 
 
+def test_classify_voters_keeps_staker_order(monkeypatch):
+    monkeypatch.setattr("reporter.queries.voters.get_delegates", lambda: [DELEGATE])
+    # the delegator is classified by its delegate's vote, after the other stakers
+    stakers = [
+        ARVStaker(address=a, arv_holding="1")
+        for a in [_addresses[3], _addresses[0], _addresses[2], _addresses[3]]
+    ]
+    votes = [Vote.construct(voter=a) for a in [_addresses[2], _addresses[1]]]
+
+    index = classify_voters(votes, stakers)
+
+    assert index.voted == [_addresses[2], _addresses[0]]
+    assert index.not_voted == [_addresses[3]]
+    assert _addresses[0] in index and _addresses[0].lower() in index
+    assert _addresses[3] not in index and _addresses[1] not in index
+    assert len(index) == 3
+
+
 def no_slashed_has_rewards(distribution: list[Account]) -> bool:
     slashed = utils.filter_state(distribution, AccountState.INACTIVE)
     return all(int(s.rewards.amount) == 0 for s in slashed)
@@ -51,6 +51,7 @@ from reporter import config
 from reporter.run_arv import run_arv as arv_main
 from reporter.run_prv import run_prv as prv_main
 from reporter.test.scenario_testing.create_scenario import init_users
+from reporter.queries.arv_stakers import ARVOnchainState, ARVStakerReads
 
 
 def _read_mock(file_name, SCENARIO_NUMBER):
@@ -69,16 +70,19 @@ def init_e2e_arv_mocks(monkeypatch, read_mock: Callable):
         lambda *_: read_mock("mock_arv.json")["data"]["erc20Contract"]["balances"],
     )
 
-    # get locks
-    monkeypatch.setattr(
-        "reporter.queries.arv_stakers.get_locks",
-        lambda *_: read_mock("arv_locks.json"),
-    )
+    # get locks and boosted balances
+    def onchain_state(*_) -> ARVOnchainState:
+        locks = read_mock("arv_locks.json")
+        boosted = read_mock("arv_boosted.json")
+        return ARVOnchainState(
+            stakers={
+                addr: ARVStakerReads(lock=lock, boosted_balance=boosted[addr])
+                for addr, lock in locks.items()
+            }
+        )
 
-    # get_boosted_lock
     monkeypatch.setattr(
-        "reporter.queries.arv_stakers.get_boosted_lock",
-        lambda *_: read_mock("arv_boosted.json"),
+        "reporter.queries.arv_stakers.get_arv_onchain_state", onchain_state
     )
 
     # get_offchain_votes
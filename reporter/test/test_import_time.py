@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from unittest.mock import Mock
+
+from reporter.env import EnvFlag, EnvVar
+from reporter.errors import MissingEnvironmentVariableException
+from reporter.queries.chain_reader import ChainReader
+
+# wall clock budgets depend on the machine, so they are only checked on request
+BENCHMARK_DISABLED = os.environ.get("PYTEST_BENCHMARK_ENABLED") != "TRUE"
+
+# seconds allowed for a cold import, well above what it takes locally
+# but far below the ~1.5s it took when web3 was imported up front
+IMPORT_BUDGET = {
+    "reporter.config": 0.5,
+    "reporter.models": 0.5,
+    "reporter.run": 1.0,
+}
+
+# only needed once something reads from the chain or writes a report
+DEFERRED_MODULES = ["web3", "multicall", "tinydb", "eth_utils", "aiohttp"]
+
+# the CLI imports the report writers, so it is allowed tinydb
+ALLOWED_MODULES = {"reporter.run": ["tinydb"]}
+
+# every setting read through `EnvVar`, blanked out so `.env` cannot fill them in
+LAZY_ENV = [
+    "GOVERNOR_ADDRESS",
+    "PRV_ADDRESS",
+    "ARV_ADDRESS",
+    "PRV_ROLLSTAKER",
+    "DECAY_ORACLE",
+    "TOKEN_LOCKER",
+    "SUBGRAPH_AUXO_STAKING",
+    "SUBGRAPH_AUXO_GOV",
+    "SNAPSHOT_SPACE_ID",
+    "RPC_URL",
+]
+
+
+def cold_import(module: str, settings: dict[str, str] = {}) -> dict:
+    """
+    Import `module` in a fresh interpreter, with `settings` added to the environment,
+    returns the time taken and the deferred modules loaded
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({\n"
+        "    'seconds': time.perf_counter() - start,\n"
+        f"    'loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules],\n"
+        "}))\n"
+    )
+    env = {**os.environ, **{k: "" for k in LAZY_ENV}, **settings}
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", list(IMPORT_BUDGET))
+def test_cold_import_defers_modules(module):
+    assert cold_import(module)["loaded"] == ALLOWED_MODULES.get(module, [])
+
+
+@pytest.mark.skipif(BENCHMARK_DISABLED, reason="Set PYTEST_BENCHMARK_ENABLED=TRUE")
+@pytest.mark.parametrize("module", list(IMPORT_BUDGET))
+def test_benchmark_cold_import_budget(module):
+    # best of a few runs, so a busy machine does not fail the test
+    runs = [cold_import(module) for _ in range(3)]
+
+    print(f"\ncold import of {module}: {min(r['seconds'] for r in runs):.3f}s")
+    assert min(r["seconds"] for r in runs) < IMPORT_BUDGET[module]
+
+
+def test_queries_import_without_env():
+    assert cold_import("reporter.queries")["loaded"] == []
+
+
+def test_queries_import_with_a_bad_read_strategy(monkeypatch):
+    # checked when something first reads from the chain, not on import
+    assert cold_import("reporter.queries", {"CHAIN_READ_STRATEGY": "multical"})
+
+    monkeypatch.setenv("CHAIN_READ_STRATEGY", "multical")
+    reader = ChainReader({"multicall": Mock()}, strategy=None)
+    with pytest.raises(ValueError):
+        reader([], 1)
+
+
+def test_env_var_read_on_access(monkeypatch):
+    monkeypatch.delenv("REPORTER_TEST_SETTING", raising=False)
+
+    class Settings:
+        SETTING = EnvVar("REPORTER_TEST_SETTING")
+
+    with pytest.raises(MissingEnvironmentVariableException):
+        Settings.SETTING
+
+    monkeypatch.setenv("REPORTER_TEST_SETTING", "value")
+    assert Settings.SETTING == "value"
+
+
+def test_optional_settings_read_on_access(monkeypatch):
+    monkeypatch.delenv("REPORTER_TEST_FLAG", raising=False)
+    monkeypatch.delenv("REPORTER_TEST_OPTION", raising=False)
+
+    class Settings:
+        FLAG = EnvFlag("REPORTER_TEST_FLAG")
+        OPTION = EnvVar("REPORTER_TEST_OPTION", default="auto")
+
+    monkeypatch.setenv("REPORTER_TEST_FLAG", "TRUE")
+    assert Settings.FLAG is True
+    assert Settings.OPTION == "auto"
@@ -1,16 +1,44 @@
+import asyncio
 import json
+import re
+from decimal import Decimal
+from typing import Optional
+
 import pytest
+import requests
 from unittest.mock import Mock
+from reporter.env import ADDRESSES
 from reporter.errors import *
 from reporter.models import Config, Vote as OffChainVote
-from reporter.queries import graphql_iterate_query, extract_nested_graphql
+from reporter.queries import (
+    JSONClient,
+    GraphQLCursor,
+    GraphQLShards,
+    ID_CURSOR,
+    PagedQuery,
+    graphql_batch_iterate,
+    shard_bounds,
+    shard_params,
+    graphql_iterate_pages,
+    graphql_iterate_query,
+    extract_nested_graphql,
+    get_all_prv_depositors,
+    get_prv_total_supply,
+    get_token_metadata,
+    pooled_async_w3,
+    prefetch,
+    stream_arv_stakers,
+)
 from reporter.test.conftest import (
     LIVE_CALLS_DISABLED,
     SKIP_REASON,
     mock_token_holders,
 )
 from reporter.queries.voters import (
+    ProposalTable,
     combine_on_off_chain_votes,
+    filter_votes_by_proposal,
+    vote_dicts,
     parse_onchain_votes,
     parse_offchain_votes,
     get_onchain_votes,
@@ -23,7 +51,7 @@ def mock_votes(monkeypatch) -> None:
 
     monkeypatch.setattr(
         "reporter.queries.graphql_iterate_query",
-        lambda url, accessor, json: mock_on_chain_votes["data"]["voteCasts"],
+        lambda url, accessor, json, **_: mock_on_chain_votes["data"]["voteCasts"],
     )
 
 
@@ -86,16 +114,15 @@ def test_extract_nested_graphql():
 
 def test_graphql_iterate_query_empty_response(monkeypatch):
     mock_response = None
-    mock_json = Mock(return_value=mock_response)
-    requests_post_mock = Mock(return_value=Mock(json=mock_json))
+    client_post_mock = Mock(return_value=mock_response)
 
     url = "https://graphql.example.com"
     access_path = ["users", "edges", "node", "id"]
     params = {"query": "query {}"}
 
     monkeypatch.setattr(
-        "reporter.queries.requests.post",
-        requests_post_mock,
+        "reporter.queries.common.subgraph_client.post",
+        client_post_mock,
     )
 
     with pytest.raises(EmptyQueryError):
@@ -104,16 +131,15 @@ def test_graphql_iterate_query_empty_response(monkeypatch):
 
 def test_graphql_iterate_query_error_response(monkeypatch):
     mock_response = {"errors": [{"message": "An error occurred"}]}
-    mock_json = Mock(return_value=mock_response)
-    requests_post_mock = Mock(return_value=Mock(json=mock_json))
+    client_post_mock = Mock(return_value=mock_response)
 
     url = "https://graphql.example.com"
     access_path = ["users", "edges", "node", "id"]
     params = {"query": "query {}"}
 
     monkeypatch.setattr(
-        "reporter.queries.requests.post",
-        requests_post_mock,
+        "reporter.queries.common.subgraph_client.post",
+        client_post_mock,
     )
     with pytest.raises(EmptyQueryError):
         graphql_iterate_query(url, access_path, params)
@@ -133,21 +159,417 @@ def test_graphql_iterate_query_too_many_loops(monkeypatch):
             }
         }
     }
-    mock_json = Mock(return_value=mock_response)
-    requests_post_mock = Mock(return_value=Mock(json=mock_json))
+    client_post_mock = Mock(return_value=mock_response)
 
     url = "https://graphql.example.com"
     access_path = ["users", "edges", "nodes"]
     params = {"query": "query {}", "variables": {"skip": 1}}
 
     monkeypatch.setattr(
-        "reporter.queries.requests.post",
-        requests_post_mock,
+        "reporter.queries.common.subgraph_client.post",
+        client_post_mock,
     )
     with pytest.raises(TooManyLoopsError):
         graphql_iterate_query(url, access_path, params, max_loops=3)
 
 
+def test_graphql_iterate_query_cursor_stops_on_short_page(monkeypatch):
+    pages = [
+        {"data": {"rows": [{"id": "a"}, {"id": "b"}]}},
+        {"data": {"rows": [{"id": "c"}]}},
+    ]
+    seen_cursors = []
+
+    def post(url, params):
+        seen_cursors.append(params["variables"]["id_gt"])
+        return pages[len(seen_cursors) - 1]
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    params = {"query": "query {}", "variables": {"id_gt": ""}}
+    results = graphql_iterate_query(
+        "https://graphql.example.com", ["rows"], params, cursor=ID_CURSOR, page_size=2
+    )
+
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    # no extra round trip for an empty page
+    assert seen_cursors == ["", "b"]
+
+
+def test_graphql_iterate_query_inclusive_cursor_drops_duplicates(monkeypatch):
+    # each page starts on the last timestamp of the previous one
+    pages = [
+        {"data": {"votes": [{"id": "a", "created": 1}, {"id": "b", "created": 2}]}},
+        {"data": {"votes": [{"id": "b", "created": 2}, {"id": "c", "created": 2}]}},
+        {"data": {"votes": [{"id": "c", "created": 2}, {"id": "d", "created": 3}]}},
+        {"data": {"votes": [{"id": "d", "created": 3}]}},
+    ]
+    calls = []
+
+    def post(url, params):
+        calls.append(params["variables"]["created_gte"])
+        return pages[len(calls) - 1]
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    cursor = GraphQLCursor(field="created", variable="created_gte", unique="id")
+    params = {"query": "query {}", "variables": {"created_gte": 0}}
+    results = graphql_iterate_query(
+        "https://graphql.example.com", ["votes"], params, cursor=cursor, page_size=2
+    )
+
+    assert [r["id"] for r in results] == ["a", "b", "c", "d"]
+    assert calls == [0, 2, 2, 3]
+
+
+def test_graphql_iterate_query_inclusive_cursor_raises_when_stuck(monkeypatch):
+    pages = [
+        {"data": {"votes": [{"id": "a", "created": 1}, {"id": "b", "created": 2}]}},
+        {"data": {"votes": [{"id": "b", "created": 2}, {"id": "c", "created": 2}]}},
+        {"data": {"votes": [{"id": "b", "created": 2}, {"id": "c", "created": 2}]}},
+    ]
+    calls = []
+
+    def post(url, params):
+        calls.append(params["variables"]["created_gte"])
+        return pages[len(calls) - 1]
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    cursor = GraphQLCursor(field="created", variable="created_gte", unique="id")
+    params = {"query": "query {}", "variables": {"created_gte": 0}}
+
+    # a full page that does not move the cursor can never finish
+    with pytest.raises(TooManyLoopsError):
+        graphql_iterate_query(
+            "https://graphql.example.com", ["votes"], params, cursor=cursor, page_size=2
+        )
+    assert calls == [0, 2, 2]
+
+
+def test_graphql_iterate_pages_is_lazy(monkeypatch):
+    pages = [
+        {"data": {"rows": [{"id": "a"}, {"id": "b"}]}},
+        {"data": {"rows": [{"id": "c"}]}},
+    ]
+    client_post_mock = Mock(side_effect=pages)
+    monkeypatch.setattr(
+        "reporter.queries.common.subgraph_client.post", client_post_mock
+    )
+
+    params = {"query": "query {}", "variables": {"id_gt": ""}}
+    stream = graphql_iterate_pages(
+        "https://graphql.example.com", ["rows"], params, cursor=ID_CURSOR, page_size=2
+    )
+
+    assert next(stream) == [{"id": "a"}, {"id": "b"}]
+    assert client_post_mock.call_count == 1
+    assert list(stream) == [[{"id": "c"}]]
+    assert client_post_mock.call_count == 2
+
+
+def test_prefetch():
+    assert list(prefetch(iter(range(10)), depth=2)) == list(range(10))
+
+    def failing():
+        yield 1
+        raise EmptyQueryError("boom")
+
+    stream = prefetch(failing())
+    assert next(stream) == 1
+    with pytest.raises(EmptyQueryError):
+        next(stream)
+
+
+def test_stream_arv_stakers(monkeypatch, config):
+    with open("reporter/test/stubs/tokens/arv.json") as j:
+        mock_stakers = json.load(j)
+    monkeypatch.setattr(
+        "reporter.queries.common.subgraph_client.post", lambda *_: mock_stakers
+    )
+    monkeypatch.setattr("reporter.queries.common.page_cache", lambda _: None)
+
+    stakers = list(stream_arv_stakers(config))
+    balances = mock_stakers["data"]["erc20Contract"]["balances"]
+
+    assert len(stakers) == len(balances)
+    assert [s.token.amount for s in stakers] == [int(b["valueExact"]) for b in balances]
+
+
+def test_token_metadata_fetched_once(monkeypatch):
+    prv = {
+        "id": "0xc72fbd264b40d88e445bcf82663d63ff21e722af",
+        "name": "Auxo Passive Reward Vault",
+        "symbol": "PRV",
+        "decimals": 18,
+        "totalSupply": {"valueExact": "123000000000000000000"},
+    }
+    client_post_mock = Mock(return_value={"data": {"erc20Contract": prv}})
+    monkeypatch.setattr(
+        "reporter.queries.common.subgraph_client.post", client_post_mock
+    )
+
+    # a block no other test uses, so the memoized result is ours
+    block = 424242
+    metadata = get_token_metadata(ADDRESSES.PRV, block)
+
+    assert metadata.symbol == "PRV"
+    assert metadata.decimals == 18
+    assert metadata.total_supply == 123000000000000000000
+    assert get_prv_total_supply(block) == Decimal("123000000000000000000")
+    assert client_post_mock.call_count == 1
+
+
+def test_pooled_async_w3_closes_session_with_loop(monkeypatch):
+    sessions = []
+
+    class Provider:
+        async def cache_async_session(self, session):
+            sessions.append(session)
+
+    class FakeAsyncW3:
+        provider = Provider()
+
+    monkeypatch.setattr("reporter.queries.common.get_async_w3", lambda: FakeAsyncW3())
+
+    async def read_twice():
+        # the same loop shares one session
+        await pooled_async_w3()
+        await pooled_async_w3()
+        return sessions[-1].closed
+
+    assert asyncio.run(read_twice()) is False
+    assert asyncio.run(read_twice()) is False
+
+    assert len(sessions) == 2
+    assert all(s.closed for s in sessions)
+
+
+def test_shard_bounds():
+    assert shard_bounds(1) == [(None, None)]
+    assert shard_bounds(4) == [
+        (None, "0x40"),
+        ("0x40", "0x80"),
+        ("0x80", "0xc0"),
+        ("0xc0", None),
+    ]
+    assert [lower for lower, _ in shard_bounds(300)][:3] == [None, "0x00da", "0x01b4"]
+
+    # every bound is a whole number of bytes, and the ranges are contiguous
+    for count in [2, 3, 16, 255, 256, 257]:
+        bounds = shard_bounds(count)
+        assert len(bounds) == count
+        inner = [b for pair in bounds for b in pair if b is not None]
+        assert all(len(b) % 2 == 0 for b in inner)
+        assert all(upper == lower for (_, upper), (lower, _) in zip(bounds, bounds[1:]))
+
+
+def within(address: str, lower: Optional[str], upper: Optional[str]) -> bool:
+    return (lower is None or address >= lower) and (upper is None or address < upper)
+
+
+def test_shard_params_filter_only_the_range():
+    params = {
+        "query": "query($id_gt: String) { rows(where: {id_gt: $id_gt}) { id } }",
+        "variables": {"id_gt": ""},
+    }
+    shards = GraphQLShards(field="account", count=4)
+
+    first = shard_params(params, shards, (None, "0x40"))
+    assert first == {
+        "query": "query($account_lt: Bytes, $id_gt: String) { rows(where: { account_lt: $account_lt,id_gt: $id_gt}) { id } }",
+        "variables": {"id_gt": "", "account_lt": "0x40"},
+    }
+    middle = shard_params(params, shards, ("0x40", "0x80"))
+    assert "account_gte: $account_gte, account_lt: $account_lt," in middle["query"]
+    assert middle["variables"] == {
+        "id_gt": "",
+        "account_gte": "0x40",
+        "account_lt": "0x80",
+    }
+    # unsharded queries are sent as they are
+    assert shard_params(params, shards, (None, None)) == params
+    assert params["variables"] == {"id_gt": ""}
+
+    with pytest.raises(ValueError):
+        shard_params({"query": "query { rows { id } }"}, shards, ("0x40", None))
+
+
+def test_graphql_iterate_query_sharded(monkeypatch):
+    # a fake subgraph holding 50 accounts spread over the address space
+    rows = sorted(
+        ({"id": "0x%040x" % (i * 7919 * 16**34)} for i in range(1, 51)),
+        key=lambda r: r["id"],
+    )
+
+    def post(url, params):
+        v = params["variables"]
+        page = [
+            r
+            for r in rows
+            if within(r["id"], v.get("account_gte"), v.get("account_lt"))
+            and r["id"] > v["id_gt"]
+        ]
+        return {"data": {"rows": page[:3]}}
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    params = {
+        "query": "query($id_gt: String) { rows(where: {id_gt: $id_gt}) { id } }",
+        "variables": {"id_gt": ""},
+    }
+    results = graphql_iterate_query(
+        "https://graphql.example.com",
+        ["rows"],
+        params,
+        cursor=ID_CURSOR,
+        page_size=3,
+        shards=GraphQLShards(field="account", count=8, max_workers=3),
+    )
+
+    assert results == rows
+
+
+def test_depositors_fetched_in_one_sequence_by_default(monkeypatch):
+    post = Mock(return_value={"data": {"prvstakingBalances": [{"id": "a"}]}})
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    assert get_all_prv_depositors(123) == [{"id": "a"}]
+    # a single short page, without a request per shard
+    assert post.call_count == 1
+    assert "account_gte" not in post.call_args.args[1]["variables"]
+
+
+def test_paged_query_aliases():
+    query = PagedQuery(
+        field="rows(block: {number: $block}, where: {id_gt: $id_gt}) { id }",
+        types={"block": "Int", "id_gt": "String"},
+        variables={"block": 1, "id_gt": ""},
+        access_path=[],
+    )
+
+    assert query.params() == {
+        "query": "query($block: Int, $id_gt: String) { rows(block: {number: $block}, where: {id_gt: $id_gt}) { id } }",
+        "variables": {"block": 1, "id_gt": ""},
+    }
+    assert (
+        query.selection("w1")
+        == "w1: rows(block: {number: $w1_block}, where: {id_gt: $w1_id_gt}) { id }"
+    )
+    assert query.declarations("w1") == ["$w1_block: Int", "$w1_id_gt: String"]
+
+
+def test_graphql_batch_iterate(monkeypatch):
+    tables = {
+        "holders": [{"id": "0x%040x" % (i * (16**40 // 40))} for i in range(1, 40)],
+        "stakers": [{"id": "0x%040x" % (i * (16**40 // 12))} for i in range(1, 12)],
+    }
+    documents = []
+
+    def post(url, params):
+        documents.append(params["query"])
+        aliases = re.findall(r"(w\d+): (\w+)\(", params["query"])
+        v = params["variables"]
+        data = {}
+        for alias, table in aliases:
+            data[alias] = [
+                r
+                for r in tables[table]
+                if within(
+                    r["id"], v.get(f"{alias}_account_gte"), v.get(f"{alias}_account_lt")
+                )
+                and r["id"] > v[f"{alias}_id_gt"]
+            ][:4]
+        return {"data": data}
+
+    monkeypatch.setattr("reporter.queries.common.subgraph_client.post", post)
+
+    def paged(table: str) -> PagedQuery:
+        return PagedQuery(
+            field=f"{table}(where: {{id_gt: $id_gt}}) {{ id }}",
+            types={"id_gt": "String"},
+            variables={"id_gt": ""},
+            access_path=[],
+        )
+
+    results = graphql_batch_iterate(
+        "https://graphql.example.com",
+        {"holders": paged("holders"), "stakers": paged("stakers")},
+        shards=GraphQLShards(field="account", count=4),
+        max_aliases=8,
+        page_size=4,
+    )
+
+    assert results == tables
+    # one request per round: the biggest shard holds 10 holders, so 3 pages
+    assert len(documents) == 3
+    assert documents[0].count("holders(") == 4
+    assert "$w0_account_lt: Bytes" in documents[0]
+    assert "$w0_account_gte" not in documents[0]
+    assert documents[0].count("stakers(") == 4
+
+
+def mock_response(status: int, body: bytes = b"{}") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    return response
+
+
+def test_json_client_retries_bad_gateway(monkeypatch):
+    responses = [
+        mock_response(502),
+        requests.ConnectionError("reset"),
+        mock_response(200, b'{"data": {"rows": []}}'),
+    ]
+    sent = []
+
+    def post(self, url, json, timeout):
+        sent.append(timeout)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr("requests.Session.post", post)
+    client = JSONClient(timeout=(1, 2), retries=2, backoff=0)
+
+    assert client.post("https://graphql.example.com/a", {"query": ""}) == {
+        "data": {"rows": []}
+    }
+    assert sent == [(1, 2)] * 3
+
+    stats = client.stats["graphql.example.com"]
+    assert stats.requests == 3
+    assert stats.retries == 2
+    assert stats.bytes == len(b"{}") + len(b'{"data": {"rows": []}}')
+
+
+def test_json_client_gives_up(monkeypatch):
+    monkeypatch.setattr("requests.Session.post", lambda *_, **__: mock_response(503))
+    client = JSONClient(retries=1, backoff=0)
+
+    with pytest.raises(requests.HTTPError):
+        client.post("https://graphql.example.com", {"query": ""})
+    assert client.stats["graphql.example.com"].requests == 2
+
+
+def test_json_client_does_not_retry_client_errors(monkeypatch):
+    post = Mock(return_value=mock_response(400))
+    monkeypatch.setattr("requests.Session.post", post)
+    client = JSONClient(retries=3, backoff=0)
+
+    with pytest.raises(requests.HTTPError):
+        client.post("https://graphql.example.com", {"query": ""})
+    assert post.call_count == 1
+
+
+def test_json_client_pools_per_host():
+    client = JSONClient()
+    assert client.session("a.example.com") is client.session("a.example.com")
+    assert client.session("a.example.com") is not client.session("b.example.com")
+
+
 @pytest.mark.skipif(LIVE_CALLS_DISABLED, reason=SKIP_REASON)
 def test_should_have_data(config: Config):
     config.start_timestamp = 1668781800 - 100
@@ -189,3 +611,26 @@ def test_can_combine_votes(monkeypatch, config):
     assert len(mock_off_chain_votes) > 0
     assert len(combined) == len(mock_off_chain_votes) + len(mock_on_chain_votes)
     assert all(isinstance(c, OffChainVote) for c in combined)
+
+
+def test_votes_share_interned_proposals(monkeypatch, config):
+    mock_votes_both(monkeypatch)
+    monkeypatch.setattr("reporter.utils.yes_or_no", lambda _: False)
+
+    proposals = ProposalTable()
+    offchain = parse_offchain_votes(config, proposals)
+    onchain = parse_onchain_votes(config, proposals)
+    combined = combine_on_off_chain_votes(offchain, onchain, proposals)
+
+    # one instance per proposal id, referenced by every vote on it
+    by_id = {p.id: p for p in proposals}
+    assert len(by_id) == len(proposals) == len({v.proposal.id for v in combined})
+    assert all(v.proposal is by_id[v.proposal.id] for v in combined)
+    assert len({id(v.proposal) for v in onchain}) == len(
+        {v.proposal.id for v in onchain}
+    )
+
+    votes, valid = filter_votes_by_proposal(combined, proposals)
+    assert votes == combined
+    assert valid == list(proposals)
+    assert vote_dicts(votes) == [v.dict() for v in votes]